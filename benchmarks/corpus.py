@@ -0,0 +1,109 @@
+"""
+Generates synthetic CF and CMIP6-like NetCDF files for the benchmarks.
+
+The files have a ``time``, ``lat`` and ``lon`` grid with CF coordinate
+variables. The number of data variables, attributes and the file size are
+configurable, the number of time steps is chosen to reach the file size.
+"""
+
+import os
+import datetime
+
+import numpy as np
+
+CMIP6_GLOBALS = {
+    'Conventions': 'CF-1.7 CMIP-6.2',
+    'activity_id': 'CMIP',
+    'experiment_id': 'historical',
+    'frequency': 'mon',
+    'grid_label': 'gn',
+    'institution_id': 'MPI-M',
+    'mip_era': 'CMIP6',
+    'nominal_resolution': '250 km',
+    'realm': 'atmos',
+    'source_id': 'MPI-ESM1-2-LR',
+    'source_type': 'AOGCM',
+    'table_id': 'Amon',
+    'variant_label': 'r1i1p1f1',
+}
+
+
+def corpus_filename(path, size_mb, variables, attributes, kind='cf'):
+    return os.path.join(path, '{}_{}mb_{}v_{}a.nc'.format(kind, size_mb, variables, attributes))
+
+
+def generate(filename, size_mb=1, variables=1, attributes=10, kind='cf', nlat=90, nlon=180):
+    """
+    Writes a synthetic NetCDF file.
+
+    :param size_mb: approximate size of the variable data in megabytes.
+    :param variables: number of data variables.
+    :param attributes: number of extra attributes of each data variable and of the dataset.
+    :param kind: ``cf`` or ``cmip6`` (adds the CMIP6 global attributes and names).
+    """
+    from netCDF4 import Dataset
+    step_bytes = nlat * nlon * 4 * max(1, variables)
+    ntime = max(1, int(size_mb * 1024 * 1024 / step_bytes))
+    rng = np.random.RandomState(42)
+    with Dataset(filename, 'w', format='NETCDF4') as ds:
+        ds.createDimension('time', None)
+        ds.createDimension('lat', nlat)
+        ds.createDimension('lon', nlon)
+        ds.createDimension('bnds', 2)
+
+        time = ds.createVariable('time', 'f8', ('time',))
+        time.standard_name = 'time'
+        time.units = 'days since 1850-01-01'
+        time.calendar = 'standard'
+        time.axis = 'T'
+        time.bounds = 'time_bnds'
+        time[:] = np.arange(ntime) * 30.0 + 15.0
+        time_bnds = ds.createVariable('time_bnds', 'f8', ('time', 'bnds'))
+        time_bnds[:] = np.stack([np.arange(ntime) * 30.0, np.arange(1, ntime + 1) * 30.0], axis=1)
+
+        lat = ds.createVariable('lat', 'f8', ('lat',))
+        lat.standard_name = 'latitude'
+        lat.units = 'degrees_north'
+        lat.axis = 'Y'
+        lat[:] = np.linspace(-90 + 90.0 / nlat, 90 - 90.0 / nlat, nlat)
+        lon = ds.createVariable('lon', 'f8', ('lon',))
+        lon.standard_name = 'longitude'
+        lon.units = 'degrees_east'
+        lon.axis = 'X'
+        lon[:] = np.linspace(0, 360, nlon, endpoint=False)
+
+        for idx in range(variables):
+            name = 'tas' if idx == 0 else 'tas{}'.format(idx)
+            var = ds.createVariable(name, 'f4', ('time', 'lat', 'lon'), zlib=False, fill_value=1e20)
+            var.standard_name = 'air_temperature'
+            var.long_name = 'Near-Surface Air Temperature'
+            var.units = 'K'
+            var.cell_methods = 'area: time: mean'
+            for att in range(attributes):
+                var.setncattr('comment_{}'.format(att), 'synthetic attribute {} of {}'.format(att, name))
+            for step in range(ntime):
+                var[step] = (rng.random_sample((nlat, nlon)) * 60 + 240).astype('f4')
+
+        ds.title = 'Synthetic dataset for Hummingbird benchmarks'
+        ds.history = '{} generated by benchmarks/corpus.py'.format(datetime.datetime.utcnow().isoformat())
+        if kind == 'cmip6':
+            ds.setncatts(CMIP6_GLOBALS)
+            ds.variable_id = 'tas'
+        else:
+            ds.Conventions = 'CF-1.6'
+        for att in range(attributes):
+            ds.setncattr('global_{}'.format(att), 'synthetic global attribute {}'.format(att))
+    return filename
+
+
+def generate_corpus(path, sizes=(1,), variables=1, attributes=10, kind='cf'):
+    """Generates one file for each size in ``path``, existing files are reused."""
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    files = []
+    for size_mb in sizes:
+        filename = corpus_filename(path, size_mb, variables, attributes, kind)
+        if not os.path.isfile(filename):
+            generate(filename, size_mb, variables, attributes, kind)
+        files.append(filename)
+    return files
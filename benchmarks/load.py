@@ -0,0 +1,292 @@
+"""
+Load test of a running Hummingbird service.
+
+Sends a weighted mix of GetCapabilities, DescribeProcess and Execute requests
+with several concurrent clients. Asynchronous Execute requests are followed by
+polling their status document until the process has finished::
+
+  $ hummingbird start --workers 4 -d
+  $ python -m benchmarks.load http://localhost:5000/wps --concurrency 8 --requests 200
+
+The mix is a json file with a list of requests. A request has a ``name``, a
+``weight`` and either ``params`` (a GET request) or ``body`` (a POST request
+with an XML document)::
+
+  [
+    {"name": "caps", "weight": 2, "params": {"service": "WPS", "request": "GetCapabilities"}},
+    {"name": "ncdump", "weight": 1, "params": {"service": "WPS", "request": "Execute",
+     "version": "1.0.0", "identifier": "ncdump", "DataInputs": "dataset=@xlink:href=file:///data/tas.nc",
+     "storeExecuteResponse": "true", "status": "true"}}
+  ]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.corpus import generate_corpus
+
+STATUS_FINISHED = ('ProcessSucceeded', 'ProcessFailed')
+
+
+def default_mix(dataset):
+    """Returns the synthetic request mix using ``dataset`` (a file path or URL)."""
+    if not dataset.startswith(('http://', 'https://', 'file://')):
+        dataset = 'file://' + os.path.abspath(dataset)
+    execute = OrderedDict([
+        ('service', 'WPS'), ('request', 'Execute'), ('version', '1.0.0'),
+        ('DataInputs', 'dataset=@xlink:href={}'.format(dataset))])
+    return [
+        dict(name='GetCapabilities', weight=2,
+             params=dict(service='WPS', request='GetCapabilities')),
+        dict(name='DescribeProcess', weight=2,
+             params=dict(service='WPS', request='DescribeProcess', version='1.0.0', identifier='all')),
+        dict(name='ncdump', weight=4,
+             params=dict(execute, identifier='ncdump')),
+        dict(name='cchecker', weight=1,
+             params=dict(execute, identifier='cchecker',
+                         DataInputs=execute['DataInputs'] + ';test=cf:1.6;format=json')),
+        dict(name='ncdump-async', weight=2,
+             params=dict(execute, identifier='ncdump', storeExecuteResponse='true', status='true')),
+    ]
+
+
+def load_mix(filename):
+    with open(filename) as fp:
+        mix = json.load(fp)
+    for idx, entry in enumerate(mix):
+        entry.setdefault('name', 'request-{}'.format(idx))
+        entry.setdefault('weight', 1)
+        if 'params' not in entry and 'body' not in entry:
+            raise ValueError("request {} needs params or body".format(entry['name']))
+    return mix
+
+
+def _status(text):
+    """Returns the WPS status of an execute response document or ``None``."""
+    for status in ('ProcessSucceeded', 'ProcessFailed', 'ProcessStarted', 'ProcessAccepted', 'ProcessPaused'):
+        if ':{}'.format(status) in text or '<{}'.format(status) in text:
+            return status
+    return None
+
+
+def _exception_code(text):
+    start = text.find('exceptionCode="')
+    if start < 0:
+        return None
+    start += len('exceptionCode="')
+    return text[start:text.index('"', start)]
+
+
+def _status_location(text):
+    start = text.find('statusLocation="')
+    if start < 0:
+        return None
+    start += len('statusLocation="')
+    return text[start:text.index('"', start)].replace('&amp;', '&')
+
+
+class LoadTest(object):
+    """
+    :param url: WPS endpoint of the service.
+    :param mix: list of requests, see :func:`load_mix`.
+    :param poll_interval: seconds between requests of the status document of async processes.
+    :param timeout: seconds to wait for a response or an async process.
+    """
+
+    def __init__(self, url, mix, poll_interval=1.0, timeout=600, seed=None):
+        self.url = url
+        self.mix = mix
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def choose(self, count):
+        weights = [entry['weight'] for entry in self.mix]
+        return [self.random.choices(self.mix, weights)[0] for _ in range(count)]
+
+    def send(self, entry):
+        """Sends one request. Returns a dict with the name, latency, status and error of the request."""
+        result = dict(name=entry['name'], error=None, status=None)
+        start = time.perf_counter()
+        try:
+            if 'body' in entry:
+                resp = self.session.post(self.url, data=entry['body'], timeout=self.timeout,
+                                         headers={'Content-Type': 'text/xml'})
+            else:
+                resp = self.session.get(self.url, params=entry['params'], timeout=self.timeout)
+            result['latency'] = time.perf_counter() - start
+            text = resp.text
+            if resp.status_code != 200 or 'ExceptionReport' in text:
+                result['error'] = _exception_code(text) or 'HTTP {}'.format(resp.status_code)
+                return result
+            status = result['status'] = _status(text)
+            location = _status_location(text)
+            if location and status not in STATUS_FINISHED:
+                status = result['status'] = self.poll(location, start)
+                result['completion'] = time.perf_counter() - start
+            if status == 'ProcessFailed':
+                result['error'] = 'ProcessFailed'
+        except requests.RequestException as err:
+            result.setdefault('latency', time.perf_counter() - start)
+            result['error'] = type(err).__name__
+        return result
+
+    def poll(self, location, start):
+        while time.perf_counter() - start < self.timeout:
+            time.sleep(self.poll_interval)
+            resp = self.session.get(location, timeout=self.timeout)
+            if resp.status_code == 200:
+                status = _status(resp.text)
+                if status in STATUS_FINISHED:
+                    return status
+        return 'Timeout'
+
+    def run(self, count=100, concurrency=4, duration=None):
+        """
+        Sends ``count`` requests, or requests for ``duration`` seconds,
+        with ``concurrency`` clients. Returns the report of :func:`summarize`.
+        """
+        results = []
+        start = time.perf_counter()
+        if duration:
+            deadline = start + duration
+
+            def client():
+                while time.perf_counter() < deadline:
+                    with self._lock:
+                        entry = self.choose(1)[0]
+                    results.append(self.send(entry))
+
+            threads = [threading.Thread(target=client) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(self.send, self.choose(count)))
+        return summarize(results, time.perf_counter() - start, concurrency)
+
+
+def percentile(values, pct):
+    """Returns the ``pct`` percentile of ``values`` (nearest rank)."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(0, int(math.ceil(pct / 100.0 * len(values))) - 1)
+    return values[min(rank, len(values) - 1)]
+
+
+def _stats(results):
+    latencies = [result['latency'] for result in results if 'latency' in result]
+    completions = [result['completion'] for result in results if 'completion' in result]
+    errors = sum(1 for result in results if result['error'])
+    stats = OrderedDict([
+        ('requests', len(results)),
+        ('errors', errors),
+        ('error_rate', errors / float(len(results)) if results else 0.0),
+    ])
+    for pct in (50, 90, 95, 99):
+        stats['p{}'.format(pct)] = percentile(latencies, pct)
+    stats['max'] = max(latencies) if latencies else None
+    kinds = OrderedDict()
+    for result in results:
+        if result['error']:
+            kinds[result['error']] = kinds.get(result['error'], 0) + 1
+    stats['error_kinds'] = kinds
+    if completions:
+        stats['async_p50'] = percentile(completions, 50)
+        stats['async_p95'] = percentile(completions, 95)
+        stats['async_max'] = max(completions)
+    return stats
+
+
+def summarize(results, elapsed, concurrency):
+    """Returns throughput, latency percentiles and error rates, in total and by request name."""
+    by_name = OrderedDict()
+    for result in results:
+        by_name.setdefault(result['name'], []).append(result)
+    return OrderedDict([
+        ('concurrency', concurrency),
+        ('elapsed', elapsed),
+        ('throughput', len(results) / elapsed if elapsed else 0.0),
+        ('total', _stats(results)),
+        ('requests', OrderedDict((name, _stats(items)) for name, items in by_name.items())),
+    ])
+
+
+def _format(value):
+    if value is None:
+        return '-'
+    return '{:.3f}'.format(value)
+
+
+def print_report(report):
+    print("concurrency={concurrency}  elapsed={elapsed:.1f}s  throughput={throughput:.2f} req/s".format(**report))
+    print("{:<20} {:>8} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8} {:>10}".format(
+        'request', 'count', 'errors', 'p50', 'p90', 'p95', 'p99', 'max', 'async p95'))
+    rows = list(report['requests'].items()) + [('total', report['total'])]
+    for name, stats in rows:
+        print("{:<20} {:>8} {:>7} {:>8} {:>8} {:>8} {:>8} {:>8} {:>10}".format(
+            name, stats['requests'], stats['errors'], _format(stats['p50']), _format(stats['p90']),
+            _format(stats['p95']), _format(stats['p99']), _format(stats['max']),
+            _format(stats.get('async_p95'))))
+    if report['total']['error_kinds']:
+        print("errors: " + ", ".join("{}={}".format(kind, count)
+                                     for kind, count in report['total']['error_kinds'].items()))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description=__doc__.split('\n\n')[0])
+    parser.add_argument('url', nargs='?', default='http://localhost:5000/wps', help='WPS endpoint.')
+    parser.add_argument('--mix', help='json file with the request mix (default: synthetic mix).')
+    parser.add_argument('--dataset', help='dataset of the synthetic mix (default: generated 1 MB file).')
+    parser.add_argument('--concurrency', '-c', default='4',
+                        help='concurrent clients, a comma separated list runs one load test for each.')
+    parser.add_argument('--requests', '-n', type=int, default=100, help='number of requests.')
+    parser.add_argument('--duration', '-d', type=float, help='send requests for seconds instead.')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between status requests.')
+    parser.add_argument('--timeout', type=float, default=600, help='timeout of requests and async processes.')
+    parser.add_argument('--seed', type=int, help='seed of the random request order.')
+    parser.add_argument('--output', help='write the reports as json to this file.')
+    args = parser.parse_args(args)
+
+    if args.mix:
+        mix = load_mix(args.mix)
+    else:
+        dataset = args.dataset or generate_corpus(os.path.join('benchmarks', 'corpus'), sizes=(1,))[0]
+        mix = default_mix(dataset)
+
+    reports = []
+    for concurrency in [int(value) for value in args.concurrency.split(',')]:
+        load_test = LoadTest(args.url, mix, args.poll_interval, args.timeout, args.seed)
+        report = load_test.run(args.requests, concurrency, args.duration)
+        print_report(report)
+        print('')
+        reports.append(report)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(reports, fp, indent=2)
+    return 1 if any(report['total']['errors'] for report in reports) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Benchmarks of the WPS processes with the in-process WPS test client.
+
+Run from the repository root::
+
+  $ python -m benchmarks.run --sizes 1,10 --repeat 5 --save-baseline default
+  $ python -m benchmarks.run --sizes 1,10 --repeat 5 --compare default
+
+The latency of each process is measured for each generated file. Results are
+compared with a stored baseline in ``benchmarks/baselines``, the command exits
+with status 1 if the median latency of a benchmark is slower than the baseline
+by more than the tolerance. Baselines depend on the machine and are not committed,
+the comparison is skipped if the baseline does not exist.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import datetime
+import importlib
+import statistics
+from collections import OrderedDict
+
+from pywps import Service
+from pywps import configuration
+
+from tests.common import client_for
+from benchmarks.corpus import generate_corpus
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_CFG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'hummingbird', 'default.cfg')
+
+# process identifier -> (module, class, extra data inputs, corpus kind, required command)
+PROCESSES = OrderedDict([
+    ('ncdump', ('hummingbird.processes.wps_ncdump', 'NCDump', '', 'cf', None)),
+    ('cchecker', ('hummingbird.processes.wps_compliance_checker', 'CChecker',
+                  'test=cf:1.6;criteria=normal;format=json', 'cf', None)),
+    ('cfchecker', ('hummingbird.processes.wps_cfchecker', 'CFChecker', 'cf_version=auto', 'cf', 'cfchecks')),
+    ('spotchecker', ('hummingbird.processes.wps_spotchecker', 'SpotChecker', 'test=CF-1.6', 'cf', None)),
+    ('cmor_checker', ('hummingbird.processes.wps_cmor_checker', 'CMORChecker', '', 'cmip6', 'PrePARE')),
+])
+
+
+def create_client(identifier):
+    module, classname = PROCESSES[identifier][:2]
+    process = getattr(importlib.import_module(module), classname)()
+    client = client_for(Service(processes=[process], cfgfiles=[DEFAULT_CFG]))
+    # measure the checkers, not the result cache
+    configuration.CONFIG.set('cache', 'enabled', 'false')
+    return client
+
+
+def execute(client, identifier, filename):
+    datainputs = "dataset=@xlink:href=file://{0};{1}".format(filename, PROCESSES[identifier][2])
+    start = time.perf_counter()
+    resp = client.get(
+        service='WPS', request='Execute', version='1.0.0',
+        identifier=identifier,
+        datainputs=datainputs.rstrip(';'))
+    latency = time.perf_counter() - start
+    if resp.status_code != 200 or not resp.xpath('/wps:ExecuteResponse/wps:Status/wps:ProcessSucceeded'):
+        raise RuntimeError("{} failed on {}".format(identifier, os.path.basename(filename)))
+    return latency
+
+
+def run_benchmark(identifier, filename, repeat=5, warmup=1):
+    """Returns the latency statistics of ``repeat`` executions of a process."""
+    client = create_client(identifier)
+    for _ in range(warmup):
+        execute(client, identifier, filename)
+    latencies = [execute(client, identifier, filename) for _ in range(repeat)]
+    size_mb = os.path.getsize(filename) / 1024.0 / 1024.0
+    median = statistics.median(latencies)
+    return OrderedDict([
+        ('file', os.path.basename(filename)),
+        ('size_mb', round(size_mb, 3)),
+        ('runs', repeat),
+        ('min', min(latencies)),
+        ('median', median),
+        ('mean', statistics.mean(latencies)),
+        ('max', max(latencies)),
+        ('throughput_mb_s', size_mb / median if median else None),
+    ])
+
+
+def versions():
+    import pywps
+    import compliance_checker
+    from hummingbird import __version__
+    return dict(
+        hummingbird=__version__,
+        pywps=pywps.__version__,
+        compliance_checker=compliance_checker.__version__,
+        python=sys.version.split()[0],
+    )
+
+
+def run(identifiers, corpus_path, sizes, variables, attributes, repeat, warmup=1):
+    """Runs the benchmarks, returns a dict with the results and the software versions."""
+    results = OrderedDict()
+    for identifier in identifiers:
+        kind, command = PROCESSES[identifier][3:]
+        if command and not shutil.which(command):
+            print("skipping {}: {} not installed".format(identifier, command))
+            continue
+        for filename in generate_corpus(corpus_path, sizes, variables, attributes, kind):
+            key = '{}/{}'.format(identifier, os.path.basename(filename))
+            try:
+                results[key] = run_benchmark(identifier, filename, repeat, warmup)
+            except Exception as err:
+                print("skipping {}: {}".format(key, err))
+                continue
+            print("{:<50} median={:8.3f}s  min={:8.3f}s  {:8.2f} MB/s".format(
+                key, results[key]['median'], results[key]['min'], results[key]['throughput_mb_s'] or 0))
+    return OrderedDict([
+        ('created', datetime.datetime.utcnow().isoformat()),
+        ('host', socket.gethostname()),
+        ('versions', versions()),
+        ('results', results),
+    ])
+
+
+def compare(report, baseline, tolerance=0.2):
+    """
+    Compares the median latencies with a baseline.
+    Returns a list of tuples ``(key, baseline median, median, ratio, regression)``.
+    """
+    rows = []
+    for key, result in report['results'].items():
+        base = baseline['results'].get(key)
+        if not base:
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        rows.append((key, base['median'], result['median'], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def baseline_file(name):
+    if os.path.sep in name or name.endswith('.json'):
+        return name
+    return os.path.join(BASELINES_PATH, name + '.json')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--processes', default=','.join(PROCESSES),
+                        help='comma separated process identifiers (default: all).')
+    parser.add_argument('--sizes', default='1', help='comma separated file sizes in MB (default: 1).')
+    parser.add_argument('--variables', type=int, default=1, help='data variables per file.')
+    parser.add_argument('--attributes', type=int, default=10, help='extra attributes per variable.')
+    parser.add_argument('--repeat', type=int, default=5, help='measured runs per benchmark.')
+    parser.add_argument('--warmup', type=int, default=1, help='runs before measuring.')
+    parser.add_argument('--corpus', default=os.path.join('benchmarks', 'corpus'),
+                        help='directory of the generated files.')
+    parser.add_argument('--output', help='write the results as json to this file.')
+    parser.add_argument('--save-baseline', metavar='NAME', help='store the results as baseline.')
+    parser.add_argument('--compare', metavar='NAME', help='compare the results with a stored baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown of the median latency (default: 0.2 = 20%%).')
+    args = parser.parse_args(args)
+
+    identifiers = [name.strip() for name in args.processes.split(',') if name.strip()]
+    unknown = set(identifiers) - set(PROCESSES)
+    if unknown:
+        parser.error("unknown processes: {}".format(', '.join(sorted(unknown))))
+    sizes = [float(size) if '.' in size else int(size) for size in args.sizes.split(',')]
+    if args.compare and not os.path.isfile(baseline_file(args.compare)):
+        print("baseline {} not found, skipping the comparison. Store a baseline with --save-baseline {}".format(
+            baseline_file(args.compare), args.compare))
+        args.compare = None
+
+    report = run(identifiers, args.corpus, sizes, args.variables, args.attributes, args.repeat, args.warmup)
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    if args.save_baseline:
+        filename = baseline_file(args.save_baseline)
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, 'w') as fp:
+            json.dump(report, fp, indent=2)
+        print("baseline written to {}".format(filename))
+    if args.compare:
+        with open(baseline_file(args.compare)) as fp:
+            baseline = json.load(fp)
+        regressions = 0
+        print("\n{:<50} {:>10} {:>10} {:>8}".format('benchmark', 'baseline', 'current', 'ratio'))
+        for key, base_median, median, ratio, regression in compare(report, baseline, args.tolerance):
+            regressions += regression
+            print("{:<50} {:>9.3f}s {:>9.3f}s {:>7.2f}x{}".format(
+                key, base_median, median, ratio, '  REGRESSION' if regression else ''))
+        if regressions:
+            print("{} benchmarks slower than the baseline by more than {:.0%}".format(regressions, args.tolerance))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
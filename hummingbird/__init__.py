@@ -4,4 +4,13 @@
 
 from .__version__ import __author__, __email__, __version__  # noqa: F401
 
-from .wsgi import application  # noqa: F401
+from .utils import lazy_attributes
+
+
+def _application():
+    from .wsgi import application
+    return application
+
+
+# the application is created on first use, importing the package stays cheap
+lazy_attributes(__name__, application=_application)
@@ -0,0 +1,121 @@
+"""
+Tar archives of reports written while the checks are running.
+
+Each report is appended to the archive as soon as its check has finished and
+the archive is flushed, so a partial archive can already be downloaded while
+the process is running. The compression is configured with:
+
+.. code-block:: ini
+
+  [archive]
+  # none, gz or zstd (needs the zstandard package)
+  compression = gz
+  level = 6
+"""
+
+import os
+import gzip
+import tarfile
+
+from pywps import Format
+from pywps import configuration
+
+from . import config
+from .utils import make_dirs
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+# compression -> (file extension, output format)
+COMPRESSIONS = {
+    'none': ('.tar', Format('application/x-tar', extension='.tar')),
+    'gz': ('.tar.gz', Format('application/x-tar-gz', extension='.tar.gz')),
+    'zstd': ('.tar.zst', Format('application/x-tar-zstd', extension='.tar.zst')),
+}
+
+
+def archive_formats(default):
+    """Returns the output formats of the archives, the format of ``default`` compression first."""
+    return [COMPRESSIONS[default][1]] + [COMPRESSIONS[name][1] for name in ('none', 'gz', 'zstd') if name != default]
+
+
+def _compression(default):
+    compression = config.get_config_value('archive', 'compression', default).lower()
+    if compression not in COMPRESSIONS:
+        LOGGER.warning("Invalid value for [archive] compression: %s", compression)
+        return default
+    if compression == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            LOGGER.warning("zstandard is not installed, using gz compression")
+            return 'gz'
+    return compression
+
+
+class ReportArchive(object):
+    """
+    Tar archive of reports, the compression is read from the ``[archive]`` section.
+
+    :param filename: file name of the archive without extension.
+    :param compression: compression used if none is configured (``none``, ``gz`` or ``zstd``).
+    """
+
+    def __init__(self, filename, compression='gz'):
+        self.compression = _compression(compression)
+        extension, self.data_format = COMPRESSIONS[self.compression]
+        self.filename = filename + extension
+        level = config.get_int('archive', 'level', None)
+        self._raw = open(self.filename, 'wb')
+        if self.compression == 'gz':
+            self._fileobj = gzip.GzipFile(
+                filename='', mode='wb', fileobj=self._raw, compresslevel=6 if level is None else level)
+        elif self.compression == 'zstd':
+            import zstandard
+            self._fileobj = zstandard.ZstdCompressor(level=3 if level is None else level).stream_writer(self._raw)
+        else:
+            self._fileobj = self._raw
+        self._tar = tarfile.open(fileobj=self._fileobj, mode='w')
+        self._partial = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, path, arcname=None):
+        """Appends a file or directory and flushes the archive."""
+        self._tar.add(path, arcname=arcname)
+        if self.compression == 'zstd':
+            import zstandard
+            self._fileobj.flush(zstandard.FLUSH_BLOCK)
+        elif self._fileobj is not self._raw:
+            self._fileobj.flush()
+        self._raw.flush()
+
+    def publish(self, uuid):
+        """
+        Links the archive into the output directory of the request ``uuid``
+        and returns its URL or ``None`` if the archive could not be linked.
+        """
+        target = os.path.join(configuration.get_config_value('server', 'outputpath'), str(uuid))
+        name = 'partial-' + os.path.basename(self.filename)
+        try:
+            make_dirs(target)
+            os.link(self.filename, os.path.join(target, name))
+        except OSError as err:
+            LOGGER.warning("Could not publish partial archive: %s", err)
+            return None
+        self._partial = os.path.join(target, name)
+        return "{}/{}/{}".format(configuration.get_config_value('server', 'outputurl').rstrip('/'), uuid, name)
+
+    def close(self):
+        self._tar.close()
+        if self._fileobj is not self._raw:
+            self._fileobj.close()
+        self._raw.close()
+        if self._partial:
+            # the complete archive is stored as process output
+            os.remove(self._partial)
+            self._partial = None
@@ -0,0 +1,202 @@
+"""
+Content addressed cache for checker results.
+
+A cache key is built from the sha256 checksum of the dataset and the
+checker options (name, version, criteria, output format, ...). Entries
+are plain files stored below the configured cache directory with an
+optional json sidecar holding extra information like the check status.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from . import config
+from .utils import make_dirs
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_cache = None
+
+
+def checksum(filename):
+    """Returns the sha256 checksum of the file content."""
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ResultCache(object):
+    """
+    Stores checker reports on disk with size- and age-based eviction.
+
+    :param directory: directory of the cache entries.
+    :param max_size: maximum size of the cache in MB (None means unlimited).
+    :param max_age: maximum age of an entry in seconds (None means unlimited).
+    """
+
+    def __init__(self, directory, max_size=None, max_age=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        make_dirs(self.directory)
+
+    def key(self, dataset, *options):
+        """
+        Returns the cache key for a dataset and checker options.
+        Returns ``None`` when the dataset is not a local file (like an OpenDAP URL).
+        """
+        if not dataset or not os.path.isfile(dataset):
+            return None
+        sha = hashlib.sha256(checksum(dataset).encode('utf-8'))
+        for option in options:
+            sha.update(b'\0')
+            sha.update(str(option).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _expired(self, path, now=None):
+        if not self.max_age:
+            return False
+        now = now or time.time()
+        return now - os.path.getmtime(path) > self.max_age
+
+    def get(self, key):
+        """
+        Returns a tuple ``(filename, info)`` of a cached entry
+        or ``None`` if there is no valid entry for the key.
+        """
+        if not key:
+            return None
+        path = self._path(key)
+        try:
+            if self._expired(path):
+                self._remove(path)
+                return None
+            with open(path + '.json') as fp:
+                info = json.load(fp)
+            # keep modification time as creation time, use access time for lru
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        except (OSError, ValueError):
+            return None
+        LOGGER.debug("cache hit: %s", key)
+        return path, info
+
+    def get_file(self, key, output_filename):
+        """
+        Copies a cached entry to ``output_filename``.
+        Returns the info of the entry or ``None`` on a cache miss.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        path, info = entry
+        shutil.copyfile(path, output_filename)
+        return info
+
+    def put(self, key, filename, **info):
+        """Adds the file as entry for the key."""
+        if not key:
+            return
+        path = self._path(key)
+        make_dirs(os.path.dirname(path))
+        try:
+            # write to temporary files first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            os.close(fd)
+            shutil.copyfile(filename, tmp_path)
+            with open(tmp_path + '.json', 'w') as fp:
+                json.dump(info, fp)
+            os.replace(tmp_path + '.json', path + '.json')
+            os.replace(tmp_path, path)
+        except OSError:
+            LOGGER.exception("Could not add entry to cache.")
+            return
+        self.evict()
+
+    def put_data(self, key, data, **info):
+        """Adds bytes as entry for the key."""
+        if not key:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        try:
+            self.put(key, tmp_path, **info)
+        finally:
+            os.remove(tmp_path)
+
+    def _remove(self, path):
+        for filename in (path, path + '.json'):
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def entries(self):
+        """Returns a list of ``(path, stat)`` of all cache entries."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json') or name.startswith('tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    continue
+        return entries
+
+    def evict(self):
+        """Removes expired entries and the least recently used ones above max size."""
+        with _lock:
+            now = time.time()
+            entries = []
+            for path, stat in self.entries():
+                if self._expired(path, now):
+                    self._remove(path)
+                else:
+                    entries.append((path, stat))
+            if not self.max_size:
+                return
+            max_bytes = self.max_size * 1024 * 1024
+            total = sum(stat.st_size for _, stat in entries)
+            for path, stat in sorted(entries, key=lambda entry: entry[1].st_atime):
+                if total <= max_bytes:
+                    break
+                self._remove(path)
+                total -= stat.st_size
+
+    def clear(self):
+        with _lock:
+            for path, _ in self.entries():
+                self._remove(path)
+
+
+def get_cache():
+    """
+    Returns the result cache configured in the ``[cache]`` section
+    or ``None`` if caching is disabled.
+    """
+    global _cache
+    if not config.get_bool('cache', 'enabled'):
+        return None
+    options = (
+        os.path.join(config.cache_path(), 'results'),
+        config.get_size_mb('cache', 'max_size'),
+        config.get_int('cache', 'max_age', None))
+    if _cache is None or (_cache.directory, _cache.max_size, _cache.max_age) != options:
+        _cache = ResultCache(*options)
+    return _cache
@@ -0,0 +1,168 @@
+"""
+In-memory cache of the GetCapabilities and DescribeProcess documents.
+
+The documents depend only on the configuration and the process definitions.
+They are rendered once, when the service starts for the configured languages,
+and served from memory with ``ETag`` and ``Last-Modified`` headers. Clients
+sending ``If-None-Match`` or ``If-Modified-Since`` get a ``304 Not Modified``.
+When a configuration file changes the configuration is loaded again and the
+cache is cleared. Changed processes need a reload of the service.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from email.utils import formatdate, parsedate_tz, mktime_tz
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.urls import url_decode
+
+from pywps import configuration
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+# lower case request parameters of the cache key
+KEY_PARAMS = ('request', 'version', 'acceptversions', 'language', 'identifier')
+CACHED_REQUESTS = ('getcapabilities', 'describeprocess')
+
+
+def _params(query_args):
+    params = {}
+    for key, value in query_args.items():
+        params[key.lower()] = value
+    return params
+
+
+class CapabilitiesCache(object):
+    """
+    WSGI middleware caching the GetCapabilities and DescribeProcess responses of ``app``.
+
+    :param app: PyWPS service.
+    :param config_files: configuration files of the service, the configuration is loaded again
+                         and the cache is cleared when one of them changes.
+    """
+
+    def __init__(self, app, config_files=None):
+        self.app = app
+        self.config_files = [path for path in (config_files or []) if path]
+        self._mtimes = self._config_mtimes()
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # the job queue workers use the wrapped PyWPS service
+        return getattr(self.app, name)
+
+    def _config_mtimes(self):
+        mtimes = []
+        for path in self.config_files:
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _check_config(self):
+        mtimes = self._config_mtimes()
+        if mtimes != self._mtimes:
+            LOGGER.info("configuration changed, reloading configuration and clearing capabilities cache")
+            self._mtimes = mtimes
+            configuration.load_configuration(self.config_files)
+            self.clear()
+
+    def cache_key(self, environ):
+        """Returns the cache key of a request or ``None`` if the request is not cached."""
+        if environ.get('REQUEST_METHOD', 'GET') != 'GET':
+            return None
+        params = _params(url_decode(environ.get('QUERY_STRING', '')))
+        if params.get('service', '').lower() != 'wps' or params.get('request', '').lower() not in CACHED_REQUESTS:
+            return None
+        return (environ.get('PATH_INFO', ''),) + tuple(
+            params.get(name, '').lower() if name == 'request' else params.get(name, '') for name in KEY_PARAMS)
+
+    def render(self, environ):
+        """Returns a tuple ``(status, headers, body)`` of the wrapped application."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+            return lambda data: None
+
+        chunks = self.app(environ, start_response)
+        try:
+            body = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        return response['status'], response['headers'], body
+
+    def get(self, key, environ):
+        """Returns the cached response of ``key``, rendering it if needed."""
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is not None:
+            return entry
+        status, headers, body = self.render(environ)
+        if not status.startswith('200'):
+            return status, headers, body, None, None
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        last_modified = formatdate(time.time(), usegmt=True)
+        headers = [(name, value) for name, value in headers
+                   if name.lower() not in ('etag', 'last-modified', 'content-length')]
+        headers.extend([
+            ('ETag', etag),
+            ('Last-Modified', last_modified),
+            ('Content-Length', str(len(body))),
+        ])
+        entry = (status, headers, body, etag, last_modified)
+        with self._lock:
+            self._cache[key] = entry
+        return entry
+
+    def prerender(self, path='/wps'):
+        """Renders the documents of all processes for the configured languages."""
+        languages = configuration.get_config_value('server', 'language') or ''
+        languages = [lang.strip() for lang in languages.split(',') if lang.strip()] or ['']
+        for language in languages:
+            queries = [
+                dict(service='WPS', request='GetCapabilities'),
+                dict(service='WPS', request='DescribeProcess', version='1.0.0', identifier='all'),
+            ]
+            for query in queries:
+                if language != languages[0]:
+                    query['language'] = language
+                environ = EnvironBuilder(path=path, query_string=query).get_environ()
+                try:
+                    self.get(self.cache_key(environ), environ)
+                except Exception:
+                    LOGGER.exception("Could not render %s", query['request'])
+
+    def _not_modified(self, environ, etag, last_modified):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            since = parsedate_tz(if_modified_since)
+            if since is not None:
+                return mktime_tz(since) >= mktime_tz(parsedate_tz(last_modified))
+        return False
+
+    def __call__(self, environ, start_response):
+        key = self.cache_key(environ)
+        if key is None:
+            return self.app(environ, start_response)
+        self._check_config()
+        status, headers, body, etag, last_modified = self.get(key, environ)
+        if etag and self._not_modified(environ, etag, last_modified):
+            start_response('304 Not Modified', [('ETag', etag), ('Last-Modified', last_modified)])
+            return []
+        start_response(status, headers)
+        return [body]
@@ -0,0 +1,102 @@
+"""
+Reads lists of datasets from manifest files and THREDDS catalogs.
+
+Only HTTP and OpenDAP URLs are accepted, manifests are uploaded by clients
+and must not give access to files of the server.
+"""
+
+from urllib.parse import urljoin
+import xml.etree.ElementTree as ET
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+THREDDS_NS = '{http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0}'
+
+
+def is_thredds_catalog(filename):
+    with open(filename, 'rb') as fp:
+        head = fp.read(2048)
+    return b'InvCatalog' in head and b'<catalog' in head
+
+
+def check_url(url):
+    """Raises :class:`ValueError` if ``url`` is not an HTTP or OpenDAP URL."""
+    if not url.lower().startswith(('http://', 'https://')):
+        raise ValueError("Only http and OpenDAP URLs are allowed: {}".format(url))
+    return url
+
+
+def read_manifest(filename):
+    """Returns the dataset URLs of a manifest file with one URL per line."""
+    datasets = []
+    with open(filename) as fp:
+        for line in fp:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                datasets.append(line)
+    return datasets
+
+
+def _service_bases(root):
+    """Returns a dict of service names and base paths of OpenDAP services."""
+    bases = {}
+    for service in root.iter(THREDDS_NS + 'service'):
+        if service.get('serviceType', '').upper() == 'OPENDAP':
+            bases[service.get('name')] = service.get('base', '')
+    return bases
+
+
+def _service_name(elem, inherited):
+    name = elem.get('serviceName')
+    if name:
+        return name
+    for metadata in elem.findall(THREDDS_NS + 'metadata'):
+        service_name = metadata.find(THREDDS_NS + 'serviceName')
+        if service_name is not None and service_name.text:
+            return service_name.text.strip()
+    return inherited
+
+
+def read_thredds_catalog(filename, catalog_url):
+    """
+    Returns the OpenDAP URLs of all datasets in a THREDDS catalog.
+    Catalog references are not followed.
+    """
+    root = ET.parse(filename).getroot()
+    bases = _service_bases(root)
+    if not bases:
+        LOGGER.warning("THREDDS catalog has no OpenDAP service: %s", catalog_url)
+        return []
+    default_base = list(bases.values())[0]
+    urls = []
+
+    def walk(elem, service_name):
+        for dataset in elem.findall(THREDDS_NS + 'dataset'):
+            name = _service_name(dataset, service_name)
+            url_path = dataset.get('urlPath')
+            access_paths = [
+                (access.get('serviceName'), access.get('urlPath'))
+                for access in dataset.findall(THREDDS_NS + 'access')]
+            if url_path:
+                access_paths.insert(0, (name, url_path))
+            for access_service, path in access_paths:
+                if access_service in bases or (access_service is None and path):
+                    urls.append(urljoin(catalog_url, bases.get(access_service, default_base) + path))
+                    break
+            walk(dataset, name)
+
+    walk(root, _service_name(root, None))
+    return urls
+
+
+def read_datasets(filename, url=None):
+    """
+    Returns the datasets listed in a manifest file or THREDDS catalog.
+    Raises :class:`ValueError` if a dataset is not an HTTP or OpenDAP URL.
+    """
+    if is_thredds_catalog(filename):
+        datasets = read_thredds_catalog(filename, url or '')
+    else:
+        datasets = read_manifest(filename)
+    return [check_url(dataset) for dataset in datasets]
@@ -0,0 +1,165 @@
+"""
+Native ``ncdump -h`` replacement.
+
+Builds the CDL header of a NetCDF dataset with the netCDF4 metadata API.
+Only dimensions, variables, attributes and user defined types are read,
+variable data is never accessed.
+"""
+
+import os
+
+import numpy as np
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+# numpy dtype -> (CDL type, CDL attribute value suffix)
+CDL_TYPES = {
+    'i1': ('byte', 'b'),
+    'u1': ('ubyte', 'UB'),
+    'i2': ('short', 's'),
+    'u2': ('ushort', 'US'),
+    'i4': ('int', ''),
+    'u4': ('uint', 'U'),
+    'i8': ('int64', 'LL'),
+    'u8': ('uint64', 'ULL'),
+    'f4': ('float', 'f'),
+    'f8': ('double', ''),
+    'S1': ('char', ''),
+}
+
+
+def escape(value):
+    """Escapes a string for CDL."""
+    value = value.replace('\\', '\\\\').replace('"', '\\"')
+    value = value.replace('\n', '\\n').replace('\t', '\\t')
+    return '"{}"'.format(value)
+
+
+def cdl_type(dtype):
+    """Returns the CDL type name of a netCDF4 variable or attribute type."""
+    if dtype is str:
+        return 'string'
+    if not isinstance(dtype, np.dtype) and hasattr(dtype, 'dtype'):
+        # user defined type (compound, vlen, enum) or vlen string
+        if dtype.dtype is str:
+            return 'string'
+        return dtype.name
+    dtype = np.dtype(dtype)
+    key = dtype.str[1:]
+    if key in CDL_TYPES:
+        return CDL_TYPES[key][0]
+    if dtype.kind in 'SU':
+        return 'char'
+    return dtype.name
+
+
+def format_number(value, dtype):
+    key = dtype.str[1:]
+    suffix = CDL_TYPES.get(key, ('', ''))[1]
+    if dtype.kind == 'f':
+        if np.isnan(value):
+            text = 'NaN'
+        elif np.isinf(value):
+            text = 'Infinity' if value > 0 else '-Infinity'
+        else:
+            # shortest representation which round trips for the given precision
+            text = str(dtype.type(value))
+    else:
+        text = str(int(value))
+    return text + suffix
+
+
+def format_attribute(value):
+    """Returns a tuple ``(type_prefix, cdl_value)`` of an attribute value."""
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    if isinstance(value, str):
+        return '', escape(value)
+    if isinstance(value, (list, tuple)) and value and all(isinstance(v, str) for v in value):
+        return 'string ', ', '.join(escape(v) for v in value)
+    array = np.atleast_1d(np.asarray(value))
+    if array.dtype.kind in 'SU':
+        return '', escape(''.join(str(v) for v in array.tolist()))
+    if array.dtype.kind == 'O':
+        return 'string ', ', '.join(escape(str(v)) for v in array.tolist())
+    return '', ', '.join(format_number(v, array.dtype) for v in array)
+
+
+def _attributes(obj, prefix, indent):
+    lines = []
+    for name in obj.ncattrs():
+        try:
+            value = obj.getncattr(name)
+        except Exception as err:
+            LOGGER.debug("Could not read attribute %s: %s", name, err)
+            continue
+        type_prefix, text = format_attribute(value)
+        lines.append('{}\t\t{}{}:{} = {} ;'.format(indent, type_prefix, prefix, name, text))
+    return lines
+
+
+def _types(group, indent):
+    lines = []
+    for enum in getattr(group, 'enumtypes', {}).values():
+        base = cdl_type(enum.dtype)
+        members = ', '.join('{} = {}'.format(k, v) for k, v in enum.enum_dict.items())
+        lines.append('{}  {} enum {} {{{}}} ;'.format(indent, base, enum.name, members))
+    for vltype in getattr(group, 'vltypes', {}).values():
+        lines.append('{}  {}(*) {} ;'.format(indent, cdl_type(vltype.dtype), vltype.name))
+    for cmptype in getattr(group, 'cmptypes', {}).values():
+        lines.append('{}  compound {} {{'.format(indent, cmptype.name))
+        for field in cmptype.dtype.names:
+            lines.append('{}    {} {} ;'.format(indent, cdl_type(cmptype.dtype.fields[field][0]), field))
+        lines.append('{}  }}; // {}'.format(indent, cmptype.name))
+    if lines:
+        lines.insert(0, '{}types:'.format(indent))
+    return lines
+
+
+def _group(group, indent=''):
+    lines = _types(group, indent)
+    if group.dimensions:
+        lines.append('{}dimensions:'.format(indent))
+        for name, dim in group.dimensions.items():
+            if dim.isunlimited():
+                lines.append('{}\t{} = UNLIMITED ; // ({} currently)'.format(indent, name, len(dim)))
+            else:
+                lines.append('{}\t{} = {} ;'.format(indent, name, len(dim)))
+    if group.variables:
+        lines.append('{}variables:'.format(indent))
+        for name, var in group.variables.items():
+            if var.dimensions:
+                decl = '{} {}({})'.format(cdl_type(var.datatype), name, ', '.join(var.dimensions))
+            else:
+                decl = '{} {}'.format(cdl_type(var.datatype), name)
+            lines.append('{}\t{} ;'.format(indent, decl))
+            lines.extend(_attributes(var, name, indent))
+    global_attrs = _attributes(group, '', indent)
+    if global_attrs:
+        scope = 'global' if group.parent is None else 'group'
+        lines.append('')
+        lines.append('{}// {} attributes:'.format(indent, scope))
+        lines.extend(global_attrs)
+    for name, child in group.groups.items():
+        child_indent = indent + '  '
+        lines.append('')
+        lines.append('{}group: {} {{'.format(indent, name))
+        lines.extend(_group(child, child_indent))
+        lines.append('{}  }} // group {}'.format(indent, name))
+    return lines
+
+
+def dump_header(dataset, name=None):
+    """
+    Returns the CDL header of ``dataset`` (a filename or OpenDAP URL) as list of lines,
+    equivalent to the output of ``ncdump -h``. The dataset name defaults to the basename
+    of the dataset.
+    """
+    from netCDF4 import Dataset
+    name = name or os.path.basename(dataset)
+    with Dataset(dataset, 'r') as ds:
+        lines = ['netcdf {} {{'.format(name)]
+        lines.extend(_group(ds))
+        lines.append('}')
+    return ['{}\n'.format(line) for line in lines]
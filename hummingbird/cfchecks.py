@@ -0,0 +1,165 @@
+"""
+In-process execution of the CEDA CF checker.
+
+The ``cfchecker`` package is imported once in each worker of a process pool
+and the CF tables are parsed once per worker. The report, which ``cfchecks``
+prints to stdout, is captured into a buffer. Running the checks in worker
+processes keeps stdout redirection and checker state away from the threads
+of the service.
+"""
+
+import io
+import time
+import threading
+import importlib.util
+from xml.sax import make_parser
+from xml.sax.handler import feature_namespaces
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import config
+from . import cftables
+from .command import trace
+from .metrics import SUBPROCESS_DURATION
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+_lock = threading.Lock()
+_pool = None
+_pool_tables = None
+_broken = False
+
+
+def available():
+    """Returns True if the cfchecker package can be imported."""
+    return not _broken and importlib.util.find_spec('cfchecker') is not None
+
+
+# table source -> content handler of the table parsed when the worker started
+_tables = {}
+
+
+class _TableParser(object):
+    """
+    XML parser used by the CF checker in the worker processes. The tables parsed
+    when the worker started are copied into the content handler of the checker
+    instead of parsing them again for each file.
+    """
+
+    def __init__(self):
+        self._parser = make_parser()
+        self._handler = None
+
+    def setFeature(self, name, state):
+        self._parser.setFeature(name, state)
+
+    def setContentHandler(self, handler):
+        self._handler = handler
+        self._parser.setContentHandler(handler)
+
+    def parse(self, source):
+        table = _tables.get(source)
+        if table is None:
+            self._parser.parse(source)
+        else:
+            vars(self._handler).update(vars(table))
+
+
+def _parse_table(handler, source):
+    parser = make_parser()
+    parser.setFeature(feature_namespaces, 0)
+    parser.setContentHandler(handler)
+    parser.parse(source)
+    return handler
+
+
+def _init_worker(tables):
+    """Imports the CF checker and parses the CF tables once per worker process."""
+    from cfchecker import cfchecks
+    _tables.clear()
+    _tables.update({
+        tables['standard_names']: _parse_table(cfchecks.ConstructDict(), tables['standard_names']),
+        tables['area_types']: _parse_table(cfchecks.ConstructList(), tables['area_types']),
+        tables['region_names']: _parse_table(cfchecks.ConstructList(), tables['region_names']),
+    })
+    # only patched inside the worker processes
+    cfchecks.make_parser = _TableParser
+
+
+def _run_checker(nc_file, version, tables):
+    from cfchecker import cfchecks
+    report = io.StringIO()
+    with redirect_stdout(report):
+        if version == 'auto':
+            cf_version = cfchecks.CFVersion()
+        else:
+            cf_version = cfchecks.CFVersion(version)
+        inst = cfchecks.CFChecker(
+            version=cf_version,
+            cfStandardNamesXML=tables['standard_names'],
+            cfAreaTypesXML=tables['area_types'],
+            cfRegionNamesXML=tables['region_names'])
+        try:
+            inst.checker(nc_file)
+        except cfchecks.FatalCheckerError:
+            print("Checking of file %s aborted due to error" % nc_file)
+    return report.getvalue().encode('utf-8')
+
+
+def _checker_tables():
+    """Returns the local CF tables, or the URLs of the missing tables."""
+    tables = {name: url for name, (_, url) in cftables.CF_TABLES.items()}
+    tables.update(cftables.local_tables())
+    return tables
+
+
+def _get_pool(tables):
+    global _pool, _pool_tables
+    with _lock:
+        if _pool is None or _pool_tables != tables:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=config.max_workers(),
+                initializer=_init_worker,
+                initargs=(tables,))
+            _pool_tables = tables
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def check(nc_file, version):
+    """
+    Runs the CF checker on ``nc_file`` in a warm worker process
+    and returns the report as bytes.
+    Returns ``None`` if the in-process checker is not available or failed.
+    """
+    global _broken
+    if not available():
+        return None
+    start = time.time()
+    try:
+        tables = _checker_tables()
+        report = _get_pool(tables).submit(_run_checker, nc_file, version, tables).result()
+        duration = time.time() - start
+        SUBPROCESS_DURATION.observe(duration, command='cfchecks-inprocess')
+        trace(dict(command='cfchecks-inprocess', args=[nc_file, version], start=start,
+                   wall_time=round(duration, 6), output_size=len(report)))
+        return report
+    except BrokenProcessPool:
+        # don't start new workers which might fail the same way
+        LOGGER.warning("cfchecks worker died, using cfchecks command from now on.")
+        _broken = True
+        shutdown()
+    except Exception:
+        LOGGER.exception("in-process cfchecks failed, using cfchecks command.")
+    return None
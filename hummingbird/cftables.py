@@ -0,0 +1,157 @@
+"""
+Local copies of the CF standard name, area type and region name tables
+used by ``cfchecks``.
+
+The tables are downloaded once into the cache directory, stored with their
+table version in the filename and passed as local files to each ``cfchecks``
+run. This avoids downloading the tables for each check and allows to run
+the checks on nodes without internet access.
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import OrderedDict
+import xml.etree.ElementTree as ET
+
+import requests
+
+from . import config
+from .utils import make_dirs
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+CF_TABLES = OrderedDict([
+    ('standard_names', (
+        '--cf_standard_names',
+        'http://cfconventions.org/Data/cf-standard-names/current/src/cf-standard-name-table.xml')),
+    ('area_types', (
+        '--area_types',
+        'http://cfconventions.org/Data/area-type-table/current/src/area-type-table.xml')),
+    ('region_names', (
+        '--region_names',
+        'http://cfconventions.org/Data/standardized-region-list/standardized-region-list.xml')),
+])
+
+INDEX_FILE = 'tables.json'
+
+_lock = threading.Lock()
+_fetched = False
+
+
+def tables_path():
+    return os.path.join(config.cache_path(), 'cf-tables')
+
+
+def table_version(filename):
+    """Returns the ``version_number`` of a CF table without parsing the whole file."""
+    for _, elem in ET.iterparse(filename, events=('end',)):
+        if elem.tag == 'version_number':
+            return (elem.text or '').strip()
+    return None
+
+
+def _read_index(path):
+    try:
+        with open(os.path.join(path, INDEX_FILE)) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(path, index):
+    fd, tmp_path = tempfile.mkstemp(dir=path)
+    with os.fdopen(fd, 'w') as fp:
+        json.dump(index, fp, indent=2)
+    os.replace(tmp_path, os.path.join(path, INDEX_FILE))
+
+
+def fetch_table(name, path=None, timeout=30):
+    """
+    Downloads the CF table ``name`` into ``path`` and returns the index entry
+    ``{'file': ..., 'version': ..., 'fetched': ...}``.
+    """
+    path = path or tables_path()
+    make_dirs(path)
+    url = CF_TABLES[name][1]
+    LOGGER.info("downloading CF table %s", url)
+    fd, tmp_path = tempfile.mkstemp(dir=path, suffix='.xml')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            resp = requests.get(url, stream=True, timeout=timeout)
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                fp.write(chunk)
+        version = table_version(tmp_path) or 'unknown'
+        filename = os.path.join(path, "{}-v{}.xml".format(os.path.basename(url)[:-4], version))
+        os.replace(tmp_path, filename)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return dict(file=filename, version=version, fetched=time.time())
+
+
+def fetch_tables(force=False, path=None):
+    """
+    Updates the local copies of all CF tables which are missing or older than
+    ``[cfchecker] tables_max_age`` days. Tables which can not be downloaded
+    keep their previous local copy. Returns the updated index.
+    """
+    global _fetched
+    path = path or tables_path()
+    max_age = config.get_int('cfchecker', 'tables_max_age', 10) * 24 * 3600
+    with _lock:
+        _fetched = True
+        make_dirs(path)
+        index = _read_index(path)
+        now = time.time()
+        for name in CF_TABLES:
+            entry = index.get(name)
+            if not force and entry and os.path.isfile(entry['file']):
+                if not max_age or now - entry['fetched'] < max_age:
+                    continue
+            try:
+                index[name] = fetch_table(name, path)
+            except Exception as err:
+                LOGGER.warning("Could not download CF table %s: %s", name, err)
+        _write_index(path, index)
+    return index
+
+
+def local_tables():
+    """
+    Returns a dict of CF table names and local filenames.
+    Filenames configured in the ``[cfchecker]`` section take precedence.
+    """
+    path = tables_path()
+    index = _read_index(path)
+    if config.get_bool('cfchecker', 'cache_tables', True) and not _fetched:
+        # try only once per process to avoid network timeouts on offline nodes
+        if any(name not in index for name in CF_TABLES):
+            index = fetch_tables(path=path)
+    tables = OrderedDict()
+    for name in CF_TABLES:
+        filename = config.get_config_value('cfchecker', name)
+        if not filename and name in index:
+            filename = index[name]['file']
+        if filename and os.path.isfile(filename):
+            tables[name] = filename
+    return tables
+
+
+def cfchecks_options():
+    """Returns the ``cfchecks`` command line options for the local CF tables."""
+    options = []
+    for name, filename in local_tables().items():
+        options.extend([CF_TABLES[name][0], filename])
+    return options
+
+
+def versions():
+    """Returns a string with the versions of the local CF tables."""
+    return ','.join(
+        "{}={}".format(name, os.path.basename(filename))
+        for name, filename in local_tables().items())
@@ -0,0 +1,78 @@
+"""
+Process wide registry of the IOOS compliance checker plugins.
+
+``CheckSuite.load_all_available_checkers()`` walks the entry points and imports
+all checker plugins each time it is called. The checkers are stored on the
+``CheckSuite`` class, so it is enough to load them once per process and reuse
+them for all requests.
+"""
+
+import time
+import threading
+
+from compliance_checker.suite import CheckSuite
+
+from .metrics import CHECKSUITE_LOADS, CHECKSUITE_REUSES, CHECKSUITE_SAVED
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+_lock = threading.Lock()
+_stats = dict(loads=0, load_time=0.0, reuses=0, saved_time=0.0)
+
+
+def reload():
+    """(Re-)loads all available checker plugins."""
+    with _lock:
+        _load()
+
+
+def _load():
+    start = time.time()
+    # load into a subclass first so that running checks never see a half loaded registry
+    suite = type('_CheckSuite', (CheckSuite, ), {'checkers': {}})
+    suite.load_all_available_checkers()
+    CheckSuite.checkers = suite.checkers
+    duration = time.time() - start
+    _stats['loads'] += 1
+    _stats['load_time'] = duration
+    CHECKSUITE_LOADS.inc()
+    LOGGER.info("loaded %d compliance checkers in %.3f secs", len(CheckSuite.checkers), duration)
+
+
+def get_check_suite():
+    """Returns a ``CheckSuite`` with all available checkers loaded."""
+    with _lock:
+        if _stats['loads'] == 0:
+            _load()
+        else:
+            _stats['reuses'] += 1
+            _stats['saved_time'] += _stats['load_time']
+            CHECKSUITE_REUSES.inc()
+            CHECKSUITE_SAVED.inc(_stats['load_time'])
+            LOGGER.debug("reusing compliance checkers, saved %.3f secs", _stats['load_time'])
+    return CheckSuite()
+
+
+def failed_checks(suite, groups):
+    """
+    Returns a tuple ``(high, medium, low)`` with the number of failed checks
+    by priority of the results ``groups`` of a checker.
+    """
+    counts = {3: 0, 2: 0, 1: 0}
+    for result in suite.scores(groups):
+        value = result.value
+        if isinstance(value, bool):
+            value = (int(value), 1)
+        if value[0] != value[1]:
+            counts[result.weight] = counts.get(result.weight, 0) + 1
+    return counts[3], counts[2], counts[1]
+
+
+def stats():
+    """
+    Returns the registry statistics: number of loads, duration of the last load,
+    number of reuses and the estimated total load time saved by reusing the checkers.
+    """
+    with _lock:
+        return dict(_stats)
@@ -6,14 +6,17 @@
 ###########################################################
 
 import os
+import signal
 import psutil
 import click
 from jinja2 import Environment, PackageLoader
 from pywps import configuration
 
-from . import wsgi
 from urllib.parse import urlparse
 
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
 PID_FILE = os.path.abspath(os.path.join(os.path.curdir, "pywps.pid"))
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
@@ -60,6 +63,13 @@ def run_process_action(action=None):
             if action == 'stop':
                 p.terminate()
                 msg = "pid={}, status=terminated".format(p.pid)
+            elif action == 'reload':
+                if not p.children():
+                    # the single process server can not reload
+                    msg = "pid={}, reload needs a service started with --workers".format(p.pid)
+                else:
+                    p.send_signal(signal.SIGHUP)
+                    msg = "pid={}, status=reloading".format(p.pid)
             else:
                 from psutil import _pprint_secs
                 msg = "pid={}, status={}, created={}".format(
@@ -73,7 +83,7 @@ def run_process_action(action=None):
     click.echo(msg)
 
 
-def _run(application, bind_host=None, daemon=False):
+def _run(application, bind_host=None, daemon=False, workers=0, app_factory=None):
     from werkzeug.serving import run_simple
     # call this *after* app is initialized ... needs pywps config.
     host, port = get_host()
@@ -82,6 +92,21 @@ def _run(application, bind_host=None, daemon=False):
     static_files = {
         '/outputs': configuration.get_config_value('server', 'outputpath')
     }
+    if workers:
+        from .server import PreforkServer
+        server = PreforkServer(
+            app_factory or (lambda: application),
+            host=bind_host,
+            port=port,
+            workers=workers,
+            static_files=static_files)
+        server.run()
+        return
+
+    def ignore_reload(signum, frame):
+        LOGGER.warning("reload needs a service started with --workers, ignoring SIGHUP")
+    # SIGHUP would stop the server
+    signal.signal(signal.SIGHUP, ignore_reload)
     run_simple(
         hostname=bind_host,
         port=port,
@@ -99,8 +124,8 @@ def _run(application, bind_host=None, daemon=False):
 def cli():
     """Command line to start/stop a PyWPS service.
 
-    Do not use this service in a production environment.
-    It's intended to be running in a test environment only!
+    Without the --workers option the service is intended to be running in a
+    test environment only! Use --workers to run multiple worker processes.
     For more documentation, visit http://pywps.org/doc
     """
     pass
@@ -118,6 +143,64 @@ def stop():
     run_process_action(action='stop')
 
 
+@cli.command()
+def reload():
+    """Reload configuration and restart workers of PyWPS service started with --workers"""
+    run_process_action(action='reload')
+
+
+@cli.command('fetch-cf-tables')
+@click.option('--config', '-c', metavar='PATH', help='path to pywps configuration file.')
+@click.option('--force', '-f', is_flag=True, help='download tables even if local copies are up-to-date.')
+def fetch_cf_tables(config, force):
+    """Download the CF tables used by the cfchecker into the cache directory."""
+    from .cftables import fetch_tables
+    from .wsgi import create_app
+    create_app([config] if config else None)
+    for name, entry in fetch_tables(force=force).items():
+        click.echo("{}: version={}, file={}".format(name, entry['version'], entry['file']))
+
+
+@cli.command()
+@click.option('--config', '-c', metavar='PATH', help='path to pywps configuration file.')
+@click.option('--workers', '-w', metavar='INT', default=1, type=int, help='number of worker processes.')
+def worker(config, workers):
+    """Run queued jobs of a PyWPS service using the "queue" processing mode."""
+    from .jobqueue import run_workers, queue_path
+    from .wsgi import create_app
+    cfgfiles = [config] if config else None
+    create_app(cfgfiles)
+    click.echo("starting {} job workers on {}".format(workers, queue_path()))
+    run_workers(lambda: create_app(cfgfiles), workers=workers)
+
+
+@cli.command()
+@click.option('--config', '-c', metavar='PATH', help='path to pywps configuration file.')
+def jobs(config):
+    """Show number of jobs in the job queue."""
+    from .jobqueue import JobQueue
+    from .wsgi import create_app
+    create_app([config] if config else None)
+    counts = JobQueue().counts()
+    click.echo(", ".join("{}={}".format(status, count) for status, count in counts.items()))
+
+
+@cli.command('import-report')
+@click.option('--top', metavar='INT', default=10, type=int, help='number of heaviest packages to show.')
+def import_report(top):
+    """Show the import time of the processes and the heaviest packages imported on start."""
+    from .importcost import measure, report
+    import_times, imports = measure()
+    result = report(imports, top=top)
+    click.echo("total: {:.3f} secs".format(result['total']))
+    click.echo("processes:")
+    for name, duration in import_times.items():
+        click.echo("  {:<50} {:>8.3f} secs".format(name, duration))
+    click.echo("heaviest packages:")
+    for name, duration in result['packages']:
+        click.echo("  {:<50} {:>8.3f} secs".format(name, duration))
+
+
 @cli.command()
 @click.option('--config', '-c', metavar='PATH', help='path to pywps configuration file.')
 @click.option('--bind-host', '-b', metavar='IP-ADDRESS', default='127.0.0.1',
@@ -131,9 +214,11 @@ def stop():
 @click.option('--log-level', metavar='LEVEL', default='INFO', help='log level in PyWPS configuration.')
 @click.option('--log-file', metavar='PATH', default='pywps.log', help='log file in PyWPS configuration.')
 @click.option('--database', default='sqlite:///pywps-logs.sqlite', help='database in PyWPS configuration')
+@click.option('--workers', '-w', metavar='INT', default=0, type=int,
+              help='number of preforked worker processes (0 = single process development server).')
 def start(config, bind_host, daemon, hostname, port,
           maxsingleinputsize, maxprocesses, parallelprocesses,
-          log_level, log_file, database):
+          log_level, log_file, database, workers):
     """Start PyWPS service.
     This service is by default available at http://localhost:5000/wps
     """
@@ -153,7 +238,12 @@ def start(config, bind_host, daemon, hostname, port,
     ))
     if config:
         cfgfiles.append(config)
-    app = wsgi.create_app(cfgfiles)
+    from .wsgi import create_app
+    app = create_app(cfgfiles)
+
+    def app_factory():
+        # called again on reload to read the configuration files
+        return create_app(cfgfiles)
     # let's start the service ...
     # See:
     # * https://github.com/geopython/pywps-flask/blob/master/demo.py
@@ -172,9 +262,9 @@ def start(config, bind_host, daemon, hostname, port,
 
         if pid == 0:
             os.setsid()
-            _run(app, bind_host=bind_host, daemon=True)
+            _run(app, bind_host=bind_host, daemon=True, workers=workers, app_factory=app_factory)
         else:
             os._exit(0)
     else:
         # no daemon
-        _run(app, bind_host=bind_host)
+        _run(app, bind_host=bind_host, workers=workers, app_factory=app_factory)
@@ -0,0 +1,127 @@
+"""
+Runs the external tools (``ncdump``, ``ncgen``, ``cfchecks``, ``PrePARE``, ...).
+
+Each call records the run time and failures in the metrics. With tracing enabled
+each call is logged as structured event with command, wall time, CPU time,
+peak memory, exit code and output size:
+
+.. code-block:: ini
+
+  [tracing]
+  enabled = true
+  # also append the events as json lines to a file
+  file = /var/log/hummingbird/commands.jsonl
+"""
+
+import os
+import json
+import time
+import errno
+import shutil
+import threading
+import subprocess
+from subprocess import CalledProcessError
+
+from . import config
+from .metrics import SUBPROCESS_DURATION, SUBPROCESS_ERRORS
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+_file_lock = threading.Lock()
+_tools_lock = threading.Lock()
+# command -> path or None, probed once per process
+_tools = {}
+
+
+def which(command):
+    """
+    Returns the path of ``command`` or ``None`` if it is not installed.
+    The lookup is done once, later calls use the cached result.
+    """
+    with _tools_lock:
+        if command not in _tools:
+            _tools[command] = shutil.which(command)
+            if _tools[command] is None:
+                LOGGER.warning("command %s is not installed", command)
+        return _tools[command]
+
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def trace(event):
+    """Logs a command event if tracing is enabled."""
+    if not config.get_bool('tracing', 'enabled'):
+        return
+    line = json.dumps(event, sort_keys=True)
+    LOGGER.info("command trace: %s", line)
+    filename = config.get_config_value('tracing', 'file')
+    if filename:
+        with _file_lock:
+            with open(filename, 'a') as fp:
+                fp.write(line + '\n')
+
+
+def run_command(cmd, stderr=None, name=None, cwd=None, on_line=None):
+    """
+    Runs the command ``cmd`` and returns its output like :func:`subprocess.check_output`.
+    Raises :class:`subprocess.CalledProcessError` if the command fails.
+
+    :param stderr: ``subprocess.STDOUT`` to include the error output.
+    :param name: name of the command in metrics and traces, defaults to the executable name.
+    :param cwd: working directory of the command.
+    :param on_line: function called with each line of the output (bytes) as it is produced.
+                    The output is not buffered and ``None`` is returned instead.
+    """
+    name = name or os.path.basename(cmd[0])
+    start = time.time()
+    try:
+        if which(cmd[0]) is None:
+            # fail without forking a process
+            raise FileNotFoundError(errno.ENOENT, "command not installed", cmd[0])
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, cwd=cwd)
+    except OSError as err:
+        SUBPROCESS_ERRORS.inc(command=name)
+        trace(dict(command=name, args=[str(arg) for arg in cmd], start=start, error=str(err)))
+        raise
+    with proc.stdout:
+        if on_line is None:
+            output = proc.stdout.read()
+            output_size = len(output)
+        else:
+            output = None
+            output_size = 0
+            try:
+                for line in proc.stdout:
+                    output_size += len(line)
+                    on_line(line)
+            except BaseException:
+                proc.kill()
+                proc.wait()
+                raise
+    # reap the process ourselves to get its resource usage
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = returncode = _exit_code(status)
+    duration = time.time() - start
+
+    SUBPROCESS_DURATION.observe(duration, command=name)
+    if returncode != 0:
+        SUBPROCESS_ERRORS.inc(command=name)
+    trace(dict(
+        command=name,
+        args=[str(arg) for arg in cmd],
+        start=start,
+        wall_time=round(duration, 6),
+        cpu_time=round(rusage.ru_utime + rusage.ru_stime, 6),
+        # kilobytes on Linux
+        max_rss=rusage.ru_maxrss,
+        exit_code=returncode,
+        output_size=output_size,
+    ))
+    if returncode != 0:
+        raise CalledProcessError(returncode, cmd, output=output)
+    return output
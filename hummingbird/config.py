@@ -0,0 +1,63 @@
+"""
+Hummingbird specific options read from the PyWPS configuration files.
+"""
+
+import os
+import tempfile
+
+from pywps import configuration
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+
+def get_config_value(section, option, default=None):
+    """
+    Returns the value of ``option`` in ``section`` or ``default``
+    if the option is not set.
+    """
+    value = configuration.get_config_value(section, option)
+    if value is None or value == '':
+        return default
+    return value
+
+
+def get_bool(section, option, default=False):
+    value = get_config_value(section, option, default)
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('true', 'yes', 'on', '1')
+
+
+def get_int(section, option, default=0):
+    value = get_config_value(section, option)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        LOGGER.warning("Invalid value for [%s] %s: %s", section, option, value)
+        return default
+
+
+def get_size_mb(section, option, default=None):
+    value = get_config_value(section, option, default)
+    if value is None:
+        return None
+    return configuration.get_size_mb(str(value))
+
+
+def cache_path():
+    """Base directory for all caches of Hummingbird."""
+    path = get_config_value('cache', 'directory')
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), 'hummingbird', 'cache')
+    return os.path.abspath(path)
+
+
+def max_workers():
+    """Number of datasets checked in parallel by multi-file processes."""
+    workers = get_int('parallel', 'max_workers', 1)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
@@ -0,0 +1,249 @@
+"""
+Shared cache of downloaded input files.
+
+PyWPS downloads each HTTP input into the working directory of the request.
+With the download cache the file is stored once in the cache directory, keyed
+by its URL, and hard linked into the working directories, or copied if the cache
+directory is on another file system. Cached files are
+revalidated with conditional requests using their ``ETag`` and ``Last-Modified``
+headers, so an unchanged file is not downloaded again. The least recently used
+files are removed above the size limit.
+
+Enable the cache with:
+
+.. code-block:: ini
+
+  [download]
+  enabled = true
+  max_size = 10gb
+"""
+
+import os
+import json
+import time
+import shutil
+import fcntl
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import requests
+from pywps.inout.basic import UrlHandler
+from pywps.exceptions import FileSizeExceeded, NoApplicableCode
+
+from . import config
+from .utils import make_dirs
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_cache = None
+# UrlHandler.file of PyWPS
+_url_file = UrlHandler.file
+
+
+class DownloadCache(object):
+    """
+    Stores downloaded files on disk with size-based LRU eviction.
+
+    :param directory: directory of the cached files.
+    :param max_size: maximum size of the cache in MB (None means unlimited).
+    :param timeout: timeout of the HTTP requests in seconds.
+    """
+
+    def __init__(self, directory, max_size=None, timeout=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.timeout = timeout
+        make_dirs(self.directory)
+
+    def _path(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    @contextmanager
+    def _locked(self, path, blocking=True):
+        """
+        Locks the url of ``path``, one download of a url at a time, also across worker processes.
+        Yields ``False`` without waiting if ``blocking`` is false and the url is locked.
+        """
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        while True:
+            lock_file = open(path + '.lock', 'a')
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                lock_file.close()
+                yield False
+                return
+            try:
+                current = os.path.samestat(os.fstat(lock_file.fileno()), os.stat(path + '.lock'))
+            except FileNotFoundError:
+                current = False
+            if current:
+                break
+            # the lock file was removed by the eviction of the url, lock the new one
+            lock_file.close()
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _read_info(self, path):
+        try:
+            with open(path + '.json') as fp:
+                info = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if not os.path.isfile(path):
+            return None
+        return info
+
+    def get(self, url, max_bytes=None):
+        """
+        Returns the path of the cached file of ``url``. The file is downloaded
+        if it is not cached or has changed.
+        Raises :class:`FileSizeExceeded` if the file is larger than ``max_bytes``.
+        """
+        path = self._path(url)
+        make_dirs(os.path.dirname(path))
+        with self._locked(path):
+            info = self._read_info(path)
+            headers = {}
+            if info and info.get('etag'):
+                headers['If-None-Match'] = info['etag']
+            if info and info.get('last_modified'):
+                headers['If-Modified-Since'] = info['last_modified']
+            if info and not headers:
+                # the file can not be revalidated
+                info = None
+            with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+                if info and resp.status_code == 304:
+                    LOGGER.debug("download cache hit: %s", url)
+                else:
+                    resp.raise_for_status()
+                    self._download(resp, path, max_bytes)
+                    info = dict(
+                        url=url,
+                        etag=resp.headers.get('ETag'),
+                        last_modified=resp.headers.get('Last-Modified'))
+                    with open(path + '.json', 'w') as fp:
+                        json.dump(info, fp)
+            # use access time for lru
+            os.utime(path, (time.time(), os.path.getmtime(path)))
+        self.evict()
+        return path
+
+    def _download(self, resp, path, max_bytes):
+        if max_bytes and int(resp.headers.get('Content-Length', 0)) > max_bytes:
+            raise FileSizeExceeded("File size of {} exceeds {} bytes".format(resp.url, max_bytes))
+        # write to a temporary file first so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            size = 0
+            with os.fdopen(fd, 'wb') as fp:
+                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise FileSizeExceeded("File size of {} exceeds {} bytes".format(resp.url, max_bytes))
+                    fp.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        LOGGER.info("downloaded %s (%d bytes)", resp.url, size)
+
+    def fetch(self, url, filename, max_bytes=None):
+        """Links the cached file of ``url`` to ``filename``, or copies it if it can not be linked."""
+        path = self.get(url, max_bytes)
+        if os.path.lexists(filename):
+            os.remove(filename)
+        try:
+            os.link(path, filename)
+        except OSError:
+            # cache directory on another file system, a copy is not changed
+            # when the cached file is replaced or evicted while the input is used
+            shutil.copyfile(path, filename)
+        return filename
+
+    def entries(self):
+        """Returns a list of ``(path, stat)`` of all cached files."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(('.json', '.lock')) or name.startswith('tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    continue
+        return entries
+
+    def _remove(self, path):
+        """Removes the cached file of ``path`` unless it is locked, returns True if it was removed."""
+        with self._locked(path, blocking=False) as locked:
+            if not locked:
+                return False
+            for filename in (path, path + '.json', path + '.lock'):
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+        return True
+
+    def evict(self):
+        """Removes the least recently used files above max size."""
+        if not self.max_size:
+            return
+        with _lock:
+            entries = self.entries()
+            max_bytes = self.max_size * 1024 * 1024
+            total = sum(stat.st_size for _, stat in entries)
+            for path, stat in sorted(entries, key=lambda entry: entry[1].st_atime):
+                if total <= max_bytes:
+                    break
+                if self._remove(path):
+                    total -= stat.st_size
+
+
+def get_download_cache():
+    """
+    Returns the download cache configured in the ``[download]`` section
+    or ``None`` if the cache is disabled.
+    """
+    global _cache
+    if not config.get_bool('download', 'enabled'):
+        return None
+    options = (
+        os.path.join(config.cache_path(), 'downloads'),
+        config.get_size_mb('download', 'max_size'),
+        config.get_int('download', 'timeout', None))
+    if _cache is None or (_cache.directory, _cache.max_size, _cache.timeout) != options:
+        _cache = DownloadCache(*options)
+    return _cache
+
+
+def _cached_url_file(self):
+    cache = get_download_cache()
+    if (self._file is not None or cache is None or self.post_data is not None or
+            not self.url.startswith(('http://', 'https://'))):
+        return _url_file.fget(self)
+    filename = self._build_file_name(href=self.url)
+    try:
+        self._file = cache.fetch(self.url, filename, self.max_input_size())
+    except FileSizeExceeded as err:
+        raise FileSizeExceeded("{} (input {})".format(err, self.inpt.get('identifier', '?')))
+    except Exception as err:
+        raise NoApplicableCode('File reference error: {}'.format(err))
+    return self._file
+
+
+def install():
+    """Downloads the HTTP inputs of all processes through the download cache."""
+    UrlHandler.file = property(_cached_url_file)
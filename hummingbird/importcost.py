@@ -0,0 +1,70 @@
+"""
+Import cost of the WPS processes.
+
+The process registry is imported in a fresh interpreter with ``python -X importtime``
+(Python 3.7+). The report shows the import time of each registered process, a module imported
+by several processes is counted for the first one, and the heaviest packages
+imported on service start::
+
+  $ hummingbird import-report
+"""
+
+import re
+import sys
+import json
+import subprocess
+from collections import OrderedDict
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+SCRIPT = """
+import json
+# PyWPS is needed by all processes
+import pywps
+from hummingbird.processes import IMPORT_TIMES, load_processes
+load_processes()
+print(json.dumps(IMPORT_TIMES))
+"""
+
+
+def parse(text):
+    """
+    Parses the ``-X importtime`` output.
+    Returns a list of tuples ``(module, self seconds, cumulative seconds, depth)``.
+    """
+    imports = []
+    for line in text.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6, len(indent) // 2))
+    return imports
+
+
+def measure():
+    """
+    Imports the processes in a new interpreter.
+    Returns the import time of each process and the parsed ``-X importtime`` output.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode != 0:
+        raise RuntimeError("import of the processes failed: {}".format(proc.stderr.strip().splitlines()[-1:]))
+    return json.loads(proc.stdout.strip().splitlines()[-1]), parse(proc.stderr)
+
+
+def report(imports, top=10):
+    """
+    Returns the total import time and the ``top`` heaviest top level packages.
+    """
+    packages = OrderedDict()
+    for name, _, value, _ in imports:
+        package = name.split('.')[0]
+        # the first import of a package contains the imports of its sub modules
+        if name == package and package not in packages:
+            packages[package] = value
+    return OrderedDict([
+        ('total', sum(value for _, _, value, depth in imports if depth == 0)),
+        ('packages', sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]),
+    ])
@@ -0,0 +1,340 @@
+"""
+Job queue backend for asynchronous Execute requests.
+
+With ``mode = queue`` in the ``[processing]`` section the web service only
+stores asynchronous jobs in a SQLite database. Separate worker processes
+(``hummingbird worker``), possibly on other nodes sharing the database, the
+working and output directories, claim the jobs and run them. Workers update
+the usual PyWPS status documents, so clients poll the status location as before.
+
+A worker renews the lease of its running job with a heartbeat. Jobs whose lease
+has expired, because their worker was killed, are queued again, or marked as
+failed after ``max_attempts`` runs.
+"""
+
+import os
+import json
+import time
+import socket
+import signal
+import sqlite3
+import tempfile
+import threading
+
+import pywps.processing
+from pywps import configuration
+from pywps.processing import Processing, Job
+from pywps.response.status import WPS_STATUS
+
+from . import config
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+QUEUE = 'queue'
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    uuid TEXT PRIMARY KEY,
+    identifier TEXT,
+    job TEXT,
+    status TEXT,
+    worker TEXT,
+    created REAL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL,
+    attempts INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+def queue_path():
+    """Path of the SQLite job queue database."""
+    path = config.get_config_value('jobqueue', 'database')
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), 'hummingbird', 'jobs.sqlite')
+    return os.path.abspath(path)
+
+
+class JobQueue(object):
+    """
+    Job queue in a SQLite database.
+
+    :param database: path of the database file, created if missing.
+    """
+
+    def __init__(self, database=None):
+        self.database = database or queue_path()
+        dirname = os.path.dirname(self.database)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # add the columns missing in databases of older versions
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            for column, column_type in (('heartbeat', 'REAL'), ('attempts', 'INTEGER DEFAULT 0')):
+                if column not in columns:
+                    conn.execute("ALTER TABLE jobs ADD COLUMN {} {}".format(column, column_type))
+
+    def _connect(self):
+        # autocommit mode, transactions are started explicitly
+        conn = sqlite3.connect(self.database, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return _Connection(conn)
+
+    def put(self, uuid, identifier, job):
+        """Adds the json encoded ``job`` to the queue."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (uuid, identifier, job, status, created) VALUES (?, ?, ?, ?, ?)",
+                (str(uuid), identifier, job, QUEUED, time.time()))
+
+    def claim(self, worker):
+        """
+        Marks the oldest queued job as running by ``worker``.
+        Returns a tuple ``(uuid, job)`` or ``None`` if the queue is empty.
+        """
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT uuid, job FROM jobs WHERE status = ? ORDER BY created LIMIT 1",
+                    (QUEUED,)).fetchone()
+                if row:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started = ?, heartbeat = ?,"
+                        " attempts = COALESCE(attempts, 0) + 1 WHERE uuid = ?",
+                        (RUNNING, worker, now, now, row[0]))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return row
+
+    def heartbeat(self, uuid):
+        """Renews the lease of the running job ``uuid``."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE uuid = ? AND status = ?",
+                (time.time(), str(uuid), RUNNING))
+
+    def expire(self, lease, max_attempts=2):
+        """
+        Queues running jobs again whose lease of ``lease`` seconds has expired,
+        jobs which have been run ``max_attempts`` times are marked as failed.
+        Returns a list of tuples ``(uuid, job)`` of the failed jobs.
+        """
+        failed = []
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                rows = conn.execute(
+                    "SELECT uuid, job, attempts FROM jobs WHERE status = ? AND COALESCE(heartbeat, started) < ?",
+                    (RUNNING, now - lease)).fetchall()
+                for uuid, job, attempts in rows:
+                    if (attempts or 0) >= max_attempts:
+                        LOGGER.error("job %s failed, its worker stopped after %s attempts", uuid, attempts)
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, job = NULL, finished = ? WHERE uuid = ?",
+                            (FAILED, now, uuid))
+                        failed.append((uuid, job))
+                    else:
+                        LOGGER.warning("queueing job %s again, its worker stopped", uuid)
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, worker = NULL WHERE uuid = ?", (QUEUED, uuid))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return failed
+
+    def finish(self, uuid, status):
+        """Marks a job as finished, the job document is removed."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, job = NULL, finished = ? WHERE uuid = ?",
+                (status, time.time(), str(uuid)))
+
+    def counts(self):
+        """Returns a dict of job status and number of jobs."""
+        counts = dict.fromkeys([QUEUED, RUNNING, DONE, FAILED], 0)
+        with self._connect() as conn:
+            for status, count in conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+                counts[status] = count
+        return counts
+
+
+class _Connection(object):
+    """Closes the sqlite connection when leaving the context."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *args):
+        self.conn.close()
+
+
+class QueueProcessing(Processing):
+    """
+    :class:`QueueProcessing` stores the job in the job queue instead of running it.
+    """
+
+    def start(self):
+        JobQueue().put(self.job.uuid, self.job.name, self.job.json)
+        self.job.wps_response._update_status(WPS_STATUS.ACCEPTED, 'Job queued, waiting for a worker', 0)
+        LOGGER.info("Queued job %s of process %s", self.job.uuid, self.job.name)
+
+
+_default_factory = pywps.processing.Process
+
+
+def _process_factory(process, wps_request, wps_response):
+    if configuration.get_config_value('processing', 'mode') == QUEUE:
+        return QueueProcessing(process, wps_request, wps_response)
+    return _default_factory(process, wps_request, wps_response)
+
+
+def install():
+    """Adds the ``queue`` processing mode to PyWPS."""
+    pywps.processing.Process = _process_factory
+
+
+class JobWorker(object):
+    """
+    Runs jobs of the job queue.
+
+    :param service: PyWPS service, used by PyWPS to launch stored requests.
+    :param queue: :class:`JobQueue`, defaults to the configured queue.
+    :param poll_interval: seconds to wait when the queue is empty.
+    :param lease: seconds after which a running job without heartbeat is queued again.
+    """
+
+    def __init__(self, service=None, queue=None, poll_interval=None, lease=None):
+        self.service = service
+        self.queue = queue or JobQueue()
+        if poll_interval is None:
+            poll_interval = config.get_int('jobqueue', 'poll_interval', 2)
+        self.poll_interval = poll_interval
+        if lease is None:
+            lease = config.get_int('jobqueue', 'lease', 60)
+        self.lease = lease
+        self.max_attempts = config.get_int('jobqueue', 'max_attempts', 2)
+        self.name = '{}:{}'.format(socket.gethostname(), os.getpid())
+        self._stopping = False
+
+    def run_job(self, uuid, job_json):
+        LOGGER.info("worker %s running job %s", self.name, uuid)
+        status = FAILED
+        stopped = threading.Event()
+
+        def heartbeat():
+            while not stopped.wait(self.lease / 3.0):
+                try:
+                    self.queue.heartbeat(uuid)
+                except Exception:
+                    LOGGER.exception("heartbeat of job %s failed", uuid)
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            job = Job.from_json(json.loads(job_json))
+            job.process.service = self.service
+            job.run()
+            if job.wps_response.status == WPS_STATUS.SUCCEEDED:
+                status = DONE
+        except Exception:
+            LOGGER.exception("job %s failed", uuid)
+        finally:
+            stopped.set()
+            thread.join()
+        self.queue.finish(uuid, status)
+        return status
+
+    def recover(self):
+        """Queues the jobs of stopped workers again, or marks them as failed."""
+        for uuid, job_json in self.queue.expire(self.lease, self.max_attempts):
+            try:
+                job = Job.from_json(json.loads(job_json))
+                job.wps_response._update_status(
+                    WPS_STATUS.FAILED, 'Job failed, the worker running the job stopped', 100)
+            except Exception:
+                LOGGER.exception("could not update the status of job %s", uuid)
+
+    def run_once(self):
+        """Runs the next queued job. Returns ``False`` if the queue is empty."""
+        self.recover()
+        row = self.queue.claim(self.name)
+        if row is None:
+            return False
+        self.run_job(*row)
+        return True
+
+    def stop(self, signum=None, frame=None):
+        """Stops the worker after the running job has finished."""
+        self._stopping = True
+
+    def run(self, max_jobs=None):
+        """Runs queued jobs until stopped, or until ``max_jobs`` jobs have been run."""
+        count = 0
+        while not self._stopping and (max_jobs is None or count < max_jobs):
+            if self.run_once():
+                count += 1
+            else:
+                time.sleep(self.poll_interval)
+        return count
+
+
+def run_workers(service_factory, workers=1):
+    """
+    Forks ``workers`` processes running :class:`JobWorker`.
+    ``SIGTERM`` and ``SIGINT`` stop the workers after their running jobs.
+    Jobs of workers which have been killed are queued again first.
+    """
+    JobWorker().recover()
+    pids = set()
+    for _ in range(max(1, workers)):
+        pid = os.fork()
+        if pid:
+            pids.add(pid)
+            continue
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            worker = JobWorker(service_factory())
+            signal.signal(signal.SIGTERM, worker.stop)
+            worker.run()
+        except Exception:
+            LOGGER.exception("job worker failed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def stop(signum, frame):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while pids:
+        try:
+            pid, _ = os.waitpid(-1, 0)
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        pids.discard(pid)
@@ -0,0 +1,321 @@
+"""
+Metrics of executed processes in the Prometheus text format.
+
+Asynchronous processes run in forked processes and the service may run several
+workers, so each process writes its metrics to a file in the metrics directory.
+The ``/metrics`` endpoint returns the sum of all files. Files of processes which
+have finished are merged into ``archive.json``.
+
+Enable the endpoint with:
+
+.. code-block:: ini
+
+  [metrics]
+  enabled = true
+"""
+
+import os
+import json
+import time
+import fcntl
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from pywps.app.Process import Process
+from pywps.response.status import WPS_STATUS
+
+from . import config
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+ARCHIVE = 'archive.json'
+
+_lock = threading.Lock()
+_pid = os.getpid()
+REGISTRY = []
+
+
+def _reset_after_fork():
+    # forked processes must not report the values of their parent again
+    global _pid
+    if os.getpid() != _pid:
+        _pid = os.getpid()
+        for metric in REGISTRY:
+            metric.values.clear()
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def _label_text(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"'))
+                              for k, v in pairs) + '}'
+
+    def merge(self, values, key, value):
+        raise NotImplementedError
+
+    def lines(self, values):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            _reset_after_fork()
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, values, key, value):
+        values[key] = values.get(key, 0) + value
+
+    def lines(self, values):
+        for key, value in sorted(values.items()):
+            yield '{}{} {}'.format(self.name, self._label_text(key), float(value))
+
+
+class Histogram(Metric):
+    """Histogram, the values are lists of bucket counts followed by the sum and count."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            _reset_after_fork()
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, **labels)
+
+    def merge(self, values, key, value):
+        if key in values:
+            values[key] = [a + b for a, b in zip(values[key], value)]
+        else:
+            values[key] = list(value)
+
+    def lines(self, values):
+        for key, counts in sorted(values.items()):
+            for bound, count in zip(self.buckets, counts):
+                yield '{}_bucket{} {}'.format(self.name, self._label_text(key, ('le', str(float(bound)))), count)
+            yield '{}_bucket{} {}'.format(self.name, self._label_text(key, ('le', '+Inf')), counts[-1])
+            yield '{}_sum{} {}'.format(self.name, self._label_text(key), float(counts[-2]))
+            yield '{}_count{} {}'.format(self.name, self._label_text(key), counts[-1])
+
+
+PROCESS_REQUESTS = Counter(
+    'hummingbird_process_requests_total', 'Number of executed processes.', ['process'])
+PROCESS_ERRORS = Counter(
+    'hummingbird_process_errors_total', 'Number of failed processes.', ['process'])
+PROCESS_DURATION = Histogram(
+    'hummingbird_process_duration_seconds', 'Run time of processes.', ['process'])
+PHASE_DURATION = Histogram(
+    'hummingbird_process_phase_duration_seconds',
+    'Time spent fetching inputs, running checkers and writing reports.', ['process', 'phase'])
+SUBPROCESS_DURATION = Histogram(
+    'hummingbird_subprocess_duration_seconds', 'Run time of external commands.', ['command'])
+SUBPROCESS_ERRORS = Counter(
+    'hummingbird_subprocess_errors_total', 'Number of external commands which failed.', ['command'])
+CHECKSUITE_LOADS = Counter(
+    'hummingbird_checksuite_loads_total', 'Number of loads of the compliance checker plugins.')
+CHECKSUITE_REUSES = Counter(
+    'hummingbird_checksuite_reuses_total', 'Number of checks reusing the loaded compliance checker plugins.')
+CHECKSUITE_SAVED = Counter(
+    'hummingbird_checksuite_saved_seconds_total',
+    'Estimated load time of the compliance checker plugins saved by reusing them.')
+
+
+def phase(process, name):
+    """Context manager measuring a phase (``fetch``, ``check``, ``report``) of a process."""
+    return PHASE_DURATION.time(process=process, phase=name)
+
+
+def enabled():
+    return config.get_bool('metrics', 'enabled')
+
+
+def metrics_path():
+    path = config.get_config_value('metrics', 'directory')
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), 'hummingbird', 'metrics')
+    return os.path.abspath(path)
+
+
+def _to_json(values_by_name):
+    return {name: [[list(key), value] for key, value in values.items()]
+            for name, values in values_by_name.items() if values}
+
+
+def _dump():
+    with _lock:
+        _reset_after_fork()
+        return _to_json({metric.name: metric.values for metric in REGISTRY})
+
+
+def _merge(totals, data):
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for name, entries in data.items():
+        metric = by_name.get(name)
+        if metric is None:
+            continue
+        values = totals.setdefault(name, {})
+        for key, value in entries:
+            metric.merge(values, tuple(key), value)
+
+
+def _write_json(filename, data):
+    tmp_file = '{}.{}.tmp'.format(filename, os.getpid())
+    with open(tmp_file, 'w') as fp:
+        json.dump(data, fp)
+    os.replace(tmp_file, filename)
+
+
+def _read_json(filename):
+    try:
+        with open(filename) as fp:
+            return json.load(fp)
+    except (IOError, ValueError):
+        return {}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def flush():
+    """Writes the metrics of this process to the metrics directory."""
+    path = metrics_path()
+    os.makedirs(path, exist_ok=True)
+    _write_json(os.path.join(path, '{}.json'.format(os.getpid())), _dump())
+
+
+@contextmanager
+def _locked(path):
+    with open(os.path.join(path, '.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def collect():
+    """Returns the merged metrics of all processes as dict of metric names and values."""
+    flush()
+    path = metrics_path()
+    totals = {}
+    archive = {}
+    with _locked(path):
+        _merge(archive, _read_json(os.path.join(path, ARCHIVE)))
+        finished = []
+        for filename in os.listdir(path):
+            name, ext = os.path.splitext(filename)
+            if ext != '.json' or not name.isdigit():
+                continue
+            data = _read_json(os.path.join(path, filename))
+            if _pid_alive(int(name)):
+                _merge(totals, data)
+            else:
+                # the process has finished, move its values to the archive
+                _merge(archive, data)
+                finished.append(filename)
+        if finished:
+            _write_json(os.path.join(path, ARCHIVE), _to_json(archive))
+            for filename in finished:
+                os.remove(os.path.join(path, filename))
+    _merge(totals, _to_json(archive))
+    return totals
+
+
+def render():
+    """Returns the metrics in the Prometheus text format."""
+    totals = collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.append('# HELP {} {}'.format(metric.name, metric.documentation))
+        lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+        lines.extend(metric.lines(totals.get(metric.name, {})))
+    return '\n'.join(lines) + '\n'
+
+
+_run_process = Process._run_process
+
+
+def _instrumented_run_process(self, wps_request, wps_response):
+    start = time.time()
+    try:
+        return _run_process(self, wps_request, wps_response)
+    finally:
+        PROCESS_REQUESTS.inc(process=self.identifier)
+        PROCESS_DURATION.observe(time.time() - start, process=self.identifier)
+        if wps_response.status == WPS_STATUS.FAILED:
+            PROCESS_ERRORS.inc(process=self.identifier)
+        try:
+            flush()
+        except Exception:
+            LOGGER.exception("Could not write metrics.")
+
+
+def install():
+    """Records the number, errors and run time of all executed processes."""
+    Process._run_process = _instrumented_run_process
+
+
+class MetricsMiddleware(object):
+    """WSGI middleware serving the metrics at ``/metrics``."""
+
+    def __init__(self, app, path='/metrics'):
+        self.app = app
+        self.path = path
+
+    def __getattr__(self, name):
+        # the job queue workers use the wrapped PyWPS service
+        return getattr(self.app, name)
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').rstrip('/') != self.path:
+            return self.app(environ, start_response)
+        body = render().encode('utf-8')
+        start_response('200 OK', [
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Content-Length', str(len(body)))])
+        return [body]
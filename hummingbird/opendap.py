@@ -0,0 +1,269 @@
+"""
+CDL header of remote OpenDAP datasets built from the DAP2 DDS and DAS responses.
+
+Only the ``.dds`` and ``.das`` documents are requested, no variable data is
+transferred. Requests use a shared HTTP session with pooled connections.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import config
+from .cdl import escape
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+# DAP2 type -> (CDL type, CDL attribute value suffix)
+DAP_TYPES = {
+    'byte': ('ubyte', 'UB'),
+    'int16': ('short', 's'),
+    'uint16': ('ushort', 'US'),
+    'int32': ('int', ''),
+    'uint32': ('uint', 'U'),
+    'float32': ('float', 'f'),
+    'float64': ('double', ''),
+    'string': ('char', ''),
+    'url': ('char', ''),
+}
+
+TOKENS = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\];=,:]|[^\s{}\[\];=,:"]+', re.DOTALL)
+
+_lock = threading.Lock()
+_session = None
+
+
+def get_session():
+    """Returns the shared HTTP session used for OpenDAP metadata requests."""
+    global _session
+    with _lock:
+        if _session is None:
+            pool_size = config.get_int('opendap', 'pool_size', 10)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def is_opendap_url(dataset):
+    return dataset.startswith(('http://', 'https://'))
+
+
+def fetch(url, suffix):
+    timeout = config.get_int('opendap', 'timeout', 30)
+    resp = get_session().get(url + suffix, timeout=timeout)
+    resp.raise_for_status()
+    return resp.text
+
+
+def tokenize(text):
+    return TOKENS.findall(text)
+
+
+def unquote(token):
+    if token.startswith('"'):
+        return re.sub(r'\\(.)', r'\1', token[1:-1])
+    return token
+
+
+class _Tokens(object):
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("unexpected end of document")
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        token = self.next()
+        if token.lower() != value.lower():
+            raise ValueError("expected {!r}, got {!r}".format(value, token))
+
+
+def parse_dds(text):
+    """
+    Parses a DDS document.
+    Returns a tuple ``(name, variables)`` where variables is an ordered dict of
+    variable names and tuples ``(dap_type, [(dim_name, size), ...])``.
+    Grids are flattened to their array, maps are added as variables.
+    """
+    tokens = _Tokens(text)
+    tokens.expect('Dataset')
+    tokens.expect('{')
+    variables = OrderedDict()
+    _parse_declarations(tokens, variables, prefix='')
+    name = tokens.next()
+    return name, variables
+
+
+def _parse_declarations(tokens, variables, prefix):
+    while tokens.peek() != '}':
+        dap_type = tokens.next()
+        if dap_type.lower() == 'grid':
+            tokens.expect('{')
+            grid_vars = OrderedDict()
+            while tokens.peek() != '}':
+                if tokens.peek().upper() in ('ARRAY', 'MAPS'):
+                    tokens.next()
+                    tokens.expect(':')
+                    continue
+                _parse_variable(tokens, grid_vars, '')
+            tokens.expect('}')
+            name = tokens.next()
+            tokens.expect(';')
+            array = list(grid_vars.values())[0]
+            for var_name, var in list(grid_vars.items())[1:]:
+                variables.setdefault(prefix + var_name, var)
+            variables[prefix + name] = array
+        elif dap_type.lower() in ('structure', 'sequence'):
+            tokens.expect('{')
+            members = OrderedDict()
+            _parse_declarations(tokens, members, '')
+            tokens.expect('}')
+            name = tokens.next()
+            tokens.expect(';')
+            for var_name, var in members.items():
+                variables[prefix + name + '.' + var_name] = var
+        else:
+            tokens.pos -= 1
+            _parse_variable(tokens, variables, prefix)
+    tokens.expect('}')
+
+
+def _parse_variable(tokens, variables, prefix):
+    dap_type = tokens.next()
+    name = unquote(tokens.next())
+    dims = []
+    while tokens.peek() == '[':
+        tokens.next()
+        dim_name = tokens.next()
+        if tokens.peek() == '=':
+            tokens.next()
+            size = int(tokens.next())
+        else:
+            size, dim_name = int(dim_name), None
+        tokens.expect(']')
+        dims.append((dim_name, size))
+    tokens.expect(';')
+    variables[prefix + name] = (dap_type.lower(), dims)
+
+
+def parse_das(text):
+    """
+    Parses a DAS document.
+    Returns an ordered dict of container names and ordered dicts of
+    attribute names and tuples ``(dap_type, [values])``.
+    """
+    tokens = _Tokens(text)
+    tokens.expect('Attributes')
+    tokens.expect('{')
+    containers = OrderedDict()
+    while tokens.peek() != '}':
+        name = unquote(tokens.next())
+        tokens.expect('{')
+        containers[name] = _parse_attributes(tokens, containers, name)
+    tokens.expect('}')
+    return containers
+
+
+def _parse_attributes(tokens, containers, container):
+    attributes = OrderedDict()
+    while tokens.peek() != '}':
+        dap_type = tokens.next()
+        name = unquote(tokens.next())
+        if name == '{':
+            # nested container, flatten as "container.name"
+            containers[container + '.' + dap_type] = _parse_attributes(
+                tokens, containers, container + '.' + dap_type)
+            continue
+        values = []
+        while tokens.peek() != ';':
+            token = tokens.next()
+            if token != ',':
+                values.append(unquote(token))
+        tokens.expect(';')
+        attributes[name] = (dap_type.lower(), values)
+    tokens.expect('}')
+    return attributes
+
+
+def _format_values(dap_type, values):
+    cdl_type, suffix = DAP_TYPES.get(dap_type, ('char', ''))
+    if cdl_type == 'char':
+        return escape('\n'.join(values))
+    formatted = []
+    for value in values:
+        if value.lower() == 'nan':
+            value = 'NaN'
+        formatted.append(value + suffix)
+    return ', '.join(formatted)
+
+
+def to_cdl(name, variables, attributes):
+    """Returns CDL header lines of the parsed DDS variables and DAS attributes."""
+    unlimited = None
+    extra = attributes.get('DODS_EXTRA', {})
+    if 'Unlimited_Dimension' in extra:
+        unlimited = extra['Unlimited_Dimension'][1][0]
+
+    dimensions = OrderedDict()
+    for var_name, (_, dims) in variables.items():
+        for idx, (dim_name, size) in enumerate(dims):
+            dim_name = dim_name or '{}_{}'.format(var_name, idx)
+            dimensions.setdefault(dim_name, size)
+
+    lines = ['netcdf {} {{'.format(name)]
+    if dimensions:
+        lines.append('dimensions:')
+        for dim_name, size in dimensions.items():
+            if dim_name == unlimited:
+                lines.append('\t{} = UNLIMITED ; // ({} currently)'.format(dim_name, size))
+            else:
+                lines.append('\t{} = {} ;'.format(dim_name, size))
+    if variables:
+        lines.append('variables:')
+        for var_name, (dap_type, dims) in variables.items():
+            cdl_type = DAP_TYPES.get(dap_type, ('char', ''))[0]
+            dim_names = [dim_name or '{}_{}'.format(var_name, idx) for idx, (dim_name, _) in enumerate(dims)]
+            if dim_names:
+                lines.append('\t{} {}({}) ;'.format(cdl_type, var_name, ', '.join(dim_names)))
+            else:
+                lines.append('\t{} {} ;'.format(cdl_type, var_name))
+            for att_name, (att_type, values) in attributes.get(var_name, {}).items():
+                lines.append('\t\t{}:{} = {} ;'.format(var_name, att_name, _format_values(att_type, values)))
+    global_lines = []
+    for container, attrs in attributes.items():
+        if container == 'NC_GLOBAL' or container.endswith('_GLOBAL'):
+            for att_name, (att_type, values) in attrs.items():
+                global_lines.append('\t\t:{} = {} ;'.format(att_name, _format_values(att_type, values)))
+    if global_lines:
+        lines.append('')
+        lines.append('// global attributes:')
+        lines.extend(global_lines)
+    lines.append('}')
+    return lines
+
+
+def dump_header(url, name=None):
+    """
+    Returns the CDL header of the OpenDAP dataset at ``url`` as list of lines,
+    using only the DDS and DAS responses.
+    """
+    dds_name, variables = parse_dds(fetch(url, '.dds'))
+    attributes = parse_das(fetch(url, '.das'))
+    lines = to_cdl(name or dds_name, variables, attributes)
+    return ['{}\n'.format(line) for line in lines]
@@ -1,10 +1,116 @@
-from .wps_ncdump import NCDump
-from .wps_compliance_checker import CChecker
-from .wps_cfchecker import CFChecker
+"""
+Registry of the WPS processes.
 
+The served processes are enabled in the ``[processes]`` section of the configuration.
+Processes calling an external tool or using a Python package which is not installed
+are skipped, the tools and packages are looked up once on service start.
 
-processes = [
-    NCDump(),
-    CChecker(),
-    CFChecker(),
-]
+The process modules only import PyWPS and light weight helpers. The checkers and
+their scientific dependencies (compliance-checker and its plugins, netCDF4, numpy)
+are imported by the process handlers on the first Execute request.
+"""
+
+import time
+import importlib
+import importlib.util
+from collections import OrderedDict
+
+from hummingbird import config
+from hummingbird.command import which
+from hummingbird.utils import lazy_attributes
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+# process identifier -> "module:class"
+REGISTRY = OrderedDict([
+    ('ncdump', 'hummingbird.processes.wps_ncdump:NCDump'),
+    ('cchecker', 'hummingbird.processes.wps_compliance_checker:CChecker'),
+    ('cfchecker', 'hummingbird.processes.wps_cfchecker:CFChecker'),
+    ('spotchecker', 'hummingbird.processes.wps_spotchecker:SpotChecker'),
+    ('spotchecker_batch', 'hummingbird.processes.wps_spotchecker_batch:BatchSpotChecker'),
+    ('cmor_checker', 'hummingbird.processes.wps_cmor_checker:CMORChecker'),
+    ('qa_checker', 'hummingbird.processes.wps_hdh_qachecker:QualityChecker'),
+    ('qa_cfchecker', 'hummingbird.processes.wps_hdh_cfchecker:HDHCFChecker'),
+])
+
+# process identifier -> external tools needed by the process
+TOOLS = {
+    'cmor_checker': ['PrePARE'],
+    'qa_checker': ['qa-dkrz'],
+    'qa_cfchecker': ['dkrz-cf-checker'],
+}
+
+# process identifier -> Python packages needed by the process
+MODULES = {
+    'cchecker': ['compliance_checker'],
+    'cfchecker': ['cfchecker'],
+    'spotchecker': ['compliance_checker'],
+    'spotchecker_batch': ['compliance_checker'],
+}
+
+DEFAULT_PROCESSES = ['ncdump', 'cchecker', 'cfchecker']
+
+# process identifier -> seconds spent importing the process module
+IMPORT_TIMES = OrderedDict()
+
+
+# package name -> True if installed, probed once per process
+_modules = {}
+
+
+def module_available(name):
+    """Returns True if the package ``name`` can be imported, without importing it."""
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            _modules[name] = False
+    return _modules[name]
+
+
+def load_process(identifier):
+    """Imports and returns a new instance of the process ``identifier``."""
+    module_name, class_name = REGISTRY[identifier].split(':')
+    start = time.time()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES.setdefault(identifier, time.time() - start)
+    return getattr(module, class_name)()
+
+
+def load_processes(identifiers=None):
+    """Returns instances of the registered processes, or only of ``identifiers``."""
+    return [load_process(identifier) for identifier in identifiers or REGISTRY]
+
+
+def enabled_processes():
+    """
+    Returns the identifiers of the processes enabled in the configuration
+    whose external tools and Python packages are installed.
+    """
+    value = config.get_config_value('processes', 'enabled', ', '.join(DEFAULT_PROCESSES))
+    if value.strip() == 'all':
+        identifiers = list(REGISTRY)
+    else:
+        identifiers = [identifier.strip() for identifier in value.split(',') if identifier.strip()]
+    enabled = []
+    for identifier in identifiers:
+        if identifier not in REGISTRY:
+            LOGGER.warning("skipping unknown process %s", identifier)
+            continue
+        missing = [tool for tool in TOOLS.get(identifier, []) if which(tool) is None]
+        missing.extend(name for name in MODULES.get(identifier, []) if not module_available(name))
+        if missing:
+            LOGGER.warning("skipping process %s, missing %s", identifier, ', '.join(missing))
+            continue
+        enabled.append(identifier)
+    return enabled
+
+
+def log_import_times():
+    for identifier, duration in IMPORT_TIMES.items():
+        LOGGER.info("imported process %s (%s) in %.3f secs", identifier, REGISTRY[identifier], duration)
+
+
+# the default processes are instantiated on first use
+lazy_attributes(__name__, processes=lambda: load_processes(DEFAULT_PROCESSES))
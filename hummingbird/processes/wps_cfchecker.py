@@ -1,5 +1,6 @@
 import os
-from subprocess import check_output, CalledProcessError
+import time
+from subprocess import CalledProcessError
 
 from pywps import Process
 from pywps import LiteralInput
@@ -7,23 +8,55 @@ from pywps import ComplexInput, ComplexOutput
 from pywps import FORMATS
 from pywps.app.Common import Metadata
 
+from hummingbird import config
+from hummingbird import cfchecks
+from hummingbird import cftables
+from hummingbird.cache import get_cache
+from hummingbird.command import run_command
+from hummingbird.metrics import phase
+from hummingbird.summary import SUMMARY_FORMAT, Summary, count_messages
+from hummingbird.utils import imap_ordered
+
 import logging
 LOGGER = logging.getLogger("PYWPS")
 
 
+def cfchecks_version():
+    try:
+        from cfchecker import __version__
+    except ImportError:
+        __version__ = ''
+    return __version__
+
+
 def cf_check(nc_file, version):
-    # TODO: avoid downloading of cf table for each check (see pypi page)
     LOGGER.debug("checking %s", os.path.basename(nc_file))
     if not nc_file.endswith(".nc"):
         new_name = nc_file + ".nc"
         os.rename(nc_file, new_name)
         nc_file = new_name
-    cmd = ["cfchecks", "--version", version, nc_file]
-    try:
-        cf_report = check_output(cmd)
-    except CalledProcessError as err:
-        LOGGER.warn("cfchecks failed!")
-        cf_report = err.output
+    cache = get_cache()
+    cache_key = None
+    if cache:
+        cache_key = cache.key(nc_file, 'cfchecker', cfchecks_version(), cftables.versions(), version)
+        entry = cache.get(cache_key)
+        if entry:
+            with open(entry[0], 'rb') as fp:
+                return fp.read()
+    cf_report = None
+    if config.get_config_value('cfchecker', 'mode', 'inprocess') == 'inprocess':
+        cf_report = cfchecks.check(nc_file, version)
+    if cf_report is None:
+        cmd = ["cfchecks", "--version", version]
+        cmd.extend(cftables.cfchecks_options())
+        cmd.append(nc_file)
+        try:
+            cf_report = run_command(cmd)
+        except CalledProcessError as err:
+            LOGGER.warn("cfchecks failed!")
+            cf_report = err.output
+    if cache:
+        cache.put_data(cache_key, cf_report)
     return cf_report
 
 
@@ -49,6 +82,11 @@ class CFChecker(Process):
                           abstract="Summary of the CF compliance check",
                           as_reference=True,
                           supported_formats=[FORMATS.TEXT]),
+            ComplexOutput('summary', 'CF Checker Summary',
+                          abstract="Status, number of errors and warnings and report offsets"
+                                   " of each dataset as JSON lines.",
+                          as_reference=True,
+                          supported_formats=[SUMMARY_FORMAT]),
         ]
 
         super(CFChecker, self).__init__(
@@ -72,15 +110,37 @@ class CFChecker(Process):
 
     def _handler(self, request, response):
         datasets = []
-        if 'dataset' in request.inputs:
-            for dataset in request.inputs['dataset']:
-                datasets.append(dataset.file)
+        with phase(self.identifier, 'fetch'):
+            if 'dataset' in request.inputs:
+                for dataset in request.inputs['dataset']:
+                    datasets.append(dataset.file)
+
+        cf_version = request.inputs['cf_version'][0].data
+
+        def progress(count, total, dataset):
+            response.update_status("cfchecker: %d/%d" % (count, total), int(count * 99.0 / total))
+
+        def check(dataset):
+            start = time.time()
+            cf_report = cf_check(dataset, version=cf_version)
+            return cf_report, time.time() - start
 
         output_file = os.path.join(self.workdir, 'cfchecker_output.txt')
-        for dataset in datasets:
-            cf_report = cf_check(dataset, version=request.inputs['cf_version'][0].data)
-            with open(output_file, 'a') as fp:
-                fp.write("{}\n\n".format(cf_report.decode('UTF-8', 'ignore')))
+        offset = 0
+        with open(output_file, 'wb') as fp, Summary(os.path.join(self.workdir, 'summary.jsonl')) as summary, \
+                phase(self.identifier, 'check'):
+            for dataset, (cf_report, duration) in imap_ordered(
+                    check, datasets, max_workers=config.max_workers(), callback=progress):
+                report = "{}\n\n".format(cf_report.decode('UTF-8', 'ignore')).encode('UTF-8')
+                fp.write(report)
+                fp.flush()
+                errors, warnings = count_messages(cf_report)
+                summary.add(
+                    os.path.basename(dataset), 'FAIL' if errors else 'PASS', errors, warnings, duration,
+                    report=os.path.basename(output_file), offset=offset, length=len(report))
+                offset += len(report)
+        # set after writing, status updates store the outputs
         response.outputs['output'].file = output_file
+        response.outputs['summary'].file = summary.filename
         response.update_status("cfchecker done.", 100)
         return response
@@ -1,7 +1,12 @@
 import os
-import tarfile
+import time
 
+from hummingbird import config
+from hummingbird.archive import ReportArchive, archive_formats
+from hummingbird.metrics import phase
 from hummingbird.processing import cmor_checker
+from hummingbird.summary import SUMMARY_FORMAT, Summary, count_messages
+from hummingbird.utils import imap_ordered, make_dirs
 
 from pywps import Process
 from pywps import LiteralInput
@@ -52,7 +57,11 @@ class CMORChecker(Process):
             ComplexOutput('report_tar', 'Reports as tarfile',
                           abstract="Report of check result for each file as tarfile.",
                           as_reference=True,
-                          supported_formats=[Format('application/x-tar')]),
+                          supported_formats=archive_formats('none')),
+            ComplexOutput('summary', 'Summary of check results',
+                          abstract="Status, number of errors and warnings and report of each dataset as JSON lines.",
+                          as_reference=True,
+                          supported_formats=[SUMMARY_FORMAT]),
         ]
 
         super(CMORChecker, self).__init__(
@@ -74,46 +83,78 @@ class CMORChecker(Process):
         )
 
     def _handler(self, request, response):
-        # TODO: iterate input files ... run parallel
         # TODO: generate html report with links to cfchecker output ...
         datasets = []
-        if 'dataset' in request.inputs:
-            for dataset in request.inputs['dataset']:
-                datasets.append(dataset.file)
-        # append opendap urls
-        if 'dataset_opendap' in request.inputs:
-            for dataset in request.inputs['dataset_opendap']:
-                datasets.append(dataset.data)
+        with phase(self.identifier, 'fetch'):
+            if 'dataset' in request.inputs:
+                for dataset in request.inputs['dataset']:
+                    datasets.append(dataset.file)
+            # append opendap urls
+            if 'dataset_opendap' in request.inputs:
+                for dataset in request.inputs['dataset_opendap']:
+                    datasets.append(dataset.data)
         if 'variable' in request.inputs:
             variable = request.inputs['variable'][0].data
         else:
             variable = None
 
-        max_count = len(datasets)
-        step = 100.0 / max_count
+        report_dir = os.path.join(self.workdir, 'report')
+        make_dirs(report_dir)
+
+        def check(item):
+            idx, ds = item
+            dataset_id = os.path.basename(ds)
+            LOGGER.info("checking dataset %s", dataset_id)
+            # datasets may have the same file name
+            report_file = os.path.join(report_dir, "{0:04d}_{1}.txt".format(idx, dataset_id))
+            start = time.time()
+            return_value = cmor_checker(
+                ds,
+                variable=variable,
+                output_filename=report_file)
+            return report_file, return_value, time.time() - start
+
+        # reports are added to the archive as soon as they are written
+        archive = ReportArchive(os.path.join(self.workdir, "report"), compression='none')
+        partial_url = archive.publish(self.uuid)
+
+        def progress(count, total, item):
+            message = "checks: %d/%d" % (count, total)
+            if partial_url:
+                message += ", partial reports: " + partial_url
+            response.update_status(message, int(count * 99.0 / total))
 
         # output
-        os.mkdir("report")
-        with open('report/summary.txt', 'w') as fp:
-            response.outputs['output'].file = fp.name
-            for idx, ds in enumerate(datasets):
+        last_report = None
+        with archive, open(os.path.join(report_dir, 'summary.txt'), 'w') as fp, \
+                Summary(os.path.join(self.workdir, 'summary.jsonl')) as summary, phase(self.identifier, 'check'):
+            for (_, ds), (report_file, return_value, duration) in imap_ordered(
+                    check, list(enumerate(datasets)), max_workers=config.max_workers(), callback=progress):
                 dataset_id = os.path.basename(ds)
-                LOGGER.info("checking dataset %s", dataset_id)
-                report_file = "report/{0}.txt".format(dataset_id)
-                response.outputs['report'].file = report_file
-                return_value = cmor_checker(
-                    ds,
-                    variable=variable,
-                    output_filename=report_file)
+                arcname = os.path.join("report", os.path.basename(report_file))
+                archive.add(report_file, arcname=arcname)
+                with open(report_file, 'rb') as report:
+                    errors, warnings = count_messages(report.read())
+                # the report is a member of the archive
+                summary.add(
+                    dataset_id, 'FAIL' if return_value is False else 'PASS', errors, warnings, duration,
+                    report=arcname, offset=0, length=os.path.getsize(report_file))
+                # keep only the last report on disk, it is the report output
+                if last_report and last_report != report_file:
+                    os.remove(last_report)
+                last_report = report_file
                 if return_value is False:
                     LOGGER.info("dataset check %s with errors.", dataset_id)
                     fp.write("{0}, FAIL\n".format(dataset_id))
                 else:
                     fp.write("{0}, PASS\n".format(dataset_id))
-                response.update_status("checks: %d/%d" % (idx, max_count), int(idx * step))
-        with tarfile.open("report.tar", "w") as tar:
-            response.outputs['report_tar'].file = tar.name
-            tar.add("report")
+            fp.flush()
+            archive.add(fp.name, arcname=os.path.join("report", "summary.txt"))
+        response.outputs['output'].file = fp.name
+        response.outputs['summary'].file = summary.filename
+        response.outputs['report'].file = last_report
+        response.outputs['report_tar'].data_format = archive.data_format
+        response.outputs['report_tar'].file = archive.filename
 
         response.update_status("cmor checker finshed.", 100)
         return response
@@ -1,7 +1,8 @@
 import os
 
-from compliance_checker.runner import ComplianceChecker, CheckSuite
-from compliance_checker import __version__ as cchecker_version
+from hummingbird.cache import get_cache
+from hummingbird.metrics import phase
+from hummingbird.utils import package_version
 
 from pywps import Process
 from pywps import LiteralInput
@@ -67,7 +68,7 @@ class CChecker(Process):
             self._handler,
             identifier="cchecker",
             title="IOOS Compliance Checker",
-            version=cchecker_version,
+            version=package_version('compliance-checker'),
             abstract="Runs the IOOS Compliance Checker tool to"
                      " check datasets against compliance standards.",
             metadata=[
@@ -82,20 +83,23 @@ class CChecker(Process):
 
     def _handler(self, request, response):
         dataset = None
-        if 'dataset_opendap' in request.inputs:
-            dataset = request.inputs['dataset_opendap'][0].url
-            LOGGER.debug("opendap dataset url: {}".format(dataset))
-        elif 'dataset' in request.inputs:
-            dataset = request.inputs['dataset'][0].file
-            LOGGER.debug("opendap dataset file: {}".format(dataset))
+        with phase(self.identifier, 'fetch'):
+            if 'dataset_opendap' in request.inputs:
+                dataset = request.inputs['dataset_opendap'][0].url
+                LOGGER.debug("opendap dataset url: {}".format(dataset))
+            elif 'dataset' in request.inputs:
+                dataset = request.inputs['dataset'][0].file
+                LOGGER.debug("opendap dataset file: {}".format(dataset))
 
         if not dataset:
             raise ProcessError("You need to provide a Dataset.")
 
         output_format = request.inputs['format'][0].data
 
-        check_suite = CheckSuite()
-        check_suite.load_all_available_checkers()
+        # the compliance checker and its plugins are imported on the first check
+        from compliance_checker.runner import ComplianceChecker
+        from hummingbird.checksuite import get_check_suite
+        check_suite = get_check_suite()
         if not request.inputs['test'][0].data in check_suite.checkers:
             raise ProcessError("Test {} is not available.".format(request.inputs['test'][0].data))
 
@@ -103,14 +107,27 @@ class CChecker(Process):
             self.workdir,
             "check_report.{}".format(output_format))
 
-        LOGGER.info("checking dataset {}".format(dataset))
-        ComplianceChecker.run_checker(
-            dataset,
-            checker_names=[checker.data for checker in request.inputs['test']],
-            verbose=True,
-            criteria=request.inputs['criteria'][0].data,
-            output_filename=output_file,
-            output_format=output_format)
+        checker_names = [checker.data for checker in request.inputs['test']]
+        criteria = request.inputs['criteria'][0].data
+        cache = get_cache()
+        cache_key = None
+        if cache:
+            cache_key = cache.key(
+                dataset, self.identifier, self.version, checker_names, criteria, output_format)
+        if cache and cache.get_file(cache_key, output_file) is not None:
+            LOGGER.info("using cached report for dataset {}".format(dataset))
+        else:
+            LOGGER.info("checking dataset {}".format(dataset))
+            with phase(self.identifier, 'check'):
+                ComplianceChecker.run_checker(
+                    dataset,
+                    checker_names=checker_names,
+                    verbose=True,
+                    criteria=criteria,
+                    output_filename=output_file,
+                    output_format=output_format)
+            if cache:
+                cache.put(cache_key, output_file)
         response.outputs['output'].file = output_file
         response.update_status("compliance checker finshed.", 100)
         return response
@@ -1,9 +1,16 @@
+import os
+import time
+
 from pywps import Process
 from pywps import LiteralInput
 from pywps import ComplexInput, ComplexOutput
 from pywps import Format
 from pywps.app.Common import Metadata
 
+from hummingbird import config
+from hummingbird.summary import SUMMARY_FORMAT, Summary, count_messages
+from hummingbird.utils import imap_ordered
+
 import logging
 LOGGER = logging.getLogger("PYWPS")
 
@@ -31,6 +38,11 @@ class HDHCFChecker(Process):
                           abstract="Summary of the CF compliance check",
                           as_reference=True,
                           supported_formats=[Format('text/plain')]),
+            ComplexOutput('summary', 'CF Checker Summary',
+                          abstract="Status, number of errors and warnings and report offsets"
+                                   " of each dataset as JSON lines.",
+                          as_reference=True,
+                          supported_formats=[SUMMARY_FORMAT]),
         ]
 
         super(HDHCFChecker, self).__init__(
@@ -64,17 +76,34 @@ class HDHCFChecker(Process):
         from hummingbird.processing import hdh_cf_check
         response.update_status("starting cfchecker ...", 0)
 
-        # TODO: iterate input files ... run parallel
         # TODO: generate html report with links to cfchecker output ...
         datasets = [dataset.file for dataset in request.inputs['dataset']]
+        cf_version = request.inputs['cf_version'][0].data
+
+        def progress(count, total, dataset):
+            response.update_status("cfchecker: %d/%d" % (count, total), int(count * 99.0 / total))
+
+        def check(dataset):
+            start = time.time()
+            cf_report = hdh_cf_check(dataset, version=cf_version)
+            return cf_report, time.time() - start
 
-        max_count = len(datasets)
-        step = 100.0 / max_count
-        for idx, dataset in enumerate(datasets):
-            cf_report = hdh_cf_check(dataset, version=request.inputs['cf_version'][0].data)
-            with open('cfchecker_output.txt', 'a') as fp:
-                response.outputs['output'].file = fp.name
+        output_file = os.path.join(self.workdir, 'cfchecker_output.txt')
+        offset = 0
+        with open(output_file, 'wb') as fp, Summary(os.path.join(self.workdir, 'summary.jsonl')) as summary:
+            for dataset, (cf_report, duration) in imap_ordered(
+                    check, datasets, max_workers=config.max_workers(), callback=progress):
+                if isinstance(cf_report, str):
+                    cf_report = cf_report.encode('UTF-8')
                 fp.write(cf_report)
-                response.update_status("cfchecker: %d/%d" % (idx, max_count), int(idx * step))
+                fp.flush()
+                errors, warnings = count_messages(cf_report)
+                summary.add(
+                    os.path.basename(dataset), 'FAIL' if errors else 'PASS', errors, warnings, duration,
+                    report=os.path.basename(output_file), offset=offset, length=len(cf_report))
+                offset += len(cf_report)
+        # set after writing, status updates store the outputs
+        response.outputs['output'].file = output_file
+        response.outputs['summary'].file = summary.filename
         response.update_status("cfchecker done.", 100)
         return response
@@ -1,4 +1,6 @@
-import tarfile
+import os
+import time
+import shutil
 
 from pywps import Process
 from pywps import LiteralInput
@@ -6,6 +8,12 @@ from pywps import ComplexInput, ComplexOutput
 from pywps import Format
 from pywps.app.Common import Metadata
 
+from hummingbird import config
+from hummingbird.archive import ReportArchive, archive_formats
+from hummingbird.metrics import phase
+from hummingbird.summary import SUMMARY_FORMAT, Summary, count_qa_events
+from hummingbird.utils import imap_ordered, make_dirs
+
 import logging
 LOGGER = logging.getLogger("PYWPS")
 
@@ -30,11 +38,16 @@ class QualityChecker(Process):
             ComplexOutput('output', 'Quality Checker Report',
                           abstract="Qualtiy checker results as tar archive.",
                           as_reference=True,
-                          supported_formats=[Format('application/x-tar-gz')]),
+                          supported_formats=archive_formats('gz')),
             ComplexOutput('logfile', 'Quality Checker Logfile',
                           abstract="Qualtiy checker summary logfile",
                           as_reference=True,
                           supported_formats=[Format('text/yaml')]),
+            ComplexOutput('summary', 'Quality Checker Summary',
+                          abstract="Status, number of errors and warnings and logfile offsets"
+                                   " of each dataset as JSON lines.",
+                          as_reference=True,
+                          supported_formats=[SUMMARY_FORMAT]),
         ]
 
         super(QualityChecker, self).__init__(
@@ -68,18 +81,53 @@ class QualityChecker(Process):
 
         response.update_status("starting qa checker ...", 0)
 
-        datasets = [dataset.file for dataset in request.inputs['dataset']]
-        logfile = results_path = None
-        for idx, ds in enumerate(datasets):
-            progress = idx * 100 / len(datasets)
-            response.update_status("checking %s" % ds, progress)
-            logfile, results_path = hdh_qa_checker(ds, project=request.inputs['project'][0].data)
-        if logfile and results_path:
-            # output tar archive
-            with tarfile.open('output.tar.gz', "w:gz") as tar:
-                response.outputs['output'].file = tar.name
-                tar.add(results_path)
-            response.outputs['logfile'].file = logfile
+        with phase(self.identifier, 'fetch'):
+            datasets = [dataset.file for dataset in request.inputs['dataset']]
+        project = request.inputs['project'][0].data
+        qa_dir = os.path.join(self.workdir, 'qa')
+        # each check gets its own work and results directory
+        output_dirs = dict(
+            (ds, os.path.join(qa_dir, "{0:04d}_{1}".format(idx, os.path.basename(ds))))
+            for idx, ds in enumerate(datasets))
+        make_dirs(qa_dir)
+
+        def check(ds):
+            LOGGER.info("checking dataset %s", os.path.basename(ds))
+            start = time.time()
+            logfile, _ = hdh_qa_checker(ds, project=project, output_dir=output_dirs[ds])
+            return logfile, time.time() - start
+
+        # results are added to the archive as soon as a check has finished
+        archive = ReportArchive(os.path.join(self.workdir, 'output'), compression='gz')
+        partial_url = archive.publish(self.uuid)
+
+        def progress(count, total, ds):
+            message = "checks: %d/%d" % (count, total)
+            if partial_url:
+                message += ", partial results: " + partial_url
+            response.update_status(message, int(count * 99.0 / total))
+
+        # merge the logs of all checks into one report
+        with archive, open(os.path.join(self.workdir, 'qa_report.txt'), 'wb') as fp, \
+                Summary(os.path.join(self.workdir, 'summary.jsonl')) as summary, phase(self.identifier, 'check'):
+            for ds, (logfile, duration) in imap_ordered(
+                    check, datasets, max_workers=config.max_workers(), callback=progress):
+                fp.write("--- # {0}\n".format(os.path.basename(ds)).encode('utf-8'))
+                offset = fp.tell()
+                with open(logfile, 'rb') as log:
+                    content = log.read()
+                fp.write(content)
+                errors, warnings = count_qa_events(content)
+                summary.add(
+                    os.path.basename(ds), 'FAIL' if errors else 'PASS', errors, warnings, duration,
+                    report=os.path.basename(fp.name), offset=offset, length=len(content))
+                archive.add(os.path.join(output_dirs[ds], 'QA_Results'), arcname=os.path.basename(output_dirs[ds]))
+                shutil.rmtree(output_dirs[ds], ignore_errors=True)
+        # set after writing, status updates store the outputs
+        response.outputs['logfile'].file = fp.name
+        response.outputs['summary'].file = summary.filename
+        response.outputs['output'].data_format = archive.data_format
+        response.outputs['output'].file = archive.filename
 
         response.update_status("qa checker done.", 100)
         return response
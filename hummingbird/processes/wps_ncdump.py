@@ -5,6 +5,8 @@ from pywps import FORMATS
 from pywps.app.Common import Metadata
 from pywps.app.exceptions import ProcessError
 
+from hummingbird.cache import get_cache
+from hummingbird.metrics import phase
 from hummingbird.processing import ncdump, ncgen
 
 import logging
@@ -33,7 +35,8 @@ class NCDump(Process):
                           as_reference=True,
                           supported_formats=[FORMATS.TEXT]),
             ComplexOutput('ncgen', 'NetCDF file generated from Metadata',
-                          abstract='NetCDF file generated from Metadata',
+                          abstract='NetCDF file generated from Metadata.'
+                                   ' Only generated when this output is requested.',
                           as_reference=True,
                           supported_formats=[FORMATS.NETCDF]),
         ]
@@ -53,21 +56,32 @@ class NCDump(Process):
             store_supported=True)
 
     def _handler(self, request, response):
-        if 'dataset_opendap' in request.inputs:
-            dataset = request.inputs['dataset_opendap'][0].url
-        elif 'dataset' in request.inputs:
-            dataset = request.inputs['dataset'][0].file
-        else:
-            raise ProcessError("You need to provide a Dataset.")
+        with phase(self.identifier, 'fetch'):
+            if 'dataset_opendap' in request.inputs:
+                dataset = request.inputs['dataset_opendap'][0].url
+            elif 'dataset' in request.inputs:
+                dataset = request.inputs['dataset'][0].file
+            else:
+                raise ProcessError("You need to provide a Dataset.")
 
         cdl_file = os.path.join(self.workdir, "nc_dump.cdl")
-        with open(cdl_file, 'w') as fp:
+        with open(cdl_file, 'w') as fp, phase(self.identifier, 'check'):
             fp.writelines(ncdump(dataset))
             response.outputs['output'].output_format = FORMATS.TEXT
             response.outputs['output'].file = fp.name
-        output_file = os.path.join(self.workdir, "nc_dump.nc")
-        ncgen(cdl_file, output_file)
-        response.outputs['ncgen'].output_format = FORMATS.NETCDF
-        response.outputs['ncgen'].file = output_file
+        if 'ncgen' in request.outputs:
+            output_file = os.path.join(self.workdir, "nc_dump.nc")
+            cache = get_cache()
+            cache_key = cache.key(cdl_file, self.identifier, 'ncgen') if cache else None
+            if not cache or cache.get_file(cache_key, output_file) is None:
+                with phase(self.identifier, 'report'):
+                    ncgen(cdl_file, output_file)
+                if cache and os.path.isfile(output_file):
+                    cache.put(cache_key, output_file)
+            response.outputs['ncgen'].output_format = FORMATS.NETCDF
+            response.outputs['ncgen'].file = output_file
+        else:
+            # skip the ncgen round-trip unless the client asked for it
+            del response.outputs['ncgen']
         response.update_status('done', 100)
         return response
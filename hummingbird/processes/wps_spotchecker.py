@@ -1,6 +1,6 @@
 import os
-from compliance_checker.runner import ComplianceChecker, CheckSuite
 
+from hummingbird.metrics import phase
 from hummingbird.processing import ncdump, cmor_checker
 
 from pywps import Process
@@ -14,6 +14,49 @@ import logging
 LOGGER = logging.getLogger("PYWPS")
 
 
+def spot_check(dataset, test, output_dir):
+    """
+    Runs the compliance checks ``test`` on a dataset and writes the report to ``output_dir``.
+    Returns a tuple ``(report_file, passed, counts)``, passed is ``None`` if unknown.
+    ``counts`` is a tuple ``(errors, warnings)``, for the CF checks the number of
+    failed checks of high and medium priority.
+    """
+    if 'CF' in test:
+        from compliance_checker.runner import ComplianceChecker
+        from hummingbird.checksuite import get_check_suite, failed_checks
+        suite = get_check_suite()
+        report_file = os.path.join(output_dir, "report.html")
+        ds = suite.load_dataset(dataset)
+        try:
+            score_groups = suite.run_all(ds, ['cf'])
+        finally:
+            if hasattr(ds, 'close'):
+                ds.close()
+        if not score_groups:
+            raise ValueError("No checks found for test {}".format(test))
+        # criteria normal: checks of high and medium priority
+        limit = 2
+        ComplianceChecker.html_output(suite, {dataset: score_groups}, report_file, dataset, limit)
+        groups = [group for group, _ in score_groups.values()]
+        passed = all(suite.passtree(group, limit) for group in groups)
+        high, medium, _ = failed_checks(suite, [result for group in groups for result in group])
+        counts = (high, medium)
+    elif 'CMIP6' in test:
+        from hummingbird.summary import count_messages
+        report_file = os.path.join(output_dir, "cmip6-cmor.txt")
+        passed = cmor_checker(dataset, output_filename=report_file)
+        with open(report_file, 'rb') as fp:
+            counts = count_messages(fp.read())
+    else:
+        from hummingbird.processing import hdh_qa_checker
+        from hummingbird.summary import count_qa_events
+        report_file, _ = hdh_qa_checker(dataset, project=test)
+        passed = None
+        with open(report_file, 'rb') as fp:
+            counts = count_qa_events(fp.read())
+    return report_file, passed, counts
+
+
 class SpotChecker(Process):
     def __init__(self):
         inputs = [
@@ -70,12 +113,13 @@ class SpotChecker(Process):
         )
 
     def _handler(self, request, response):
-        if 'dataset_opendap' in request.inputs:
-            dataset = request.inputs['dataset_opendap'][0].url
-        elif 'dataset' in request.inputs:
-            dataset = request.inputs['dataset'][0].file
-        else:
-            raise ProcessError("You need to provide a Dataset.")
+        with phase(self.identifier, 'fetch'):
+            if 'dataset_opendap' in request.inputs:
+                dataset = request.inputs['dataset_opendap'][0].url
+            elif 'dataset' in request.inputs:
+                dataset = request.inputs['dataset'][0].file
+            else:
+                raise ProcessError("You need to provide a Dataset.")
 
         checker = request.inputs['test'][0].data
 
@@ -84,30 +128,10 @@ class SpotChecker(Process):
             fp.writelines(ncdump(dataset))
             response.update_status('ncdump done.', 10)
 
-        if 'CF' in checker:
-            check_suite = CheckSuite()
-            check_suite.load_all_available_checkers()
-
-            with open(os.path.join(self.workdir, "report.html"), 'w') as fp:
-                response.update_status("cfchecker ...", 20)
-                response.outputs['output'].file = fp.name
-                ComplianceChecker.run_checker(
-                    dataset,
-                    checker_names=['cf'],
-                    verbose=True,
-                    criteria="normal",
-                    output_filename=fp.name,
-                    output_format="html")
-        elif 'CMIP6' in checker:
-            with open(os.path.join(self.workdir, "cmip6-cmor.txt"), 'w') as fp:
-                response.outputs['output'].file = fp.name
-                response.update_status("cmip6 checker ...", 20)
-                cmor_checker(dataset, output_filename=fp.name)
-        else:
-            response.update_status("qa checker ...", 20)
-            from hummingbird.processing import hdh_qa_checker
-            logfile, _ = hdh_qa_checker(dataset, project=request.inputs['test'][0].data)
-            response.outputs['output'].file = logfile
+        response.update_status("{} checker ...".format(checker), 20)
+        with phase(self.identifier, 'check'):
+            report_file, _, _ = spot_check(dataset, checker, self.workdir)
+        response.outputs['output'].file = report_file
 
         response.update_status('spotchecker done.', 100)
         return response
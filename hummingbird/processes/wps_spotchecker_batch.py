@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tarfile
+
+from pywps import Process
+from pywps import LiteralInput
+from pywps import ComplexInput, ComplexOutput
+from pywps import Format, FORMATS
+from pywps.app.Common import Metadata
+from pywps.app.exceptions import ProcessError
+
+from hummingbird import config
+from hummingbird.cache import checksum
+from hummingbird.catalog import read_datasets
+from hummingbird.summary import SUMMARY_FORMAT, Summary
+from hummingbird.utils import imap_ordered, make_dirs
+from hummingbird.processes.wps_spotchecker import spot_check
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+
+def evict_batch_states(max_age):
+    """Removes the state of batches which have not been resumed for ``max_age`` seconds."""
+    batch_path = os.path.join(config.cache_path(), 'batch')
+    if not max_age or not os.path.isdir(batch_path):
+        return
+    now = time.time()
+    for name in os.listdir(batch_path):
+        path = os.path.join(batch_path, name)
+        try:
+            expired = now - os.path.getmtime(path) > max_age
+        except OSError:
+            continue
+        if expired:
+            LOGGER.info("removing expired batch state %s", path)
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def batch_state_path(test, dataset_ids):
+    """Directory keeping the results of a batch, used to resume an interrupted batch."""
+    sha = hashlib.sha256(test.encode('utf-8'))
+    for dataset_id in dataset_ids:
+        sha.update(b'\0')
+        sha.update(dataset_id.encode('utf-8'))
+    return os.path.join(config.cache_path(), 'batch', sha.hexdigest())
+
+
+class BatchSpotChecker(Process):
+    def __init__(self):
+        inputs = [
+            ComplexInput('dataset', 'NetCDF files',
+                         abstract='Upload NetCDF files or enter URLs pointing to NetCDF files.',
+                         min_occurs=0,
+                         max_occurs=100,
+                         supported_formats=[FORMATS.NETCDF]),
+            ComplexInput('dataset_opendap', 'Remote OpenDAP Data URLs',
+                         abstract="Remote OpenDAP data URLs.",
+                         min_occurs=0,
+                         max_occurs=1000,
+                         supported_formats=[FORMATS.DODS]),
+            ComplexInput('manifest', 'Manifest or THREDDS catalog',
+                         abstract="Text file with one dataset URL per line or a THREDDS catalog."
+                                  " All OpenDAP datasets of the catalog are checked,"
+                                  " catalog references are not followed.",
+                         min_occurs=0,
+                         max_occurs=1,
+                         supported_formats=[FORMATS.TEXT, Format('application/xml')]),
+            LiteralInput('test', 'Select the test you want to run.',
+                         data_type='string',
+                         abstract="CF-1.6=Climate and Forecast Conventions (CF)",
+                         min_occurs=1,
+                         max_occurs=1,
+                         default='CF-1.6',
+                         allowed_values=['CF-1.6', ]),
+        ]
+        outputs = [
+            ComplexOutput('output', 'Summary Report',
+                          abstract='Status of each checked dataset in input order.',
+                          as_reference=True,
+                          supported_formats=[FORMATS.TEXT]),
+            ComplexOutput('report_tar', 'Reports as tarfile',
+                          abstract='Test report of each dataset as tarfile.',
+                          as_reference=True,
+                          supported_formats=[Format('application/x-tar')]),
+            ComplexOutput('summary', 'Summary of check results',
+                          abstract='Status, check duration and report of each dataset as JSON lines.',
+                          as_reference=True,
+                          supported_formats=[SUMMARY_FORMAT]),
+        ]
+
+        super(BatchSpotChecker, self).__init__(
+            self._handler,
+            identifier="spotchecker_batch",
+            title="Batch Spot Checker",
+            version="0.1.0",
+            abstract="Checks a list of datasets against a variety of compliance standards."
+                     " The datasets are given as files, OpenDAP URLs, a manifest or a THREDDS catalog."
+                     " Datasets are checked in parallel. A batch which has been interrupted"
+                     " is resumed when it is submitted again.",
+            metadata=[
+                Metadata('User Guide', 'http://birdhouse-hummingbird.readthedocs.io/en/latest/processes.html#spotchecker'),  # noqa
+                Metadata('CF Conventions', 'http://cfconventions.org/'),
+            ],
+            inputs=inputs,
+            outputs=outputs,
+            status_supported=True,
+            store_supported=True,
+        )
+
+    def _handler(self, request, response):
+        # tuples of (dataset, dataset id)
+        datasets = []
+        for dataset in request.inputs.get('dataset', []):
+            datasets.append((dataset.file, checksum(dataset.file)))
+        for dataset in request.inputs.get('dataset_opendap', []):
+            datasets.append((dataset.url, dataset.url))
+        if 'manifest' in request.inputs:
+            manifest = request.inputs['manifest'][0]
+            try:
+                urls = read_datasets(manifest.file, getattr(manifest, 'url', None))
+            except ValueError as err:
+                raise ProcessError(str(err))
+            for url in urls:
+                datasets.append((url, url))
+        if not datasets:
+            raise ProcessError("You need to provide a Dataset.")
+
+        test = request.inputs['test'][0].data
+        evict_batch_states(config.get_int('batch', 'max_age', None))
+        state_path = batch_state_path(test, [dataset_id for _, dataset_id in datasets])
+        make_dirs(state_path)
+        # a resumed batch is not expired
+        os.utime(state_path)
+
+        def check(item):
+            idx, (dataset, _) = item
+            # the state path depends on the ordered datasets, so the index identifies a dataset
+            item_path = os.path.join(state_path, "{0:05d}".format(idx))
+            status_file = os.path.join(item_path, 'status.json')
+            if os.path.isfile(status_file):
+                LOGGER.info("resuming batch, skipping checked dataset %s", dataset)
+                with open(status_file) as fp:
+                    return json.load(fp)
+            make_dirs(item_path)
+            start = time.time()
+            try:
+                report_file, passed, (errors, warnings) = spot_check(dataset, test, item_path)
+            except Exception as err:
+                LOGGER.exception("spot check failed for dataset %s", dataset)
+                return dict(status='ERROR', message=str(err), report=None)
+            if os.path.dirname(os.path.abspath(report_file)) != item_path:
+                shutil.copy(report_file, item_path)
+            status = dict(
+                status={True: 'PASS', False: 'FAIL'}.get(passed, 'DONE'),
+                report=os.path.join(item_path, os.path.basename(report_file)),
+                errors=errors,
+                warnings=warnings,
+                duration=time.time() - start)
+            # written last, marks the dataset as checked
+            with open(status_file, 'w') as fp:
+                json.dump(status, fp)
+            return status
+
+        def progress(count, total, item):
+            response.update_status("checks: %d/%d" % (count, total), int(count * 99.0 / total))
+
+        failed = False
+        reports = []
+        with open(os.path.join(self.workdir, 'summary.txt'), 'w') as fp, \
+                Summary(os.path.join(self.workdir, 'summary.jsonl')) as summary:
+            response.outputs['output'].file = fp.name
+            for (idx, (dataset, _)), status in imap_ordered(
+                    check, enumerate(datasets), max_workers=config.max_workers(), callback=progress):
+                fp.write("{0}, {1}\n".format(dataset, status['status']))
+                fp.flush()
+                if status['status'] == 'ERROR':
+                    failed = True
+                    summary.add(dataset, status['status'])
+                else:
+                    arcname = "reports/{0:04d}_{1}_{2}".format(
+                        idx, os.path.basename(dataset), os.path.basename(status['report']))
+                    reports.append((status['report'], arcname))
+                    summary.add(dataset, status['status'], status.get('errors'), status.get('warnings'),
+                                status.get('duration'), report=arcname, offset=0,
+                                length=os.path.getsize(status['report']))
+        response.outputs['summary'].file = summary.filename
+
+        with tarfile.open(os.path.join(self.workdir, 'reports.tar'), 'w') as tar:
+            response.outputs['report_tar'].file = tar.name
+            for report, arcname in reports:
+                tar.add(report, arcname=arcname)
+        if not failed:
+            # keep the state only for batches which need to be resumed
+            shutil.rmtree(state_path, ignore_errors=True)
+
+        response.update_status('spotchecker batch done.', 100)
+        return response
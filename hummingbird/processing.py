@@ -1,8 +1,15 @@
 import os
+import sys
 import glob
+import string
+import tarfile
+import tempfile
 import subprocess
-from subprocess import check_output, CalledProcessError
+from subprocess import CalledProcessError
 
+from . import config
+from .cache import get_cache
+from .command import run_command, which
 from .utils import fix_filename, make_dirs
 
 import logging
@@ -16,7 +23,7 @@ def ncgen(cdl_file, output_file=None):
     output_file = output_file or 'output.nc'
 
     try:
-        subprocess.run(['ncgen', '-k', 'nc4', '-o', output_file, cdl_file], check=True)
+        run_command(['ncgen', '-k', 'nc4', '-o', output_file, cdl_file])
     except Exception as err:
         LOGGER.error("Could not generate ncdump: {}".format(err))
         pass
@@ -26,11 +33,33 @@ def ncdump(dataset):
     '''
     Returns the metadata of the dataset
 
+    The CDL header is built natively with netCDF4, for OpenDAP URLs only
+    from the DDS and DAS documents. The ``ncdump`` command is used as fallback.
+    '''
+    # numpy and netCDF4 are imported on the first request
+    from . import opendap
+    from .cdl import dump_header
+    if opendap.is_opendap_url(dataset) and config.get_bool('opendap', 'metadata_only', True):
+        try:
+            return opendap.dump_header(dataset, name=os.path.basename(dataset))
+        except Exception as err:
+            LOGGER.warning("Could not read DDS/DAS of {}: {}".format(dataset, err))
+    try:
+        return dump_header(dataset)
+    except Exception as err:
+        LOGGER.warning("Could not read metadata with netCDF4, using ncdump: {}".format(err))
+    return ncdump_command(dataset)
+
+
+def ncdump_command(dataset):
+    '''
+    Returns the metadata of the dataset using ``ncdump -h``.
+
     Code taken from https://github.com/ioos/compliance-checker-web
     '''
 
     try:
-        output = check_output(['ncdump', '-h', dataset])
+        output = run_command(['ncdump', '-h', dataset])
         if not isinstance(output, str):
             output = output.decode('utf-8')
         lines = output.split('\n')
@@ -46,6 +75,19 @@ def ncdump(dataset):
 
 
 def cmor_tables_path():
+    '''
+    Returns the path of the CMIP6 CMOR tables installed with ``PrePARE``.
+    The cmor package is only imported if the tables are not found in the
+    installation prefix of ``PrePARE`` or Python.
+    '''
+    prefixes = [sys.prefix]
+    prepare = which('PrePARE')
+    if prepare:
+        prefixes.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(prepare))))
+    for prefix in prefixes:
+        tables_path = os.path.join(prefix, 'share', 'cmip6-cmor-tables', 'Tables')
+        if os.path.isdir(tables_path):
+            return tables_path
     os.environ['UVCDAT_ANONYMOUS_LOG'] = 'no'
     import cmor
     tables_path = os.path.abspath(
@@ -53,6 +95,29 @@ def cmor_tables_path():
     return tables_path
 
 
+_cmor_version = None
+
+
+def cmor_version():
+    '''
+    Returns the version of CMOR, from the ``PrePARE`` command if the cmor package is not installed.
+    '''
+    global _cmor_version
+    if _cmor_version is None:
+        os.environ['UVCDAT_ANONYMOUS_LOG'] = 'no'
+        try:
+            import cmor
+            _cmor_version = getattr(cmor, '__version__', '')
+        except ImportError:
+            try:
+                _cmor_version = run_command(
+                    ['PrePARE', '--version'], stderr=subprocess.STDOUT).decode('utf-8').strip()
+            except (OSError, CalledProcessError):
+                LOGGER.warning("Could not get the CMOR version.")
+                _cmor_version = ''
+    return _cmor_version
+
+
 def cmor_tables():
     tables = glob.glob(os.path.join(cmor_tables_path(), 'CMIP6_*.json'))
     table_names = [os.path.basename(table)[0:-5] for table in tables]
@@ -60,58 +125,76 @@ def cmor_tables():
     return table_names
 
 
-def cmor_dump_output(dataset, status, output, output_filename):
-    import string
-    if not isinstance(output, str):
-        output = output.decode('utf-8')
-    # show filename
-    dataset_id = os.path.basename(dataset)  # 'uploaded-file'
-    converted_lines = []
-    converted_lines.append('## Checking NetCDF file {}\n\n'.format(dataset_id))
+# deleted from the PrePARE output: non printable and non ascii bytes and "!"
+_CMOR_DELETE = bytes(c for c in range(256) if chr(c) not in string.printable) + b'!'
+
+
+def _cmor_status_line(status):
+    # both lines have the same length, the status is written after the check
     if status is True:
-        converted_lines.append("Dateset *passed* CMIP6 cmor checks:\n")
-    else:
-        converted_lines.append("Dateset *failed* CMIP6 cmor checks:\n")
-    # decode to ascii
-    for line in output.split('\n'):
-        line = line.translate(None, '!')
-        if chr(27) in line:
-            continue
-        if "In function:" in line:
-            continue
-        if "called from:" in line:
-            continue
-        line = line.strip()
-        if not line:  # skip empty lines
-            continue
-        # remove non printable chars
-        line = ''.join([x for x in line if x in string.printable])
-        # error list option
-        if line.startswith("Error:"):
-            line = "\n* " + line
-        converted_lines.append(str(line) + '\n')
-    with open(output_filename, 'w') as fp:
-        fp.writelines(converted_lines)
+        return "Dateset *passed* CMIP6 cmor checks:\n"
+    return "Dateset *failed* CMIP6 cmor checks:\n"
+
+
+def cmor_filter_line(line):
+    '''
+    Returns the report line of a PrePARE output line (bytes) or ``None`` if the line is skipped.
+    '''
+    if b'\x1b' in line or b"In function:" in line or b"called from:" in line:
+        return None
+    line = line.translate(None, _CMOR_DELETE).strip()
+    if not line:  # skip empty lines
+        return None
+    line = line.decode('ascii')
+    # error list option
+    if line.startswith("Error:"):
+        line = "\n* " + line
+    return line + '\n'
 
 
 def cmor_checker(dataset, table='CMIP6_CV', variable=None, output_filename=None):
+    '''
+    Runs PrePARE on the dataset and writes the report to ``output_filename`` while PrePARE is running.
+    Returns True if the dataset passed the checks.
+    '''
     output_filename = output_filename or 'out.txt'
-    try:
-        cmd = ['PrePARE']
-        if variable:
-            cmd.extend(['--variable', variable])
-        table_path = os.path.join(cmor_tables_path(), table + '.json')
-        cmd.append(table_path)
-        cmd.append(dataset)
-        LOGGER.debug("run command: %s", cmd)
-        os.environ['UVCDAT_ANONYMOUS_LOG'] = 'no'
-        output = check_output(cmd, stderr=subprocess.STDOUT)
-        cmor_dump_output(dataset, True, output, output_filename)
-    except CalledProcessError as err:
-        LOGGER.warn("CMOR checker failed on dataset: %s", os.path.basename(dataset))
-        cmor_dump_output(dataset, False, err.output, output_filename)
-        return False
-    return True
+    cache = get_cache()
+    cache_key = None
+    if cache:
+        cache_key = cache.key(dataset, 'cmor_checker', cmor_version(), table, variable)
+        info = cache.get_file(cache_key, output_filename)
+        if info is not None:
+            return info['status']
+    cmd = ['PrePARE']
+    if variable:
+        cmd.extend(['--variable', variable])
+    table_path = os.path.join(cmor_tables_path(), table + '.json')
+    cmd.append(table_path)
+    cmd.append(dataset)
+    LOGGER.debug("run command: %s", cmd)
+    os.environ['UVCDAT_ANONYMOUS_LOG'] = 'no'
+
+    def write_line(line):
+        line = cmor_filter_line(line)
+        if line is not None:
+            fp.write(line)
+
+    with open(output_filename, 'w') as fp:
+        fp.write('## Checking NetCDF file {}\n\n'.format(os.path.basename(dataset)))
+        status_offset = fp.tell()
+        fp.write(_cmor_status_line(False))
+        try:
+            run_command(cmd, stderr=subprocess.STDOUT, on_line=write_line)
+            status = True
+        except CalledProcessError:
+            LOGGER.warn("CMOR checker failed on dataset: %s", os.path.basename(dataset))
+            status = False
+        if status:
+            fp.seek(status_offset)
+            fp.write(_cmor_status_line(True))
+    if cache:
+        cache.put(cache_key, output_filename, status=status)
+    return status
 
 
 def hdh_cf_check(filename, version="auto"):
@@ -121,46 +204,114 @@ def hdh_cf_check(filename, version="auto"):
     if version != "auto":
         cmd.extend(['-C', version])
     try:
-        output = check_output(cmd, stderr=subprocess.STDOUT)
+        output = run_command(cmd, stderr=subprocess.STDOUT)
     except CalledProcessError as err:
         LOGGER.exception("cfchecks failed!")
         return "Error: cfchecks failed: {0}. Output: {0.output}".format(err)
     return output
 
 
-def hdh_qa_checker(filename, project, qa_home=None):
-    # TODO: maybe use local file path
-    filename = os.path.abspath(fix_filename(filename))
+_qa_version = None
 
-    # create qa_home
-    # qa_home = os.path.join(config.cache_path(), "qa_dkrz")
-    if not qa_home:
-        qa_home = os.path.abspath("./work")
-    make_dirs(qa_home)
 
-    cmd = ["qa-dkrz", "-P", project]
-    if qa_home:
-        cmd.append("--work=" + qa_home)
-    cmd.append(filename)
-    try:
-        check_output(cmd, stderr=subprocess.STDOUT)
-    except CalledProcessError as err:
-        LOGGER.exception("qa checker failed!")
-        msg = "qa checker failed: {0}. Output: {0.output}".format(err)
-        raise Exception(msg)
+def qa_version():
+    '''
+    Returns the version of the QA-DKRZ checker, the command is run once per process.
+    '''
+    global _qa_version
+    if _qa_version is None:
+        try:
+            _qa_version = run_command(['qa-dkrz', '--version'], stderr=subprocess.STDOUT).decode('utf-8').strip()
+        except (OSError, CalledProcessError):
+            LOGGER.warning("Could not get the QA-DKRZ version.")
+            _qa_version = ''
+    return _qa_version
 
-    results_path = os.path.join("QA_Results", "check_logs")
+
+def _qa_results(output_dir):
+    results_path = os.path.join(output_dir, "QA_Results", "check_logs")
     if not os.path.isdir(results_path):
         raise Exception("QA results are missing.")
 
     # output logfile
-    logs = glob.glob(os.path.join(results_path, "*.log"))
+    logs = sorted(glob.glob(os.path.join(results_path, "*.log")))
     if not logs:
-        logs = glob.glob(os.path.join(results_path, ".*.log"))
+        logs = sorted(glob.glob(os.path.join(results_path, ".*.log")))
     if logs:
         # use .txt extension
         logfile = logs[0][:-4] + '.txt'
-        os.link(logs[0], logfile)
+        if not os.path.exists(logfile):
+            os.link(logs[0], logfile)
     else:
         raise Exception("could not find log file.")
     return logfile, results_path
+
+
+def _extract(archive, path):
+    '''
+    Extracts the files of a tar archive into ``path``. Raises :class:`tarfile.TarError`
+    for members with absolute paths, ``..`` components, links or special files.
+    '''
+    with tarfile.open(archive) as tar:
+        if hasattr(tarfile, 'data_filter'):
+            tar.extractall(path, filter='data')
+            return
+        # Python without extraction filters
+        for member in tar.getmembers():
+            name = os.path.normpath(member.name)
+            if os.path.isabs(name) or name == '..' or name.startswith('..' + os.sep) or \
+                    not (member.isfile() or member.isdir()):
+                raise tarfile.TarError("Invalid member of archive {}: {}".format(archive, member.name))
+        tar.extractall(path)
+
+
+def hdh_qa_checker(filename, project, qa_home=None, output_dir=None):
+    '''
+    Runs the QA-DKRZ checker on a file in its own directory, so several checks can run in parallel.
+    Returns a tuple ``(logfile, results_path)`` with the log of the check and the ``QA_Results`` directory.
+
+    :param qa_home: QA-DKRZ work directory, defaults to ``work`` in the output directory.
+    :param output_dir: directory of the results, defaults to a new directory in the current directory.
+
+    With the result cache enabled the results of files already checked with the same project
+    and QA-DKRZ version are reused, only new or changed files are checked.
+    '''
+    # TODO: maybe use local file path
+    filename = os.path.abspath(fix_filename(filename))
+
+    if not output_dir:
+        output_dir = tempfile.mkdtemp(prefix='qa_', dir='.')
+    output_dir = os.path.abspath(output_dir)
+    make_dirs(output_dir)
+    # qa_home = os.path.join(config.cache_path(), "qa_dkrz")
+    if not qa_home:
+        qa_home = os.path.join(output_dir, "work")
+    make_dirs(qa_home)
+
+    cache = get_cache()
+    cache_key = None
+    if cache:
+        cache_key = cache.key(filename, 'qa_checker', qa_version(), project)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            LOGGER.info("using cached QA results for %s", os.path.basename(filename))
+            _extract(entry[0], output_dir)
+            return _qa_results(output_dir)
+
+    cmd = ["qa-dkrz", "-P", project, "--work=" + qa_home, filename]
+    try:
+        # QA-DKRZ writes the QA_Results directory into the current directory
+        run_command(cmd, stderr=subprocess.STDOUT, cwd=output_dir)
+    except CalledProcessError as err:
+        LOGGER.exception("qa checker failed!")
+        msg = "qa checker failed: {0}. Output: {0.output}".format(err)
+        raise Exception(msg)
+
+    logfile, results_path = _qa_results(output_dir)
+    if cache:
+        archive = os.path.join(output_dir, 'qa_results.tar')
+        with tarfile.open(archive, 'w') as tar:
+            tar.add(os.path.join(output_dir, "QA_Results"), arcname="QA_Results")
+        cache.put(cache_key, archive)
+        os.remove(archive)
+    return logfile, results_path
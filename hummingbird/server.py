@@ -0,0 +1,193 @@
+"""
+Preforking multi-process WSGI server for the ``hummingbird start --workers`` mode.
+
+The master process binds the socket, creates the application and imports the
+processes and checker plugins once, then forks the worker processes which
+share the listening socket. Each worker serves requests with threads.
+
+Signals of the master process:
+
+* ``SIGTERM``, ``SIGINT``: stop the workers after they finished running requests.
+* ``SIGHUP``: graceful reload, reloads the configuration, starts new workers and
+  stops the old ones after they finished running requests.
+"""
+
+import os
+import time
+import socket
+import signal
+import threading
+
+from werkzeug.serving import make_server, select_address_family, get_sockaddr
+from werkzeug.middleware.shared_data import SharedDataMiddleware
+
+import logging
+LOGGER = logging.getLogger("PYWPS")
+
+
+def preload():
+    """Imports the checker plugins so they are shared by all workers."""
+    try:
+        from .checksuite import get_check_suite
+        get_check_suite()
+    except Exception:
+        LOGGER.exception("Could not preload compliance checkers.")
+
+
+class PreforkServer(object):
+    """
+    :param app_factory: callable returning the WSGI application.
+    :param host: IP address to bind.
+    :param port: port to bind.
+    :param workers: number of worker processes.
+    :param static_files: dict of URL paths and directories served as static files.
+    :param graceful_timeout: seconds to wait for workers to finish running requests.
+    """
+
+    def __init__(self, app_factory, host, port, workers=2, static_files=None, graceful_timeout=30):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, workers)
+        self.static_files = static_files or {}
+        self.graceful_timeout = graceful_timeout
+        self.workers = set()
+        self.socket = None
+        self.app = None
+        self._stopping = False
+        self._reload = False
+
+    def bind(self):
+        family = select_address_family(self.host, self.port)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(get_sockaddr(self.host, int(self.port), family))
+        sock.listen(128)
+        sock.set_inheritable(True)
+        return sock
+
+    def load_app(self):
+        app = self.app_factory()
+        if self.static_files:
+            app = SharedDataMiddleware(app, self.static_files)
+        preload()
+        return app
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self.workers.add(pid)
+            return pid
+        # worker process
+        exit_code = 0
+        try:
+            self.run_worker()
+        except Exception:
+            LOGGER.exception("worker failed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def run_worker(self):
+        for sig in (signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        server = make_server(
+            self.host, self.port, self.app, threaded=True, fd=self.socket.fileno())
+        # wait for running requests when the server is closed
+        server.daemon_threads = False
+        server.block_on_close = True
+
+        def drain(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, drain)
+        LOGGER.info("worker %s started", os.getpid())
+        server.serve_forever()
+        LOGGER.info("worker %s stopped", os.getpid())
+
+    def stop_workers(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                self.workers.discard(pid)
+        deadline = time.time() + self.graceful_timeout
+        # wait only for the stopped workers, new workers are running after a reload
+        remaining = set(pid for pid in pids if not self.wait_worker(pid))
+        while remaining and time.time() < deadline:
+            time.sleep(0.1)
+            remaining = set(pid for pid in remaining if not self.wait_worker(pid))
+        for pid in remaining:
+            LOGGER.warning("killing worker %s", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        for pid in remaining:
+            self.wait_worker(pid, block=True)
+
+    def wait_worker(self, pid, block=False):
+        """Returns True if the worker ``pid`` has finished."""
+        try:
+            finished, _ = os.waitpid(pid, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            # already reaped
+            finished = pid
+        if finished:
+            self.workers.discard(pid)
+            return True
+        return False
+
+    def reap(self):
+        """Removes finished workers. Returns the number of workers reaped."""
+        count = 0
+        while self.workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                break
+            if pid == 0:
+                break
+            if pid in self.workers:
+                self.workers.discard(pid)
+                count += 1
+        return count
+
+    def handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def handle_reload(self, signum, frame):
+        self._reload = True
+
+    def reload(self):
+        LOGGER.info("reloading workers")
+        self._reload = False
+        old_workers = set(self.workers)
+        self.app = self.load_app()
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+        self.stop_workers(old_workers)
+
+    def run(self):
+        self.socket = self.bind()
+        self.app = self.load_app()
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+        for _ in range(self.num_workers):
+            self.spawn_worker()
+        LOGGER.info("started %d workers on %s:%s", self.num_workers, self.host, self.port)
+        try:
+            while not self._stopping:
+                if self._reload:
+                    self.reload()
+                self.reap()
+                # restart workers which died
+                while len(self.workers) < self.num_workers and not self._stopping:
+                    self.spawn_worker()
+                time.sleep(0.5)
+        finally:
+            self.stop_workers(set(self.workers))
+            self.socket.close()
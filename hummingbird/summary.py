@@ -0,0 +1,83 @@
+"""
+JSON-lines summaries of the checks of multi-file processes.
+
+Each line describes the check of one dataset, in the order of the input datasets:
+
+.. code-block:: json
+
+  {"dataset": "tas.nc", "status": "FAIL", "errors": 2, "warnings": 0, "duration": 1.52,
+   "report": "cfchecker_output.txt", "offset": 0, "length": 1234}
+
+``offset`` and ``length`` are the byte range of the report of the dataset
+in ``report``, so the report of a failed check can be read without parsing
+the whole report.
+"""
+
+import re
+import json
+
+from pywps import Format
+
+# lines like "ERROR: (2.3): ..." or "* Error: ...", but not "ERRORS detected: 0"
+_ERROR = re.compile(r'^\W*error\b', re.IGNORECASE | re.MULTILINE)
+_WARNING = re.compile(r'^\W*warn(ing)?\b', re.IGNORECASE | re.MULTILINE)
+
+# impact of an annotated event in the YAML logs of QA-DKRZ
+_QA_IMPACT = re.compile(r'^\s*impact:\s*[\'"]?L(\d)', re.MULTILINE)
+
+SUMMARY_FORMAT = Format('application/x-ndjson', extension='.jsonl')
+
+
+def count_messages(report):
+    """Returns a tuple ``(errors, warnings)`` with the number of error and warning lines in ``report``."""
+    if not isinstance(report, str):
+        report = report.decode('utf-8', 'ignore')
+    return len(_ERROR.findall(report)), len(_WARNING.findall(report))
+
+
+def count_qa_events(log):
+    """
+    Returns a tuple ``(errors, warnings)`` with the number of events in a QA-DKRZ log.
+    Events of impact L3 and L4 are errors, events of impact L2 warnings and L1 notes are not counted.
+    """
+    if not isinstance(log, str):
+        log = log.decode('utf-8', 'ignore')
+    impacts = [int(level) for level in _QA_IMPACT.findall(log)]
+    return len([level for level in impacts if level >= 3]), len([level for level in impacts if level == 2])
+
+
+class Summary(object):
+    """
+    Writes the summary entries of the checked datasets to ``filename``.
+    Each entry is flushed, so the summary can be read while the checks are running.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._fp = open(filename, 'w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, dataset, status, errors=None, warnings=None, duration=None,
+            report=None, offset=None, length=None):
+        entry = dict(dataset=dataset, status=status, errors=errors, warnings=warnings)
+        if duration is not None:
+            entry['duration'] = round(duration, 3)
+        if report is not None:
+            entry.update(report=report, offset=offset, length=length)
+        self._fp.write(json.dumps(entry, sort_keys=True) + '\n')
+        self._fp.flush()
+        return entry
+
+    def close(self):
+        self._fp.close()
+
+
+def read_summary(filename):
+    """Returns the list of entries of a summary."""
+    with open(filename) as fp:
+        return [json.loads(line) for line in fp if line.strip()]
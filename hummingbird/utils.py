@@ -1,5 +1,7 @@
 import os
+import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import logging
 LOGGER = logging.getLogger("PYWPS")
@@ -10,6 +12,35 @@ def make_dirs(path):
         os.makedirs(path)
 
 
+def package_version(name):
+    """Returns the installed version of the distribution ``name`` without importing the package."""
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python < 3.8
+        from pkg_resources import get_distribution
+        return get_distribution(name).version
+    return version(name)
+
+
+def lazy_attributes(module_name, **factories):
+    """
+    Adds attributes to the module ``module_name`` which are created by calling
+    their factory on first access. Works like a module ``__getattr__`` on Python < 3.7.
+    """
+    values = {}
+
+    def attribute(name, factory):
+        def get(module):
+            if name not in values:
+                values[name] = factory()
+            return values[name]
+        return property(get)
+
+    module = sys.modules[module_name]
+    namespace = {name: attribute(name, factory) for name, factory in factories.items()}
+    module.__class__ = type('LazyModule', (module.__class__,), namespace)
+
+
 def fix_filename(filename):
     if not filename.endswith(".nc"):
         new_name = filename + ".nc"
@@ -37,3 +68,33 @@ def output_filename(filename, addition=None, extension=None, dir=None):
         LOGGER.debug("Could not generate output name.")
         _, outfile = tempfile.mkstemp(suffix=extension, prefix="output", dir=dir)
     return outfile
+
+
+def imap_ordered(func, items, max_workers=1, callback=None):
+    """
+    Runs ``func`` on all items in a pool of ``max_workers`` threads
+    and yields tuples ``(item, result)`` in the order of the input items.
+
+    A result is yielded as soon as all results of the previous items are available.
+    The optional ``callback(count, total, item)`` is called in the calling thread
+    each time an item is completed, in order of completion.
+    """
+    items = list(items)
+    total = len(items)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or 1)) as executor:
+        futures = {executor.submit(func, item): idx for idx, item in enumerate(items)}
+        results = {}
+        next_idx = 0
+        try:
+            for count, future in enumerate(as_completed(futures), 1):
+                idx = futures[future]
+                results[idx] = future.result()
+                if callback:
+                    callback(count, total, items[idx])
+                while next_idx in results:
+                    yield items[next_idx], results.pop(next_idx)
+                    next_idx += 1
+        finally:
+            # don't start pending items when the consumer stops early or a check failed
+            for future in futures:
+                future.cancel()
@@ -1,7 +1,13 @@
 import os
+from pywps import configuration
 from pywps.app.Service import Service
 
-from .processes import processes
+from . import capabilities
+from . import config
+from . import download
+from . import jobqueue
+from . import metrics
+from .processes import load_processes, enabled_processes, log_import_times
 
 
 def create_app(cfgfiles=None):
@@ -10,8 +16,23 @@ def create_app(cfgfiles=None):
         config_files.extend(cfgfiles)
     if 'PYWPS_CFG' in os.environ:
         config_files.append(os.environ['PYWPS_CFG'])
-    service = Service(processes=processes, cfgfiles=config_files)
-    return service
+    configuration.load_configuration(config_files)
+    # the enabled processes are read from the configuration
+    service = Service(processes=load_processes(enabled_processes()))
+    log_import_times()
+    jobqueue.install()
+    download.install()
+    if config.get_bool('cfchecker', 'prefetch_tables'):
+        from .cftables import fetch_tables
+        fetch_tables()
+    app = service
+    if config.get_bool('capabilities', 'cache'):
+        app = capabilities.CapabilitiesCache(service, config_files)
+        app.prerender()
+    if metrics.enabled():
+        metrics.install()
+        return metrics.MetricsMiddleware(app)
+    return app
 
 
 application = create_app()
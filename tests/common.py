@@ -1,9 +1,17 @@
 import os
 import requests
+from pywps import configuration
 from pywps.tests import WpsClient, WpsTestResponse
 
 TESTS_HOME = os.path.abspath(os.path.dirname(__file__))
 
+# test the processes with the default configuration of the service
+CONFIG_FILES = [
+    os.path.join(os.path.dirname(TESTS_HOME), 'hummingbird', 'default.cfg'),
+    os.path.join(TESTS_HOME, 'test.cfg'),
+]
+configuration.load_configuration(CONFIG_FILES)
+
 
 def resource_file(filepath):
     return os.path.join(TESTS_HOME, 'testdata', filepath)
@@ -52,3 +60,10 @@ class WpsTestClient(WpsClient):
 
 def client_for(service):
     return WpsTestClient(service, WpsTestResponse)
+
+
+def output_file(resp, identifier):
+    """Returns the path of the output ``identifier`` of an Execute response."""
+    href = resp.xpath('/wps:ExecuteResponse/wps:ProcessOutputs/wps:Output'
+                      '[ows:Identifier="{}"]/wps:Reference/@href'.format(identifier))[0]
+    return os.path.join(configuration.get_config_value('server', 'outputpath'), href.split('/outputs/')[1])
@@ -0,0 +1,51 @@
+import os
+import tarfile
+
+from pywps import configuration
+
+from hummingbird.archive import ReportArchive
+
+
+def partial_members(filename):
+    names = []
+    try:
+        with tarfile.open(filename, 'r|*') as tar:
+            for member in tar:
+                names.append(member.name)
+    except (tarfile.ReadError, EOFError):
+        # the archive is not complete
+        pass
+    return names
+
+
+def test_report_archive(tmpdir):
+    for name in ('a.txt', 'b.txt'):
+        tmpdir.join(name).write('report ' + name)
+    with ReportArchive(str(tmpdir.join('report'))) as archive:
+        archive.add(str(tmpdir.join('a.txt')), arcname='a.txt')
+        # readable while the archive is written
+        assert partial_members(archive.filename) == ['a.txt']
+        archive.add(str(tmpdir.join('b.txt')), arcname='b.txt')
+    assert archive.filename.endswith('.tar.gz')
+    with tarfile.open(archive.filename) as tar:
+        assert tar.getnames() == ['a.txt', 'b.txt']
+
+
+def test_report_archive_publish(tmpdir):
+    tmpdir.join('a.txt').write('report')
+    outputpath = configuration.get_config_value('server', 'outputpath')
+    configuration.CONFIG.set('server', 'outputpath', str(tmpdir.join('outputs')))
+    configuration.CONFIG.set('archive', 'compression', 'none')
+    try:
+        archive = ReportArchive(str(tmpdir.join('report')), compression='gz')
+        url = archive.publish('1234')
+        archive.add(str(tmpdir.join('a.txt')), arcname='a.txt')
+        partial = str(tmpdir.join('outputs', '1234', 'partial-report.tar'))
+        assert url.endswith('/1234/partial-report.tar')
+        assert partial_members(partial) == ['a.txt']
+        archive.close()
+        assert not os.path.exists(partial)
+        assert archive.data_format.mime_type == 'application/x-tar'
+    finally:
+        configuration.CONFIG.set('server', 'outputpath', outputpath)
+        configuration.CONFIG.remove_option('archive', 'compression')
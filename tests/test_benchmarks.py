@@ -0,0 +1,61 @@
+import threading
+
+from netCDF4 import Dataset
+
+from .common import resource_file
+from benchmarks.corpus import generate
+from benchmarks.load import LoadTest, default_mix, percentile
+from benchmarks import run
+from benchmarks.run import compare
+
+
+def test_generate_corpus_file(tmpdir):
+    filename = generate(str(tmpdir.join('cmip6.nc')), size_mb=0.1, variables=2, attributes=3, kind='cmip6')
+    with Dataset(filename) as ds:
+        assert ds.mip_era == 'CMIP6'
+        assert ds.global_2 == 'synthetic global attribute 2'
+        assert list(ds.variables) == ['time', 'time_bnds', 'lat', 'lon', 'tas', 'tas1']
+        assert ds.variables['tas1'].comment_2 == 'synthetic attribute 2 of tas1'
+        assert len(ds.dimensions['time']) == 1
+
+
+def test_compare_baseline():
+    baseline = {'results': {'ncdump/a.nc': {'median': 1.0}, 'cchecker/a.nc': {'median': 1.0}}}
+    report = {'results': {'ncdump/a.nc': {'median': 1.1}, 'cchecker/a.nc': {'median': 1.5},
+                          'cfchecker/a.nc': {'median': 1.0}}}
+    assert compare(report, baseline, tolerance=0.2) == [
+        ('ncdump/a.nc', 1.0, 1.1, 1.1, False),
+        ('cchecker/a.nc', 1.0, 1.5, 1.5, True),
+    ]
+
+
+def test_compare_missing_baseline(monkeypatch, capsys):
+    monkeypatch.setattr(run, 'run', lambda *args: {'results': {'ncdump/a.nc': {'median': 1.0}}})
+    assert run.main(['--processes', 'ncdump', '--compare', 'missing']) == 0
+    assert 'skipping the comparison' in capsys.readouterr().out
+
+
+def test_percentile():
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([], 95) is None
+
+
+def test_load_test():
+    from pywps import Service
+    from werkzeug.serving import make_server
+    from hummingbird.processes.wps_ncdump import NCDump
+
+    server = make_server('127.0.0.1', 0, Service(processes=[NCDump()]), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = 'http://127.0.0.1:{}/wps'.format(server.server_port)
+        mix = [entry for entry in default_mix(resource_file('test.nc'))
+               if entry['name'] in ('GetCapabilities', 'DescribeProcess', 'ncdump')]
+        report = LoadTest(url, mix, seed=1).run(count=10, concurrency=1)
+    finally:
+        server.shutdown()
+    assert report['total']['requests'] == 10
+    assert report['total']['errors'] == 0, report['total']['error_kinds']
+    assert set(report['requests']) <= {'GetCapabilities', 'DescribeProcess', 'ncdump'}
@@ -0,0 +1,48 @@
+import os
+import time
+
+from hummingbird.cache import ResultCache, checksum
+
+from .common import resource_file
+
+
+def test_checksum():
+    assert checksum(resource_file('test.nc')) == checksum(resource_file('test.nc'))
+    assert len(checksum(resource_file('test.nc'))) == 64
+
+
+def test_cache_key(tmpdir):
+    cache = ResultCache(str(tmpdir))
+    key = cache.key(resource_file('test.nc'), 'cchecker', '4.3', 'normal', 'html')
+    assert key == cache.key(resource_file('test.nc'), 'cchecker', '4.3', 'normal', 'html')
+    assert key != cache.key(resource_file('test.nc'), 'cchecker', '4.3', 'strict', 'html')
+    assert cache.key('http://test.opendap.org/opendap/test.nc', 'cchecker') is None
+
+
+def test_cache_put_get(tmpdir):
+    cache = ResultCache(str(tmpdir.mkdir('cache')))
+    key = cache.key(resource_file('test.nc'), 'cmor_checker')
+    report = tmpdir.join('report.txt')
+    report.write('passed')
+    assert cache.get(key) is None
+    cache.put(key, str(report), status=True)
+    output = str(tmpdir.join('out.txt'))
+    assert cache.get_file(key, output) == {'status': True}
+    assert open(output).read() == 'passed'
+
+
+def test_cache_max_age(tmpdir):
+    cache = ResultCache(str(tmpdir), max_age=60)
+    cache.put_data('abc', b'report')
+    assert cache.get('abc') is not None
+    path = cache.get('abc')[0]
+    os.utime(path, (time.time(), time.time() - 120))
+    assert cache.get('abc') is None
+
+
+def test_cache_max_size(tmpdir):
+    cache = ResultCache(str(tmpdir), max_size=1)
+    cache.put_data('aaa', b'x' * 600 * 1024)
+    cache.put_data('bbb', b'x' * 600 * 1024)
+    assert cache.get('aaa') is None
+    assert cache.get('bbb') is not None
@@ -0,0 +1,69 @@
+import os
+import time
+
+from pywps import Service
+from pywps import configuration
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from .common import CONFIG_FILES
+from hummingbird.capabilities import CapabilitiesCache
+from hummingbird.processes.wps_ncdump import NCDump
+
+
+class CountingService(object):
+    def __init__(self):
+        self.service = Service(processes=[NCDump()])
+        self.calls = 0
+
+    def __call__(self, environ, start_response):
+        self.calls += 1
+        return self.service(environ, start_response)
+
+
+def test_capabilities_cache():
+    service = CountingService()
+    cache = CapabilitiesCache(service)
+    cache.prerender()
+    assert service.calls == 2
+    client = Client(cache, Response)
+    resp = client.get('/wps?SERVICE=WPS&Request=GetCapabilities')
+    assert resp.status_code == 200
+    assert b'ncdump' in resp.data
+    assert service.calls == 2
+    etag = resp.headers['ETag']
+    resp = client.get('/wps?service=WPS&request=GetCapabilities', headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.data == b''
+    resp = client.get('/wps?service=WPS&request=GetCapabilities',
+                      headers={'If-Modified-Since': resp.headers['Last-Modified']})
+    assert resp.status_code == 304
+    resp = client.get('/wps?service=WPS&request=DescribeProcess&version=1.0.0&identifier=ncdump')
+    assert resp.status_code == 200
+    assert service.calls == 3
+    client.get('/wps?service=WPS&request=DescribeProcess&version=1.0.0&identifier=ncdump')
+    assert service.calls == 3
+    # errors are not cached
+    resp = client.get('/wps?service=WPS&request=DescribeProcess&version=1.0.0&identifier=missing')
+    client.get('/wps?service=WPS&request=DescribeProcess&version=1.0.0&identifier=missing')
+    assert service.calls == 5
+
+
+def test_capabilities_cache_config_change(tmpdir):
+    cfgfile = tmpdir.join('custom.cfg')
+    cfgfile.write('[server]\n')
+    service = CountingService()
+    client = Client(CapabilitiesCache(service, CONFIG_FILES + [str(cfgfile)]), Response)
+    client.get('/wps?service=WPS&request=GetCapabilities')
+    resp = client.get('/wps?service=WPS&request=GetCapabilities')
+    assert service.calls == 1
+    assert b'Changed Title' not in resp.data
+    cfgfile.write('[metadata:main]\nidentification_title = Changed Title\n')
+    mtime = time.time() + 10
+    os.utime(str(cfgfile), (mtime, mtime))
+    try:
+        resp = client.get('/wps?service=WPS&request=GetCapabilities')
+    finally:
+        configuration.load_configuration(CONFIG_FILES)
+    assert service.calls == 2
+    assert b'Changed Title' in resp.data
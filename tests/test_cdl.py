@@ -0,0 +1,23 @@
+import numpy as np
+
+from hummingbird.cdl import dump_header, format_attribute
+
+from .common import resource_file
+
+
+def test_dump_header():
+    lines = dump_header(resource_file('test.nc'))
+    assert lines[0] == 'netcdf test.nc {\n'
+    assert lines[-1] == '}\n'
+    assert '\ttime = UNLIMITED ; // (30 currently)\n' in lines
+    assert '\tfloat meantemp(time, lat, lon) ;\n' in lines
+    assert '\t\tmeantemp:_FillValue = 1e+20f ;\n' in lines
+    assert '// global attributes:\n' in lines
+
+
+def test_format_attribute():
+    assert format_attribute('say "hi"\n') == ('', '"say \\"hi\\"\\n"')
+    assert format_attribute(np.int16(3)) == ('', '3s')
+    assert format_attribute(np.array([0.5, 1.5], 'f4')) == ('', '0.5f, 1.5f')
+    assert format_attribute(np.float64(0.1)) == ('', '0.1')
+    assert format_attribute(['a', 'b']) == ('string ', '"a", "b"')
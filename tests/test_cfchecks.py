@@ -0,0 +1,137 @@
+import os
+import sys
+import textwrap
+
+import pytest
+from pywps import configuration
+
+from hummingbird import cfchecks
+from hummingbird import command
+from hummingbird.cfchecks import check
+from hummingbird.processes.wps_cfchecker import cf_check
+
+from .common import resource_file
+
+# fake cfchecker package which parses the tables like the CEDA CF checker
+FAKE_CFCHECKS = '''
+import os
+from xml.sax import ContentHandler, make_parser
+from xml.sax.handler import feature_namespaces
+
+STANDARDNAME = 'http://example.com/cf-standard-name-table.xml'
+AREATYPES = 'http://example.com/area-type-table.xml'
+REGIONNAMES = 'http://example.com/standardized-region-list.xml'
+
+# number of parsed tables in this process
+PARSED = []
+
+
+class FatalCheckerError(Exception):
+    pass
+
+
+def CFVersion(value=None):
+    return value
+
+
+class ConstructList(ContentHandler):
+    def __init__(self, useShelve=False, shelveFile=None, cacheTime=0, cacheDir='/tmp'):
+        ContentHandler.__init__(self)
+        self.current = False
+        self.list = set()
+
+    def startDocument(self):
+        PARSED.append(1)
+
+    def startElement(self, name, attrs):
+        if name == 'entry':
+            self.list.add(attrs.get('id'))
+
+
+class ConstructDict(ConstructList):
+    pass
+
+
+class CFChecker(object):
+    def __init__(self, version=None, cfStandardNamesXML=STANDARDNAME,
+                 cfAreaTypesXML=AREATYPES, cfRegionNamesXML=REGIONNAMES):
+        self.tables = [cfStandardNamesXML, cfAreaTypesXML, cfRegionNamesXML]
+
+    def checker(self, file):
+        if 'crash' in file:
+            os._exit(1)
+        parser = make_parser()
+        parser.setFeature(feature_namespaces, 0)
+        handlers = [ConstructDict(), ConstructList(shelveFile='cfarea_cache'),
+                    ConstructList(shelveFile='cfregion_cache')]
+        for handler, source in zip(handlers, self.tables):
+            if not handler.current:
+                parser.setContentHandler(handler)
+                parser.parse(source)
+        print("CHECKING NetCDF FILE: %s" % file)
+        print("standard names: %s" % ','.join(sorted(handlers[0].list)))
+        print("area types: %s" % ','.join(sorted(handlers[1].list)))
+        print("region names: %s" % ','.join(sorted(handlers[2].list)))
+        print("parsed tables: %d" % len(PARSED))
+'''
+
+
+@pytest.fixture
+def fake_cfchecker(tmpdir, monkeypatch):
+    package = tmpdir.mkdir('site').mkdir('cfchecker')
+    package.join('__init__.py').write("__version__ = 'fake'\n")
+    package.join('cfchecks.py').write(FAKE_CFCHECKS)
+    monkeypatch.syspath_prepend(str(tmpdir.join('site')))
+    monkeypatch.setattr(cfchecks, '_broken', False)
+    tables = dict(standard_names=['air_temperature'], area_types=['land', 'sea'],
+                  region_names=['atlantic_ocean'])
+    for name, entries in tables.items():
+        table = tmpdir.join(name + '.xml')
+        table.write('<?xml version="1.0"?>\n<table>\n{}</table>\n'.format(
+            ''.join('  <entry id="{}"/>\n'.format(entry) for entry in entries)))
+        configuration.CONFIG.set('cfchecker', name, str(table))
+    configuration.CONFIG.set('cfchecker', 'cache_tables', 'false')
+    try:
+        yield tmpdir
+    finally:
+        cfchecks.shutdown()
+        for name in list(tables) + ['cache_tables']:
+            configuration.CONFIG.remove_option('cfchecker', name)
+        for name in ('cfchecker', 'cfchecker.cfchecks'):
+            sys.modules.pop(name, None)
+
+
+def test_cfchecks_tables(fake_cfchecker):
+    nc_file = str(fake_cfchecker.join('tas.nc'))
+    for _ in range(2):
+        report = check(nc_file, 'auto').decode('utf-8')
+        assert 'standard names: air_temperature\n' in report
+        assert 'area types: land,sea\n' in report
+        assert 'region names: atlantic_ocean\n' in report
+        # the tables are only parsed when the worker starts
+        assert 'parsed tables: 3\n' in report
+
+
+def test_cfchecks_command_fallback(fake_cfchecker, monkeypatch):
+    script = fake_cfchecker.join('cfchecks')
+    script.write(textwrap.dedent('''\
+        #!/bin/sh
+        echo "CHECKING NetCDF FILE with cfchecks command"
+        '''))
+    os.chmod(str(script), 0o755)
+    monkeypatch.setenv('PATH', '{}:{}'.format(fake_cfchecker, os.environ['PATH']))
+    monkeypatch.delitem(command._tools, 'cfchecks', raising=False)
+    try:
+        report = cf_check(str(fake_cfchecker.join('crash.nc')), 'auto')
+        assert report.strip() == b'CHECKING NetCDF FILE with cfchecks command'
+        assert cfchecks._broken
+        assert check(str(fake_cfchecker.join('tas.nc')), 'auto') is None
+    finally:
+        command._tools.pop('cfchecks', None)
+
+
+@pytest.mark.online
+def test_cfchecks_inprocess():
+    pytest.importorskip('cfchecker')
+    report = check(resource_file('test.nc'), 'auto')
+    assert b'CHECKING NetCDF FILE' in report
@@ -0,0 +1,13 @@
+from hummingbird.cftables import table_version
+
+
+def test_table_version(tmpdir):
+    table = tmpdir.join('cf-standard-name-table.xml')
+    table.write(
+        '<?xml version="1.0"?>\n'
+        '<standard_name_table>\n'
+        '  <version_number>71</version_number>\n'
+        '  <last_modified>2020-02-04T12:00Z</last_modified>\n'
+        '  <entry id="air_temperature"><canonical_units>K</canonical_units></entry>\n'
+        '</standard_name_table>\n')
+    assert table_version(str(table)) == '71'
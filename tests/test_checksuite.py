@@ -0,0 +1,39 @@
+from hummingbird import checksuite
+
+
+def test_get_check_suite():
+    suite = checksuite.get_check_suite()
+    assert 'cf' in suite.checkers
+    loads = checksuite.stats()['loads']
+    checksuite.get_check_suite()
+    stats = checksuite.stats()
+    assert stats['loads'] == loads
+    assert stats['reuses'] >= 1
+
+
+def test_reload():
+    loads = checksuite.stats()['loads']
+    checksuite.reload()
+    assert checksuite.stats()['loads'] == loads + 1
+    assert 'cf' in checksuite.get_check_suite().checkers
+
+
+def test_metrics(tmpdir):
+    from pywps import configuration
+    from hummingbird import metrics
+
+    def value(text, name):
+        return [float(line.split()[1]) for line in text.splitlines() if line.startswith(name + ' ')]
+
+    if not configuration.CONFIG.has_section('metrics'):
+        configuration.CONFIG.add_section('metrics')
+    configuration.CONFIG.set('metrics', 'directory', str(tmpdir))
+    try:
+        checksuite.get_check_suite()
+        checksuite.get_check_suite()
+        text = metrics.render()
+        assert value(text, 'hummingbird_checksuite_loads_total')[0] >= 1
+        assert value(text, 'hummingbird_checksuite_reuses_total')[0] >= 1
+        assert value(text, 'hummingbird_checksuite_saved_seconds_total')[0] > 0
+    finally:
+        configuration.CONFIG.remove_option('metrics', 'directory')
@@ -0,0 +1,49 @@
+import json
+import subprocess
+
+import pytest
+from pywps import configuration
+
+from hummingbird.command import run_command, which
+
+
+def test_run_command():
+    assert run_command(['echo', 'hello']) == b'hello\n'
+
+
+def test_run_command_failed():
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        run_command(['sh', '-c', 'echo failed >&2; exit 3'], stderr=subprocess.STDOUT)
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.output == b'failed\n'
+
+
+def test_run_command_on_line():
+    lines = []
+    assert run_command(['printf', 'a\\nb\\n'], on_line=lines.append) is None
+    assert lines == [b'a\n', b'b\n']
+
+
+def test_run_command_trace(tmpdir):
+    trace_file = tmpdir.join('commands.jsonl')
+    if not configuration.CONFIG.has_section('tracing'):
+        configuration.CONFIG.add_section('tracing')
+    configuration.CONFIG.set('tracing', 'enabled', 'true')
+    configuration.CONFIG.set('tracing', 'file', str(trace_file))
+    try:
+        run_command(['echo', 'hello'])
+    finally:
+        configuration.CONFIG.set('tracing', 'enabled', 'false')
+        configuration.CONFIG.remove_option('tracing', 'file')
+    event = json.loads(trace_file.read())
+    assert event['command'] == 'echo'
+    assert event['exit_code'] == 0
+    assert event['output_size'] == 6
+    assert event['max_rss'] > 0
+    assert set(event) >= {'wall_time', 'cpu_time', 'start', 'args'}
+
+
+def test_run_command_not_installed():
+    with pytest.raises(FileNotFoundError):
+        run_command(['hummingbird-missing-tool'])
+    assert which('hummingbird-missing-tool') is None
@@ -0,0 +1,120 @@
+import os
+import threading
+
+import pytest
+from pywps import Service
+from pywps import configuration
+from pywps.exceptions import FileSizeExceeded
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+from .common import resource_file, client_for
+from hummingbird import download
+from hummingbird.download import DownloadCache
+from hummingbird.processes.wps_ncdump import NCDump
+
+
+class FileServer(object):
+    def __init__(self):
+        self.content = b'version 1'
+        self.requests = []
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        self.requests.append(request.path)
+        if request.path == '/test.nc':
+            with open(resource_file('test.nc'), 'rb') as fp:
+                content = fp.read()
+        else:
+            content = self.content
+        etag = '"{}"'.format(hash(content))
+        if request.headers.get('If-None-Match') == etag:
+            response = Response(status=304)
+        else:
+            response = Response(content)
+        response.headers['ETag'] = etag
+        return response(environ, start_response)
+
+
+@pytest.fixture
+def server():
+    app = FileServer()
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    app.url = 'http://127.0.0.1:{}'.format(httpd.server_port)
+    yield app
+    httpd.shutdown()
+
+
+def test_download_cache(server, tmpdir):
+    cache = DownloadCache(str(tmpdir.join('cache')))
+    url = server.url + '/data.nc'
+    first = cache.fetch(url, str(tmpdir.join('first.nc')))
+    second = cache.fetch(url, str(tmpdir.join('second.nc')))
+    assert open(second, 'rb').read() == b'version 1'
+    # revalidated, not downloaded again
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    assert len(server.requests) == 2
+    server.content = b'version 2'
+    third = cache.fetch(url, str(tmpdir.join('third.nc')))
+    assert open(third, 'rb').read() == b'version 2'
+    assert open(first, 'rb').read() == b'version 1'
+
+
+def test_download_cache_copy(server, tmpdir, monkeypatch):
+    def link(src, dst):
+        raise OSError(18, 'Invalid cross-device link')
+    monkeypatch.setattr(os, 'link', link)
+    cache = DownloadCache(str(tmpdir.join('cache')))
+    filename = cache.fetch(server.url + '/data.nc', str(tmpdir.join('data.nc')))
+    assert not os.path.islink(filename)
+    # evicted while the input is used
+    os.remove(cache._path(server.url + '/data.nc'))
+    assert open(filename, 'rb').read() == b'version 1'
+
+
+def test_download_cache_max_size(server, tmpdir):
+    cache = DownloadCache(str(tmpdir.join('cache')), max_size=1e-5)
+    cache.fetch(server.url + '/a.nc', str(tmpdir.join('a.nc')))
+    cache.fetch(server.url + '/b.nc', str(tmpdir.join('b.nc')))
+    assert [os.path.basename(path) for path, _ in cache.entries()] == [
+        os.path.basename(cache._path(server.url + '/b.nc'))]
+    # no lock file is left for the evicted url
+    assert not os.path.exists(cache._path(server.url + '/a.nc') + '.lock')
+    assert os.path.exists(cache._path(server.url + '/b.nc') + '.lock')
+    with pytest.raises(FileSizeExceeded):
+        cache.fetch(server.url + '/c.nc', str(tmpdir.join('c.nc')), max_bytes=4)
+
+
+def test_download_cache_evict_locked(server, tmpdir):
+    cache = DownloadCache(str(tmpdir.join('cache')))
+    path = cache.get(server.url + '/a.nc')
+    cache.max_size = 1e-7
+    with cache._locked(path):
+        cache.evict()
+        assert os.path.isfile(path)
+    cache.evict()
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + '.lock')
+
+
+def test_wps_ncdump_download_cache(server, tmpdir):
+    configuration.CONFIG.set('download', 'enabled', 'true')
+    configuration.CONFIG.set('cache', 'directory', str(tmpdir))
+    download.install()
+    try:
+        client = client_for(Service(processes=[NCDump()]))
+        for _ in range(2):
+            resp = client.get(
+                service='WPS', request='Execute', version='1.0.0',
+                identifier='ncdump',
+                datainputs="dataset=@xlink:href={}/test.nc".format(server.url))
+            assert resp.status_code == 200
+            assert resp.xpath('/wps:ExecuteResponse/wps:Status/wps:ProcessSucceeded')
+        assert server.requests == ['/test.nc', '/test.nc']
+        assert len(download.get_download_cache().entries()) == 1
+    finally:
+        download.UrlHandler.file = download._url_file
+        configuration.CONFIG.set('download', 'enabled', 'false')
+        configuration.CONFIG.remove_option('cache', 'directory')
@@ -0,0 +1,43 @@
+import sys
+import subprocess
+
+from hummingbird.importcost import parse, report
+from hummingbird.processes import REGISTRY, load_processes
+
+
+def test_parse_importtime():
+    imports = parse("\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |     numpy.core",
+        "import time:       200 |        300 |   numpy",
+        "import time:        50 |        350 | hummingbird.cdl",
+        "import time:        20 |         20 | json",
+    ]))
+    assert imports[1] == ('numpy', 0.0002, 0.0003, 1)
+    result = report(imports, top=2)
+    assert result['total'] == 0.00037
+    assert result['packages'] == [('numpy', 0.0003), ('json', 0.00002)]
+
+
+def test_load_processes():
+    assert [process.identifier for process in load_processes()] == list(REGISTRY)
+
+
+def test_processes_import_no_checkers():
+    # the checkers are imported by the process handlers
+    script = "import sys, hummingbird.processes; print(sorted(set(sys.modules) & {'compliance_checker', 'numpy'}))"
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert output.strip() == '[]'
+
+
+def test_processes_created_on_first_use():
+    script = ("import hummingbird.processes as p; print(len(p.IMPORT_TIMES)); "
+              "print(p.processes is p.processes, len(p.IMPORT_TIMES) > 0)")
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert output.split() == ['0', 'True', 'True']
+
+
+def test_application_created_on_first_use():
+    script = "import sys, hummingbird; print('hummingbird.wsgi' in sys.modules)"
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    assert output.strip() == 'False'
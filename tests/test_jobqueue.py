@@ -0,0 +1,89 @@
+import os
+
+from pywps import Service
+from pywps import configuration
+
+from .common import TESTDATA, client_for
+from hummingbird import jobqueue
+from hummingbird.jobqueue import JobQueue, JobWorker
+from hummingbird.processes.wps_ncdump import NCDump
+
+
+def test_job_queue(tmpdir):
+    queue = JobQueue(str(tmpdir.join('jobs.sqlite')))
+    queue.put('1', 'ncdump', '{}')
+    queue.put('2', 'ncdump', '{}')
+    assert queue.claim('worker') == ('1', '{}')
+    assert queue.claim('worker') == ('2', '{}')
+    assert queue.claim('worker') is None
+    queue.finish('1', jobqueue.DONE)
+    assert queue.counts() == {'queued': 0, 'running': 1, 'done': 1, 'failed': 0}
+
+
+def test_job_queue_expired_lease(tmpdir):
+    queue = JobQueue(str(tmpdir.join('jobs.sqlite')))
+    queue.put('1', 'ncdump', '{}')
+    assert queue.claim('killed-worker') == ('1', '{}')
+    assert queue.expire(lease=60) == []
+    # the worker was killed and has not renewed the lease
+    assert queue.expire(lease=-1) == []
+    assert queue.counts()['queued'] == 1
+    assert queue.claim('worker') == ('1', '{}')
+    assert queue.expire(lease=-1) == [('1', '{}')]
+    assert queue.counts() == {'queued': 0, 'running': 0, 'done': 0, 'failed': 1}
+
+
+def test_wps_ncdump_queued(tmpdir):
+    service = Service(processes=[NCDump()])
+    jobqueue.install()
+    configuration.CONFIG.set('processing', 'mode', 'queue')
+    try:
+        if not configuration.CONFIG.has_section('jobqueue'):
+            configuration.CONFIG.add_section('jobqueue')
+        configuration.CONFIG.set('jobqueue', 'database', str(tmpdir.join('jobs.sqlite')))
+        client = client_for(service)
+        datainputs = "dataset=@xlink:href={0};".format(TESTDATA['test_local_nc'])
+        resp = client.get(
+            service='WPS', request='Execute', version='1.0.0',
+            identifier='ncdump', storeExecuteResponse='true', status='true',
+            datainputs=datainputs)
+        queue = JobQueue()
+        assert resp.status_code == 200
+        assert queue.counts()['queued'] == 1
+
+        worker = JobWorker(service, queue=queue, poll_interval=0)
+        assert worker.run(max_jobs=1) == 1
+        assert queue.counts() == {'queued': 0, 'running': 0, 'done': 1, 'failed': 0}
+    finally:
+        configuration.CONFIG.set('processing', 'mode', 'default')
+        configuration.CONFIG.remove_option('jobqueue', 'database')
+
+
+def test_wps_ncdump_queued_worker_killed(tmpdir):
+    service = Service(processes=[NCDump()])
+    jobqueue.install()
+    configuration.CONFIG.set('processing', 'mode', 'queue')
+    try:
+        if not configuration.CONFIG.has_section('jobqueue'):
+            configuration.CONFIG.add_section('jobqueue')
+        configuration.CONFIG.set('jobqueue', 'database', str(tmpdir.join('jobs.sqlite')))
+        client = client_for(service)
+        datainputs = "dataset=@xlink:href={0};".format(TESTDATA['test_local_nc'])
+        resp = client.get(
+            service='WPS', request='Execute', version='1.0.0',
+            identifier='ncdump', storeExecuteResponse='true', status='true',
+            datainputs=datainputs)
+        assert resp.status_code == 200
+        queue = JobQueue()
+        uuid, _ = queue.claim('killed-worker')
+
+        worker = JobWorker(service, queue=queue, poll_interval=0, lease=-1)
+        worker.max_attempts = 1
+        assert worker.run_once() is False
+        assert queue.counts()['failed'] == 1
+        status_file = os.path.join(configuration.get_config_value('server', 'outputpath'), uuid + '.xml')
+        with open(status_file) as fp:
+            assert 'ProcessFailed' in fp.read()
+    finally:
+        configuration.CONFIG.set('processing', 'mode', 'default')
+        configuration.CONFIG.remove_option('jobqueue', 'database')
@@ -0,0 +1,47 @@
+from pywps import Service
+from pywps import configuration
+from pywps.app.Process import Process
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from .common import TESTDATA, client_for
+from hummingbird import metrics
+from hummingbird.processes.wps_ncdump import NCDump
+
+
+def test_histogram_lines():
+    histogram = metrics.Histogram('test_seconds', 'Test.', ['process'], buckets=(1, 10))
+    metrics.REGISTRY.remove(histogram)
+    histogram.observe(0.5, process='ncdump')
+    histogram.observe(5, process='ncdump')
+    assert list(histogram.lines(histogram.values)) == [
+        'test_seconds_bucket{process="ncdump",le="1.0"} 1',
+        'test_seconds_bucket{process="ncdump",le="10.0"} 2',
+        'test_seconds_bucket{process="ncdump",le="+Inf"} 2',
+        'test_seconds_sum{process="ncdump"} 5.5',
+        'test_seconds_count{process="ncdump"} 2',
+    ]
+
+
+def test_metrics_endpoint(tmpdir):
+    service = Service(processes=[NCDump()])
+    if not configuration.CONFIG.has_section('metrics'):
+        configuration.CONFIG.add_section('metrics')
+    configuration.CONFIG.set('metrics', 'directory', str(tmpdir))
+    metrics.install()
+    try:
+        client = client_for(service)
+        resp = client.get(
+            service='WPS', request='Execute', version='1.0.0',
+            identifier='ncdump',
+            datainputs="dataset=@xlink:href={0};".format(TESTDATA['test_local_nc']))
+        assert resp.status_code == 200
+        resp = Client(metrics.MetricsMiddleware(service), Response).get('/metrics')
+        assert resp.status_code == 200
+        text = resp.get_data(as_text=True)
+        assert 'hummingbird_process_requests_total{process="ncdump"}' in text
+        assert 'hummingbird_process_duration_seconds_count{process="ncdump"}' in text
+        assert 'hummingbird_process_phase_duration_seconds_count{process="ncdump",phase="fetch"}' in text
+    finally:
+        Process._run_process = metrics._run_process
+        configuration.CONFIG.remove_option('metrics', 'directory')
@@ -0,0 +1,103 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from hummingbird import opendap
+from hummingbird.processing import ncdump
+
+DDS = """Dataset {
+    Float32 lat[lat = 2];
+    Float64 time[time = 3];
+    Grid {
+     ARRAY:
+        Int16 air[time = 3][lat = 2];
+     MAPS:
+        Float64 time[time = 3];
+        Float32 lat[lat = 2];
+    } air;
+} air.mon.nc;
+"""
+
+DAS = """Attributes {
+    lat {
+        String units "degrees_north";
+        Float32 actual_range 90.0, -90.0;
+    }
+    time {
+        String units "hours since 1800-1-1 00:00:0.0";
+    }
+    air {
+        String long_name "Monthly \\"mean\\" air temperature";
+        Int16 missing_value 32766;
+    }
+    NC_GLOBAL {
+        String Conventions "COARDS";
+    }
+    DODS_EXTRA {
+        String Unlimited_Dimension "time";
+    }
+}
+"""
+
+
+class DAPHandler(BaseHTTPRequestHandler):
+    requested = []
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        if self.path.endswith('.dds'):
+            body = DDS
+        elif self.path.endswith('.das'):
+            body = DAS
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def dap_server():
+    server = HTTPServer(('127.0.0.1', 0), DAPHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    DAPHandler.requested = []
+    yield 'http://127.0.0.1:{}/dodsC/air.mon.nc'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_dds():
+    name, variables = opendap.parse_dds(DDS)
+    assert name == 'air.mon.nc'
+    assert list(variables) == ['lat', 'time', 'air']
+    assert variables['air'] == ('int16', [('time', 3), ('lat', 2)])
+
+
+def test_parse_das():
+    attributes = opendap.parse_das(DAS)
+    assert attributes['lat']['actual_range'] == ('float32', ['90.0', '-90.0'])
+    assert attributes['air']['long_name'] == ('string', ['Monthly "mean" air temperature'])
+
+
+def test_dump_header(dap_server):
+    lines = opendap.dump_header(dap_server)
+    assert lines[0] == 'netcdf air.mon.nc {\n'
+    assert '\ttime = UNLIMITED ; // (3 currently)\n' in lines
+    assert '\tshort air(time, lat) ;\n' in lines
+    assert '\t\tlat:actual_range = 90.0f, -90.0f ;\n' in lines
+    assert '\t\tair:long_name = "Monthly \\"mean\\" air temperature" ;\n' in lines
+    assert '\t\t:Conventions = "COARDS" ;\n' in lines
+    assert sorted(DAPHandler.requested) == ['/dodsC/air.mon.nc.das', '/dodsC/air.mon.nc.dds']
+
+
+def test_ncdump_opendap(dap_server):
+    lines = ncdump(dap_server)
+    assert lines[0] == 'netcdf air.mon.nc {\n'
+    assert all(path.endswith(('.dds', '.das')) for path in DAPHandler.requested)
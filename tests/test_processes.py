@@ -0,0 +1,36 @@
+import pytest
+from pywps import configuration
+
+from hummingbird import command
+from hummingbird import processes
+from hummingbird.processes import enabled_processes
+
+
+@pytest.fixture
+def modules(monkeypatch):
+    modules = {'compliance_checker': True, 'cfchecker': True}
+    monkeypatch.setattr(processes, '_modules', modules)
+    return modules
+
+
+def test_enabled_processes_default(modules):
+    assert enabled_processes() == ['ncdump', 'cchecker', 'cfchecker']
+
+
+def test_enabled_processes_missing_modules(modules):
+    modules.update({'cfchecker': False, 'compliance_checker': False})
+    assert enabled_processes() == ['ncdump']
+
+
+def test_enabled_processes_missing_tools(modules):
+    configuration.CONFIG.set('processes', 'enabled', 'all')
+    command._tools.update({'PrePARE': '/usr/bin/PrePARE', 'qa-dkrz': None, 'dkrz-cf-checker': None})
+    try:
+        assert enabled_processes() == [
+            'ncdump', 'cchecker', 'cfchecker', 'spotchecker', 'spotchecker_batch', 'cmor_checker']
+        configuration.CONFIG.set('processes', 'enabled', 'ncdump, qa_checker, unknown')
+        assert enabled_processes() == ['ncdump']
+    finally:
+        configuration.CONFIG.set('processes', 'enabled', 'ncdump, cchecker, cfchecker')
+        for tool in ('PrePARE', 'qa-dkrz', 'dkrz-cf-checker'):
+            command._tools.pop(tool, None)
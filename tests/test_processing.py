@@ -0,0 +1,110 @@
+import io
+import os
+import sys
+import tarfile
+
+import pytest
+
+from hummingbird import command
+from hummingbird import processing
+
+PREPARE = """#!/bin/sh
+printf 'Processing: test.nc\\n\\n\\033[1;34mIn function: _check\\n'
+printf '!!!!!!!!!!!!!!!\\n'
+printf 'Error: The attribute \\303\\251 "tracking_id" is missing\\n'
+printf 'called from: PrePARE\\n'
+exit $PREPARE_EXIT
+"""
+
+REPORT = """## Checking NetCDF file test.nc
+
+Dateset *{}* CMIP6 cmor checks:
+Processing: test.nc
+
+* Error: The attribute  "tracking_id" is missing
+"""
+
+
+def test_cmor_filter_line():
+    line = processing.cmor_filter_line(b'!! Error: missing \xc3\xa9 tracking_id !!\n')
+    assert line == "\n* Error: missing  tracking_id\n"
+    assert processing.cmor_filter_line(b'\x1b[1;34mIn function: _check\n') is None
+    assert processing.cmor_filter_line(b'!!!!\n') is None
+
+
+def test_cmor_version_without_cmor(tmpdir, monkeypatch):
+    tool = tmpdir.join('PrePARE')
+    tool.write('#!/bin/sh\necho 3.6.1\n')
+    tool.chmod(0o755)
+    monkeypatch.setenv('PATH', '{}:{}'.format(tmpdir, os.environ['PATH']))
+    monkeypatch.delitem(command._tools, 'PrePARE', raising=False)
+    monkeypatch.setattr(processing, '_cmor_version', None)
+    # the cmor package is not importable
+    monkeypatch.setitem(sys.modules, 'cmor', None)
+    try:
+        assert processing.cmor_version() == '3.6.1'
+    finally:
+        command._tools.pop('PrePARE', None)
+
+
+def test_cmor_tables_without_cmor(tmpdir, monkeypatch):
+    tool = tmpdir.mkdir('bin').join('PrePARE')
+    tool.write('#!/bin/sh\n')
+    tool.chmod(0o755)
+    tables = tmpdir.mkdir('share').mkdir('cmip6-cmor-tables').mkdir('Tables')
+    tables.join('CMIP6_Amon.json').write('{}')
+    monkeypatch.setenv('PATH', '{}:{}'.format(tool.dirname, os.environ['PATH']))
+    monkeypatch.delitem(command._tools, 'PrePARE', raising=False)
+    # the cmor package is not importable
+    monkeypatch.setitem(sys.modules, 'cmor', None)
+    try:
+        assert processing.cmor_tables_path() == str(tables)
+        assert processing.cmor_tables() == ['CMIP6_Amon']
+    finally:
+        command._tools.pop('PrePARE', None)
+
+
+def test_cmor_checker(tmpdir, monkeypatch):
+    tool = tmpdir.join('PrePARE')
+    tool.write(PREPARE)
+    tool.chmod(0o755)
+    monkeypatch.setenv('PATH', '{}:{}'.format(tmpdir, os.environ['PATH']))
+    monkeypatch.delitem(command._tools, 'PrePARE', raising=False)
+    monkeypatch.setattr(processing, 'cmor_tables_path', lambda: str(tmpdir))
+    report = tmpdir.join('report.txt')
+    try:
+        monkeypatch.setenv('PREPARE_EXIT', '1')
+        assert processing.cmor_checker('test.nc', output_filename=str(report)) is False
+        assert report.read() == REPORT.format('failed')
+        monkeypatch.setenv('PREPARE_EXIT', '0')
+        assert processing.cmor_checker('test.nc', output_filename=str(report)) is True
+        assert report.read() == REPORT.format('passed')
+    finally:
+        command._tools.pop('PrePARE', None)
+
+
+@pytest.mark.parametrize('absolute', [False, True])
+def test_extract_members_outside(tmpdir, absolute):
+    outside = tmpdir.join('escaped.txt')
+    archive = str(tmpdir.join('results.tar'))
+    with tarfile.open(archive, 'w') as tar:
+        info = tarfile.TarInfo(str(outside) if absolute else '../escaped.txt')
+        info.size = 4
+        tar.addfile(info, io.BytesIO(b'data'))
+    try:
+        processing._extract(archive, str(tmpdir.mkdir('output')))
+    except tarfile.TarError:
+        pass
+    # absolute paths are rejected or extracted into the output directory
+    assert not outside.check()
+
+
+def test_extract_rejects_links(tmpdir):
+    archive = str(tmpdir.join('results.tar'))
+    with tarfile.open(archive, 'w') as tar:
+        info = tarfile.TarInfo('QA_Results/link')
+        info.type = tarfile.SYMTYPE
+        info.linkname = '/etc/passwd'
+        tar.addfile(info)
+    with pytest.raises(tarfile.TarError):
+        processing._extract(archive, str(tmpdir.mkdir('output')))
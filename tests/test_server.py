@@ -0,0 +1,83 @@
+import sys
+import time
+import threading
+import signal
+import socket
+import subprocess
+import urllib.request
+
+SERVER = """
+import sys
+import time
+from hummingbird.server import PreforkServer
+
+
+def app(environ, start_response):
+    if environ['PATH_INFO'] == '/slow':
+        time.sleep(5)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+
+PreforkServer(lambda: app, '127.0.0.1', int(sys.argv[1]), workers=2, graceful_timeout=1).run()
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(port, timeout=10):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen('http://127.0.0.1:{}/'.format(port), timeout=1) as resp:
+                return resp.read()
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def slow_request(port):
+    try:
+        urllib.request.urlopen('http://127.0.0.1:{}/slow'.format(port), timeout=10).close()
+    except OSError:
+        # the busy worker is killed
+        pass
+
+
+def test_prefork_server_reload_and_stop():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, '-c', SERVER, str(port)])
+    try:
+        assert get(port) == b'ok'
+        # a running request keeps an old worker busy beyond the graceful timeout
+        threading.Thread(target=slow_request, args=(port,), daemon=True).start()
+        time.sleep(0.5)
+        proc.send_signal(signal.SIGHUP)
+        time.sleep(2)
+        assert get(port) == b'ok'
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=15) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def test_reload_single_process_server(tmpdir, monkeypatch, capsys):
+    from hummingbird import cli
+    proc = subprocess.Popen(['sleep', '30'])
+    try:
+        pid_file = tmpdir.join('pywps.pid')
+        pid_file.write(str(proc.pid))
+        monkeypatch.setattr(cli, 'PID_FILE', str(pid_file))
+        cli.run_process_action('reload')
+        assert 'reload needs a service started with --workers' in capsys.readouterr().out
+        assert proc.poll() is None
+    finally:
+        proc.kill()
+        proc.wait()
@@ -0,0 +1,42 @@
+from .common import resource_file
+from hummingbird.summary import Summary, count_messages, count_qa_events, read_summary
+
+CF_REPORT = b"""CHECKING NetCDF FILE: test.nc
+=====================
+Using CF Checker Version 4.0.0
+
+------------------
+Checking variable: tas
+------------------
+ERROR: (3.1): Invalid units:  K/s
+WARN: (3.3): Invalid standard_name modifier
+ERROR: (5): coordinates attribute referencing non-existent variable
+
+ERRORS detected: 2
+WARNINGS given: 1
+INFO messages: 0
+"""
+
+
+def test_count_messages():
+    assert count_messages(CF_REPORT) == (2, 1)
+    assert count_messages("Dateset *failed* CMIP6 cmor checks:\n\n* Error: missing attribute\n") == (1, 0)
+    assert count_messages("") == (0, 0)
+
+
+def test_count_qa_events():
+    with open(resource_file('qa_dkrz.log')) as fp:
+        assert count_qa_events(fp.read()) == (1, 1)
+    assert count_qa_events("items:\n  - file: test.nc\n    status: 0\n") == (0, 0)
+
+
+def test_summary(tmpdir):
+    filename = str(tmpdir.join('summary.jsonl'))
+    with Summary(filename) as summary:
+        summary.add('a.nc', 'FAIL', 2, 1, 0.12345, report='output.txt', offset=0, length=100)
+        summary.add('b.nc', 'ERROR')
+    assert read_summary(filename) == [
+        dict(dataset='a.nc', status='FAIL', errors=2, warnings=1, duration=0.123,
+             report='output.txt', offset=0, length=100),
+        dict(dataset='b.nc', status='ERROR', errors=None, warnings=None),
+    ]
@@ -1,5 +1,6 @@
 from hummingbird.utils import output_filename
 from hummingbird.utils import fix_filename
+from hummingbird.utils import imap_ordered
 
 
 def test_fix_filename():
@@ -11,3 +12,35 @@ def test_output_filename():
     assert output_filename("tas.nc", addition="copy") == './tas_copy.nc'
     assert output_filename("tas_eur.nc", addition="copy") == './tas_eur_copy.nc'
     assert output_filename("out.html", addition="test", extension='html') == './out_test.html'
+
+
+def test_imap_ordered():
+    import time
+    completed = []
+
+    def delayed(value):
+        time.sleep(0.01 * (5 - value))
+        return value * 2
+
+    results = list(imap_ordered(
+        delayed, range(5), max_workers=3,
+        callback=lambda count, total, item: completed.append((count, total))))
+    assert results == [(0, 0), (1, 2), (2, 4), (3, 6), (4, 8)]
+    assert completed == [(1, 5), (2, 5), (3, 5), (4, 5), (5, 5)]
+
+
+def test_lazy_attributes():
+    import types
+    import sys
+    from hummingbird.utils import lazy_attributes
+    calls = []
+    module = types.ModuleType('lazy_test')
+    sys.modules['lazy_test'] = module
+    try:
+        lazy_attributes('lazy_test', value=lambda: calls.append(1) or 42)
+        assert calls == []
+        assert module.value == 42
+        assert module.value == 42
+        assert calls == [1]
+    finally:
+        del sys.modules['lazy_test']
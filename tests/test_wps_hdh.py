@@ -1,9 +1,17 @@
+import os
+import tarfile
+
 import pytest
 from pywps import Service
+from pywps import configuration
 from pywps.tests import assert_response_success
 
-from .common import TESTDATA, client_for
+from .common import TESTDATA, client_for, output_file, resource_file
+from hummingbird import command
+from hummingbird import processing
+from hummingbird.summary import read_summary
 from hummingbird.processes.wps_hdh_cfchecker import HDHCFChecker
+from hummingbird.processes.wps_hdh_qachecker import QualityChecker
 
 
 @pytest.mark.skip(reason="no way of currently testing this")
@@ -16,3 +24,72 @@ def test_wps_qa_cfchecker():
         identifier='qa_cfchecker',
         datainputs=datainputs)
     assert_response_success(resp)
+
+
+QA_DKRZ = """#!/bin/sh
+# writes the results into the current directory like qa-dkrz
+[ "$1" = "--version" ] && echo 0.6.7 && exit 0
+echo "$@" >> $(dirname $0)/calls.txt
+for arg; do file=$arg; done
+mkdir -p QA_Results/check_logs
+name=$(basename $file .nc)
+sed "s/test.nc/$name.nc/" {} > QA_Results/check_logs/$name.log
+"""
+
+
+@pytest.fixture
+def qa_dkrz(tmpdir, monkeypatch):
+    tool = tmpdir.join('qa-dkrz')
+    tool.write(QA_DKRZ.format(resource_file('qa_dkrz.log')))
+    tool.chmod(0o755)
+    monkeypatch.setenv('PATH', '{}:{}'.format(tmpdir, os.environ['PATH']))
+    monkeypatch.delitem(command._tools, 'qa-dkrz', raising=False)
+    monkeypatch.setattr(processing, '_qa_version', None)
+    yield tmpdir.join('calls.txt')
+    command._tools.pop('qa-dkrz', None)
+
+
+def run_qa_checker(datasets):
+    client = client_for(Service(processes=[QualityChecker()]))
+    datainputs = ";".join("dataset=@xlink:href={0}".format(dataset) for dataset in datasets)
+    resp = client.get(
+        service='WPS', request='Execute', version='1.0.0',
+        identifier='qa_checker',
+        datainputs=datainputs + ";project=CORDEX")
+    assert_response_success(resp)
+    return resp
+
+
+def test_wps_qa_checker_parallel(qa_dkrz):
+    resp = run_qa_checker([TESTDATA['test_local_nc']] * 2)
+    with open(output_file(resp, 'logfile')) as fp:
+        report = fp.read()
+    assert report.count("--- # ") == 2
+    entries = read_summary(output_file(resp, 'summary'))
+    # one L3 and one L2 event in the log
+    assert [(entry['status'], entry['errors'], entry['warnings']) for entry in entries] == [('FAIL', 1, 1)] * 2
+    # the offsets point to the log of each dataset in the merged report
+    for entry in entries:
+        log = report.encode('utf-8')[entry['offset']:entry['offset'] + entry['length']]
+        assert log.startswith(b"---\nconfiguration:") and log.endswith(b"  status: 3\n")
+    with tarfile.open(output_file(resp, 'output')) as tar:
+        logs = sorted(name for name in tar.getnames() if name.endswith('.log'))
+    assert len(logs) == 2
+    assert logs[0].startswith('0000_') and logs[1].startswith('0001_')
+
+
+def test_wps_qa_checker_incremental(qa_dkrz, tmpdir):
+    changed = tmpdir.join('changed.nc')
+    changed.write_binary(open(resource_file('test.nc'), 'rb').read() + b'\0')
+    configuration.CONFIG.set('cache', 'enabled', 'true')
+    configuration.CONFIG.set('cache', 'directory', str(tmpdir.join('cache')))
+    try:
+        run_qa_checker([TESTDATA['test_local_nc']])
+        resp = run_qa_checker([TESTDATA['test_local_nc'], 'file://' + str(changed)])
+    finally:
+        configuration.CONFIG.set('cache', 'enabled', 'false')
+        configuration.CONFIG.remove_option('cache', 'directory')
+    # the unchanged file is not checked again
+    assert len(qa_dkrz.readlines()) == 2
+    with tarfile.open(output_file(resp, 'output')) as tar:
+        assert len([name for name in tar.getnames() if name.endswith('.log')]) == 2
@@ -1,3 +1,5 @@
+import shutil
+
 import pytest
 from pywps import Service
 from pywps.tests import assert_response_success
@@ -14,6 +16,22 @@ def test_wps_ncdump_file():
         identifier='ncdump',
         datainputs=datainputs)
     assert_response_success(resp)
+    names = resp.xpath_text('/wps:ExecuteResponse/wps:ProcessOutputs/wps:Output/ows:Identifier')
+    assert names.split() == ['output']
+
+
+@pytest.mark.skipif(shutil.which('ncgen') is None, reason="ncgen not installed")
+def test_wps_ncdump_file_ncgen():
+    client = client_for(Service(processes=[NCDump()]))
+    datainputs = "dataset=@xlink:href={0};".format(TESTDATA['test_local_nc'])
+    resp = client.get(
+        service='WPS', request='Execute', version='1.0.0',
+        identifier='ncdump',
+        datainputs=datainputs,
+        ResponseDocument='output=@asReference=true;ncgen=@asReference=true')
+    assert_response_success(resp)
+    names = resp.xpath_text('/wps:ExecuteResponse/wps:ProcessOutputs/wps:Output/ows:Identifier')
+    assert sorted(names.split()) == ['ncgen', 'output']
 
 
 @pytest.mark.online
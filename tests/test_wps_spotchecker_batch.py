@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+from pywps import Service
+from pywps import configuration
+from pywps.tests import assert_response_success
+
+from .common import TESTDATA, client_for, output_file
+from hummingbird.catalog import read_datasets
+from hummingbird.processes.wps_spotchecker_batch import BatchSpotChecker, evict_batch_states
+from hummingbird.summary import read_summary
+
+CATALOG = """<?xml version="1.0" encoding="UTF-8"?>
+<catalog xmlns="http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0" version="1.0.1">
+  <service name="all" serviceType="Compound" base="">
+    <service name="odap" serviceType="OPENDAP" base="/thredds/dodsC/" />
+    <service name="http" serviceType="HTTPServer" base="/thredds/fileServer/" />
+  </service>
+  <dataset name="surface">
+    <metadata inherited="true"><serviceName>all</serviceName></metadata>
+    <dataset name="air.1948.nc" ID="air.1948" urlPath="surface/air.1948.nc" serviceName="odap" />
+    <dataset name="air.1949.nc" ID="air.1949">
+      <access serviceName="odap" urlPath="surface/air.1949.nc" />
+    </dataset>
+  </dataset>
+</catalog>
+"""
+
+
+def test_read_thredds_catalog(tmpdir):
+    catalog = tmpdir.join('catalog.xml')
+    catalog.write(CATALOG)
+    assert read_datasets(str(catalog), 'http://example.org/thredds/catalog/surface/catalog.xml') == [
+        'http://example.org/thredds/dodsC/surface/air.1948.nc',
+        'http://example.org/thredds/dodsC/surface/air.1949.nc',
+    ]
+
+
+def test_read_manifest(tmpdir):
+    manifest = tmpdir.join('manifest.txt')
+    manifest.write('# datasets\nhttp://example.org/a.nc\n\nhttps://example.org/b.nc\n')
+    assert read_datasets(str(manifest)) == ['http://example.org/a.nc', 'https://example.org/b.nc']
+
+
+@pytest.mark.parametrize('dataset', ['/data/b.nc', 'file:///etc/passwd', '../b.nc'])
+def test_read_manifest_rejects_local_files(tmpdir, dataset):
+    manifest = tmpdir.join('manifest.txt')
+    manifest.write('http://example.org/a.nc\n{}\n'.format(dataset))
+    with pytest.raises(ValueError):
+        read_datasets(str(manifest))
+
+
+def test_evict_batch_states(tmpdir):
+    configuration.CONFIG.set('cache', 'directory', str(tmpdir))
+    try:
+        old = tmpdir.mkdir('batch').mkdir('old')
+        new = tmpdir.join('batch').mkdir('new')
+        os.utime(str(old), (time.time() - 100, time.time() - 100))
+        evict_batch_states(50)
+    finally:
+        configuration.CONFIG.remove_option('cache', 'directory')
+    assert not old.check()
+    assert new.check()
+
+
+def test_wps_spotchecker_batch_file():
+    client = client_for(Service(processes=[BatchSpotChecker()]))
+    datainputs = "dataset=@xlink:href={0};dataset=@xlink:href={0};test=CF-1.6".format(
+        TESTDATA['test_local_nc'])
+    resp = client.get(
+        service='WPS', request='Execute', version='1.0.0',
+        identifier='spotchecker_batch',
+        datainputs=datainputs)
+    assert_response_success(resp)
+    entries = read_summary(output_file(resp, 'summary'))
+    assert len(entries) == 2
+    assert entries[0]['report'].startswith('reports/0000_')
+    # failed checks of high and medium priority
+    assert (entries[0]['status'], entries[0]['errors'], entries[0]['warnings']) == ('FAIL', 2, 1)